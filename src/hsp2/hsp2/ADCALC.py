@@ -6,6 +6,7 @@ License: LGPL2
 from numpy import zeros, array
 from numba import njit
 from hsp2.hsp2.utilities import make_numba_dict
+from hsp2.hsp2.profiler import timed_kernel
 
 # The clean way to get calculated data from adcalc() into advert() is to use a closure. 
 # This is not currently supported by Numba.
@@ -38,7 +39,7 @@ def adcalc(io_manager, siminfo, uci, ts):
 		ts['EROVOL'] = zeros(simlen)
 
 	############################################################################
-	errors = _adcalc_(ui, ts)  # run ADCALC simulation code
+	errors = timed_kernel(_adcalc_, ui, ts)  # run ADCALC simulation code
 	############################################################################
 
 	if 'VOL' in ui:
@@ -7,6 +7,7 @@ Conversion of HSPF HPERAIR.FOR module. '''
 from numba import njit
 from numpy import empty, zeros, int64
 from hsp2.hsp2.utilities import hoursval, make_numba_dict, LAPSE
+from hsp2.hsp2.profiler import timed_kernel
 
 from hsp2.hsp2io.protocols import SupportsReadTS, Category
 
@@ -24,13 +25,13 @@ def atemp(io_manager:SupportsReadTS, siminfo, uci, ts):
     ui['errlen'] = len(ERRMSGS)
 
     ############################################################################
-    errors = _atemp_(ui, ts)                     # run ATEMP_ simulation code
+    errors = timed_kernel(_atemp_, ui, ts)                     # run ATEMP_ simulation code
     ############################################################################
 
     return errors, ERRMSGS
 
 
-@njit(cache=True)
+@njit(cache=True, nogil=True)
 def _atemp_(ui, ts):
     ''' computes airtemp by correcting gage temp with prec and elevation
     general, ui, ts are Python dictionaries for user input and time series,
@@ -26,6 +26,7 @@ from numpy import zeros
 from hsp2.hsp2.ADCALC import advect
 from numba import njit
 from hsp2.hsp2.utilities  import make_numba_dict, initm
+from hsp2.hsp2.profiler import timed_kernel
 
 ERRMSG = []
 
@@ -110,7 +111,7 @@ def cons(io_manager, siminfo, uci, ts):
 			ts['COADCN'] = zeros(simlen)
 
 		############################################################################
-		errors = _cons_(ui, ts)  # run CONS simulation code
+		errors = timed_kernel(_cons_, ui, ts)  # run CONS simulation code
 		############################################################################
 
 		if nexits > 1:
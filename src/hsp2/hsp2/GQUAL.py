@@ -7,6 +7,7 @@ from numpy import array, zeros, int64
 from numba import njit
 from math import exp
 from hsp2.hsp2.utilities import initm, make_numba_dict, hoursval, dayval
+from hsp2.hsp2.profiler import timed_kernel
 from hsp2.hsp2.ADCALC import advect, oxrea
 
 ERRMSGS =('GQUAL: one or more gquals are sediment-associated, but section sedtrn not active',             #ERRMSG0
@@ -211,7 +212,7 @@ def gqual(io_manager, siminfo, uci, ts):
 		# ui_combined = {**ui, **ui_parms}
 
 		############################################################################
-		errors = _gqual_(ui, ts)  # run GQUAL simulation code
+		errors = timed_kernel(_gqual_, ui, ts)  # run GQUAL simulation code
 		############################################################################
 
 		if nexits > 1:
@@ -27,6 +27,7 @@ from hsp2.hsp2.ADCALC import advect
 from numpy import zeros, full, float64, int64
 from numba import njit
 from hsp2.hsp2.utilities  import make_numba_dict, hourflag, hoursval, initm
+from hsp2.hsp2.profiler import timed_kernel
 
 		
 # METRIC LAPSE DATA
@@ -93,7 +94,7 @@ def htrch(io_manager, siminfo, uci, ts):
 	ts['LAPSE'] = hoursval(siminfo, mlapse, lapselike=True)
 
 	############################################################################
-	errors = _htrch_(ui, ts)  # run HTRCH simulation code
+	errors = timed_kernel(_htrch_, ui, ts)  # run HTRCH simulation code
 	############################################################################
 
 	if nexits > 1:
@@ -18,6 +18,7 @@ from math import sqrt, log10
 from numba import njit, types
 from numba.typed import List
 from hsp2.hsp2.utilities import initm, make_numba_dict
+from hsp2.hsp2.profiler import timed_kernel
 
 # the following imports added by rb to handle dynamic code and special actions
 from hsp2.hsp2.state import hydr_get_ix, hydr_init_ix
@@ -153,7 +154,7 @@ def hydr(io_manager, siminfo, uci, ts, ftables, state):
     #######################################################################################
 
     # Do the simulation with _hydr_   (ie run reaches simulation code)
-    errors = _hydr_(ui, ts, COLIND, OUTDGT, rchtab, funct, Olabels, OVOLlabels,
+    errors = timed_kernel(_hydr_, ui, ts, COLIND, OUTDGT, rchtab, funct, Olabels, OVOLlabels,
                     state_info, state_paths, state_ix, dict_ix, ts_ix, state_step_hydr, op_tokens, model_exec_list)
 
     if 'O'    in ts:  del ts['O']
@@ -8,6 +8,7 @@ from math import exp
 from numpy import zeros, where, full, float64, int64
 from numba import njit
 from hsp2.hsp2.utilities import initm, make_numba_dict, hourflag, initmdiv
+from hsp2.hsp2.profiler import timed_kernel
 
 
 ''' DESIGN NOTES
@@ -100,12 +101,12 @@ def iqual(io_manager, siminfo, uci, ts):
 	ts['DAYFG'] = hourflag(siminfo, 0, dofirst=True).astype(float64)
 
 	############################################################################
-	errors = _iqual_(ui, ts)  # run IQUAL simulation code
+	errors = timed_kernel(_iqual_, ui, ts)  # run IQUAL simulation code
 	############################################################################
 
 	return errors, ERRMSGS
 
-@njit(cache=True)
+@njit(cache=True, nogil=True)
 def _iqual_(ui, ts):
 	''' Simulate washoff of quality constituents (other than solids, Heat, dox, and co2)
 	using simple relationships with solids And/or water yield'''
@@ -5,15 +5,18 @@ Conversion of HSPF HIMPWAT.FOR module into Python'''
 
 
 from numpy import zeros, ones, full, nan, int64, float64
-from math import sqrt
+from math import sqrt, isnan
 from numba import njit
-from hsp2.hsp2.utilities import hourflag, hoursval, initm, make_numba_dict
+from hsp2.hsp2.utilities import hourflag, hoursval, initm
+from hsp2.hsp2.profiler import timed_kernel
+from hsp2.hsp2.records import parameter_record
 
 MAXLOOPS  = 100      # newton method max steps
 TOLERANCE = 0.01     # newton method exit tolerance
 
 ERRMSGS =  ('IWATER: IROUTE Newton Method did not converge',    #ERRMSG0
   )
+ERRLEN = len(ERRMSGS)
 
 
 def iwater(io_manager, siminfo, uci, ts):
@@ -59,42 +62,38 @@ def iwater(io_manager, siminfo, uci, ts):
     # true the first time and at every hour of simulation
     ts['HRFG'] = hoursval(siminfo, ones(24), dofirst=True).astype(float64)  # numba Dict limitation
 
-    ui = make_numba_dict(uci)  # Note: all values coverted to float automatically
-    ui['steps']  = steps
-    ui['delt']   = siminfo['delt']
-    ui['errlen'] = len(ERRMSGS)
-    ui['uunits'] = siminfo['units']
+    params = parameter_record(uci, 'IMPLND', 'IWATER')   # row of the run's IWATER parameter table
 
     ############################################################################
-    errors = _iwater_(ui, ts)                       # run IWATER simulation code
+    errors = timed_kernel(_iwater_, params, steps, float(siminfo['delt']), int(siminfo['units']),
+     ts)                                                          # run IWATER simulation code
     ############################################################################
 
     return errors, ERRMSGS
 
 
-@njit(cache=True)
-def _iwater_(ui, ts):
-    ''' Simulate the water budget for an impervious land segment. '''
-    errors = zeros(int(ui['errlen'])).astype(int64)      # storage for error counts
+@njit(cache=True, nogil=True)
+def _iwater_(params, steps, delt, uunits, ts):
+    ''' Simulate the water budget for an impervious land segment. params is the
+    segment's parameter record (NaN when not given) '''
+    errors = zeros(ERRLEN).astype(int64)      # storage for error counts
 
-    delt60 = ui['delt'] / 60.0          # simulation interval in hours
-    steps  = int(ui['steps'])
-    uunits = ui['uunits']
+    delt60 = delt / 60.0          # simulation interval in hours
 
-    lsur   = ui['LSUR']
-    slsur  = ui['SLSUR']
+    lsur   = params['LSUR']
+    slsur  = params['SLSUR']
     if uunits == 2:
         lsur = lsur * 3.28
 
     RTLIFG = 0
-    if 'RTLIFG' in ui:
-        RTLIFG = int(ui['RTLIFG'])
+    if not isnan(params['RTLIFG']):
+        RTLIFG = int(params['RTLIFG'])
     CSNOFG = 0
-    if 'CSNOFG' in ui:
-        CSNOFG = int(ui['CSNOFG'])
+    if not isnan(params['CSNOFG']):
+        CSNOFG = int(params['CSNOFG'])
     RTOPFG = 0
-    if 'RTOPFG' in ui:
-        RTOPFG = int(ui['RTOPFG'])
+    if not isnan(params['RTOPFG']):
+        RTOPFG = int(params['RTOPFG'])
 
     HRFG   = ts['HRFG'].astype(int64)
     HR1FG  = ts['HR1FG'].astype(int64)
@@ -112,8 +111,8 @@ def _iwater_(ui, ts):
     if uunits == 2:
         RETSC = RETSC * 0.0394 # / 25.4
         WYIELD = WYIELD * 0.0394 # / 25.4        ???  take to inches
-        PETMAX = (ts['PETMAX'] * 9./5.) + 32.
-        PETMIN = (ts['PETMIN'] * 9./5.) + 32.
+        PETMAX = (PETMAX * 9./5.) + 32.
+        PETMIN = (PETMIN * 9./5.) + 32.
 
     # like MATLAB, much faster to preinitialize variables. Store in ts Dict
     ts['IMPEV'] = IMPEV = zeros(steps, dtype=float64)
@@ -126,8 +125,8 @@ def _iwater_(ui, ts):
     ts['SURS']  = SURS  = zeros(steps, dtype=float64)
 
     # initial conditions
-    rets = ui['RETS']
-    surs = ui['SURS']
+    rets = params['RETS']
+    surs = params['SURS']
     if uunits == 2:
         rets = rets * 0.0394 # / 25.4
         surs = surs * 0.0394
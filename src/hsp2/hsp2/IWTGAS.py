@@ -7,6 +7,7 @@ Conversion of HSPF HIMPGAS.FOR module into Python'''
 from numpy import zeros, where, full, float64, int64
 from numba import njit
 from hsp2.hsp2.utilities import initm, make_numba_dict, hourflag
+from hsp2.hsp2.profiler import timed_kernel
 
 ERRMSG = []
 
@@ -56,12 +57,12 @@ def iwtgas(io_manager, siminfo, uci, ts):
 	ts['DAYFG'] = hourflag(siminfo, 0, dofirst=True).astype(float64)
 
 	############################################################################
-	errors = _iwtgas_(ui, ts)  # run IWTGAS simulation code
+	errors = timed_kernel(_iwtgas_, ui, ts)  # run IWTGAS simulation code
 	############################################################################
 
 	return errors, ERRMSG
 
-@njit(cache=True)
+@njit(cache=True, nogil=True)
 def _iwtgas_(ui, ts):
 	''' Estimate water temperature, dissolved oxygen, and carbon dioxide in the outflows
 		from a impervious land segment. calculate associated fluxes through exit gate'''
@@ -8,6 +8,7 @@ from math import exp
 from numpy import zeros, where, full, float64, int64
 from numba import njit
 from hsp2.hsp2.utilities import initm, make_numba_dict, hourflag, initmdiv
+from hsp2.hsp2.profiler import timed_kernel
 
 ''' DESIGN NOTES
 Each constituent will be in its own subdirectory in the HDF5 file.
@@ -115,7 +116,7 @@ def pqual(io_manager, siminfo, uci, ts):
 			ts[name] = zeros(simlen)
 
 	############################################################################
-	errors = _pqual_(ui, ts)  # run PQUAL simulation code
+	errors = timed_kernel(_pqual_, ui, ts)  # run PQUAL simulation code
 	############################################################################
 
 	return errors, ERRMSGS
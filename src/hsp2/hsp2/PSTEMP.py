@@ -8,6 +8,7 @@ Conversion of HSPF HPERTMP.FOR module into Python'''
 from numpy import zeros, where, ones, float64, full, int64
 from numba import njit
 from hsp2.hsp2.utilities  import hoursval, initm, make_numba_dict
+from hsp2.hsp2.profiler import timed_kernel
 
 
 ERRMSG = ['SLTMP temperature less than -100C',   # MSG0
@@ -53,7 +54,7 @@ def pstemp(io_manager, siminfo, uci, ts):
 	ts['HRFG'] = hoursval(siminfo, ones(24), dofirst=True).astype(float64)  # numba Dict limitation
 
 	############################################################################
-	errors = _pstemp_(ui, ts)  # run PSTEMP simulation code
+	errors = timed_kernel(_pstemp_, ui, ts)  # run PSTEMP simulation code
 	############################################################################
 
 	return errors, ERRMSG
@@ -6,8 +6,10 @@ Conversion of HSPF HPERWAT.FOR into Python
 
 from numpy import zeros, ones, sqrt, array, full, nan, argmax, int64
 from math import log, exp
-from numba import njit
+from numba import njit, prange
+from numba.typed import List
 from hsp2.hsp2.utilities import initm, hourflag, hoursval, make_numba_dict
+from hsp2.hsp2.profiler import timed_kernel
 
 MAXLOOPS  = 100      # newton method max loops
 TOLERANCE = 0.01     # newton method exit tolerance
@@ -23,6 +25,7 @@ ERRMSGS =('PWATER: Sum of irrtgt in not one',             #ERRMSG0
           'PWATER: Reset AGWS to zero',                   #ERRMSG8
           'PWATER: High Water Table code not implemented', #ERRMSG9
           )
+ERRLEN = len(ERRMSGS)
 
 def pwater(io_manager, siminfo, uci, ts):
     ''' PERLND WATER module
@@ -32,6 +35,18 @@ def pwater(io_manager, siminfo, uci, ts):
        ui is a dictionary with PLS specific HSPF UCI like data
        ts is a dictionary with PLS specific timeseries '''
 
+    ui = pwater_setup(siminfo, uci, ts)
+
+    ############################################################################
+    errors = timed_kernel(_pwater_, ui, ts)      # traditional HSPF HPERWAT
+    ############################################################################
+
+    return errors, ERRMSGS
+
+
+def pwater_setup(siminfo, uci, ts):
+    ''' adds the input timeseries _pwater_ expects to ts and returns its Numba ui dict '''
+
     steps   = siminfo['steps']                # number of simulation points
 
     #if RTOPFG == 3 and 'SURTAB' in ui:
@@ -91,12 +106,50 @@ def pwater(io_manager, siminfo, uci, ts):
         CSNOFG = int(ui['CSNOFG'])
     # make CSNOFG available to other sections
     u['CSNOFG'] = CSNOFG
-
-    ############################################################################
-    errors = _pwater_(ui, ts)      # traditional HSPF HPERWAT
-    ############################################################################
-
-    return errors, ERRMSGS
+    return ui
+
+
+class PwaterBatch:
+    '''
+    Runs the PWATER kernel of many PERLND segments in one parallel call.
+    add() prepares a segment exactly like pwater(), run() simulates all added
+    segments with _pwater_batch_ and result() gives what pwater() would have
+    returned for a segment.
+    '''
+    def __init__(self):
+        self.segments = []
+        self.done = False
+        self._uis = List()
+        self._tss = List()
+        self._errors = {}
+
+    def __len__(self):
+        return len(self.segments)
+
+    def add(self, segment, siminfo, uci, ts):
+        self.segments.append(segment)
+        self._uis.append(pwater_setup(siminfo, uci, ts))
+        self._tss.append(ts)
+
+    def run(self):
+        if self.segments:
+            errors = timed_kernel(_pwater_batch_, self._uis, self._tss)
+            self._errors = dict(zip(self.segments, errors))
+        self._uis, self._tss = List(), List()
+        self.done = True
+
+    def result(self, segment):
+        return self._errors[segment], ERRMSGS
+
+
+@njit(cache=True, parallel=True)
+def _pwater_batch_(uis, tss):
+    ''' _pwater_ for every segment (ui, ts pair), segments run in parallel threads '''
+    errors = zeros((len(uis), ERRLEN), dtype=int64)
+    for i in prange(len(uis)):
+        segment = int64(i)   # typed List index, prange counts unsigned
+        errors[segment, :] = _pwater_(uis[segment], tss[segment])
+    return errors
 
 
 @njit(cache=True)
@@ -107,7 +160,7 @@ def _pwater_(ui, ts):
     if 'HWTFG' in ui:
         if int(ui['HWTFG']):
             errors[9] += 1
-            return
+            return errors
 
     delt60 = ui['delt'] / 60.0      # simulation interval in hours
     steps  = int(ui['steps'])
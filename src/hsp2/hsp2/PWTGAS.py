@@ -7,6 +7,7 @@ Conversion of HSPF HPERGAS.FOR module into Python'''
 from numpy import zeros, where, full, int64, float64
 from numba import njit
 from hsp2.hsp2.utilities import initm, make_numba_dict, hourflag
+from hsp2.hsp2.profiler import timed_kernel
 
 
 ERRMSG = []
@@ -56,7 +57,7 @@ def pwtgas(io_manager, siminfo, uci, ts):
     ts['DAYFG'] = hourflag(siminfo, 0, dofirst=True).astype(float64)
 
     ############################################################################
-    errors = _pwtgas_(ui, ts)  # run PWTGAS simulation code
+    errors = timed_kernel(_pwtgas_, ui, ts)  # run PWTGAS simulation code
     ############################################################################
 
     return errors, ERRMSG
@@ -10,6 +10,7 @@ from numba import types, njit
 from numba.typed import Dict
 
 from hsp2.hsp2.utilities  import make_numba_dict, initm, initmd
+from hsp2.hsp2.profiler import timed_kernel
 from hsp2.hsp2.RQUAL_Class import RQUAL_Class
 
 ERRMSGS_oxrx = ('OXRX: Warning -- SATDO is less than zero. This usually occurs when water temperature is very high (above ~66 deg. C). This usually indicates an error in input GATMP (or TW, if HTRCH is not being simulated).',)
@@ -222,7 +223,7 @@ def rqual(io_manager, siminfo, uci, uci_oxrx, uci_nutrx, uci_plank, uci_phcarb,
 	#---------------------------------------------------------------------
 
 	(err_oxrx, err_nutrx, err_plank, err_phcarb) \
-		= _rqual_run(siminfo_, ui, ui_oxrx, ui_nutrx, ui_plank, ui_phcarb, ts)
+		= timed_kernel(_rqual_run, siminfo_, ui, ui_oxrx, ui_nutrx, ui_plank, ui_phcarb, ts)
 
 	#---------------------------------------------------------------------
 	# compile errors & return:
@@ -7,6 +7,7 @@ Conversion of HSPF HPERSED.FOR module into Python'''
 from numpy import zeros, where, int64, full, float64
 from numba import njit
 from hsp2.hsp2.utilities  import initm, make_numba_dict, hourflag
+from hsp2.hsp2.profiler import timed_kernel
 
 ERRMSG = []
 
@@ -43,7 +44,7 @@ def sedmnt(io_manager, siminfo, uci, ts):
 	ts['DAYFG'] = hourflag(siminfo, 0, dofirst=True).astype(float64)
 
 	############################################################################
-	errors = _sedmnt_(ui, ts)  # run SEDMNT simulation code
+	errors = timed_kernel(_sedmnt_, ui, ts)  # run SEDMNT simulation code
 	############################################################################
 
 	return errors, ERRMSG
@@ -8,6 +8,7 @@ from math import log10, exp
 from numba import njit, types
 from hsp2.hsp2.ADCALC import advect
 from hsp2.hsp2.utilities  import make_numba_dict
+from hsp2.hsp2.profiler import timed_kernel
 
 # the following imports added to handle special actions
 from hsp2.hsp2.state import sedtrn_get_ix, sedtrn_init_ix
@@ -101,7 +102,7 @@ def sedtrn(io_manager, siminfo, uci, ts, state):
 	#######################################################################################
 
 	############################################################################
-	errors = _sedtrn_(ui, ts, state_info, state_paths, state_ix, dict_ix, ts_ix, op_tokens, model_exec_list)  # run SEDTRN simulation code
+	errors = timed_kernel(_sedtrn_, ui, ts, state_info, state_paths, state_ix, dict_ix, ts_ix, op_tokens, model_exec_list)  # run SEDTRN simulation code
 	############################################################################
 
 	if nexits > 1:
@@ -17,6 +17,7 @@ from numpy import zeros, ones, full, nan, int64
 from math import sqrt, floor
 from numba import njit
 from hsp2.hsp2.utilities import hourflag, monthval, hoursval, make_numba_dict, initm, SEASONS, SVP
+from hsp2.hsp2.profiler import timed_kernel
 
 from hsp2.hsp2io.protocols import SupportsReadTS, Category
 
@@ -79,7 +80,7 @@ def snow(io_manager:SupportsReadTS, siminfo, uci, ts):
     ts['KMELT'] = initm(siminfo, uci, vkmfg, 'MONTHLY_KMELT', u['KMELT'])
 
     ############################################################################
-    errors = _snow_(ui, ts)
+    errors = timed_kernel(_snow_, ui, ts)
     ############################################################################
 
     if siminfo['delt'] > 360 and int(siminfo['ICEFLG']):
@@ -88,7 +89,7 @@ def snow(io_manager:SupportsReadTS, siminfo, uci, ts):
     return errors, ERRMSGS
 
 
-@njit(cache=True)
+@njit(cache=True, nogil=True)
 def _snow_(ui, ts):
     ''' SNOW processing '''
     errors = zeros(int(ui['errlen'])).astype(int64)
@@ -586,7 +587,7 @@ def _snow_(ui, ts):
     return errors
 
 
-@njit(cache=True)
+@njit(cache=True, nogil=True)
 def vapor(SVP, temp):
     indx = (temp + 100.0) * 0.2 - 1.0
     lower = int(floor(indx))
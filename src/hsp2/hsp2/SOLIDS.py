@@ -7,6 +7,7 @@ Conversion of HSPF HIMPSLD.FOR module into Python'''
 from numpy import zeros, where, full, int64, float64
 from numba import njit
 from hsp2.hsp2.utilities import initm, make_numba_dict, hourflag
+from hsp2.hsp2.profiler import timed_kernel
 
 
 MFACTA = 1.0  # english units
@@ -43,13 +44,13 @@ def solids(io_manager, siminfo, uci, ts):
 	ts['DAYFG'] = hourflag(siminfo, 0, dofirst=True).astype(float64)
 
 	############################################################################
-	errors = _solids_(ui, ts)  # run SOLIDS simulation code
+	errors = timed_kernel(_solids_, ui, ts)  # run SOLIDS simulation code
 	############################################################################
 
 	return errors, ERRMSG
 
 
-@njit(cache=True)
+@njit(cache=True, nogil=True)
 def _solids_(ui, ts):
 	'''Accumulate and remove solids from the impervious land segment'''
 	errorsV = zeros(int(ui['errlen'])).astype(int64)
@@ -50,7 +50,7 @@ CALL: specl(ui, ts, step, state_info, state_paths, state_ix, specactions)
     specl_actions is a dictionary with all SPEC-ACTIONS entries
 '''
 
-@njit
+@njit(cache=True)
 def specl(ui, ts, step, state_info, state_paths, state_ix, specactions):
     # ther eis no need for _specl_ because this code must already be njit
     return
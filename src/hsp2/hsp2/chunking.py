@@ -0,0 +1,150 @@
+''' Copyright (c) 2020 by RESPEC, INC.
+Author: Robert Heaphy, Ph.D.
+License: LGPL2
+Time windows and state carry-over for chunked simulations
+'''
+
+import re
+from copy import deepcopy
+from pandas import DateOffset, Timedelta
+from pandas.tseries.offsets import Minute
+
+# results members whose last value is the initial value (uci STATES or
+# PARAMETERS entry of the same name) of a simulation restarted at that time
+states = {
+ ('PERLND','SNOW')   : ['COVINX','DULL','PACKF','PACKI','PACKW','PAKTMP','RDENPF','SKYCLR','XLNMLT'],
+ ('PERLND','PWATER') : ['AGWS','CEPS','GWVS','IFWS','LZS','SURS','UZS'],
+ ('PERLND','SEDMNT') : ['DETS'],
+ ('PERLND','PSTEMP') : ['AIRTC','SLTMP','ULTMP','LGTMP'],
+ ('PERLND','PWTGAS') : ['SOTMP','IOTMP','AOTMP','SODOX','SOCO2','IODOX','IOCO2','AODOX','AOCO2'],
+ ('IMPLND','SNOW')   : ['COVINX','DULL','PACKF','PACKI','PACKW','PAKTMP','RDENPF','SKYCLR','XLNMLT'],
+ ('IMPLND','IWATER') : ['RETS','SURS'],
+ ('IMPLND','SOLIDS') : ['SLDS'],
+ ('IMPLND','IWTGAS') : ['SOTMP','SODOX','SOCO2'],
+ ('RCHRES','HYDR')   : ['VOL'],
+ ('RCHRES','HTRCH')  : ['TW','AIRTMP'],
+ ('RCHRES','SEDTRN') : ['SSED1','SSED2','SSED3','BEDDEP'],
+ ('RCHRES','OXRX')   : ['DOX','BOD','SATDO'],
+ ('RCHRES','NUTRX')  : ['NO3','TAM','NO2','PO4'],
+ ('RCHRES','PLANK')  : ['PHYTO','ZOO','ORN','ORP','ORC','BENAL1','BENAL2','BENAL3','BENAL4'],
+ ('RCHRES','PHCARB') : ['TIC','CO2','PH']}
+
+# constituent activities: uci table and members per constituent, '#' is the constituent number;
+# the results member is the table prefix and member name, e.g. IQUAL1_SQO
+constituent_states = {
+ ('PERLND','PQUAL')  : ('PQUAL#_PARAMETERS', ['SQO']),
+ ('IMPLND','IQUAL')  : ('IQUAL#_PARAMETERS', ['SQO']),
+ ('RCHRES','CONS')   : ('CONS#',             ['CON']),
+ ('RCHRES','GQUAL')  : ('GQUAL#',            ['DQAL'])}
+
+# SNOW adds PACKI to the initial PACKF, its PACKF results include the ice
+_ADJUST = {'SNOW': {'PACKF': 'PACKI'}}
+
+_UNITS = {'Y': 'years', 'M': 'months', 'W': 'weeks', 'D': 'days'}
+
+
+def time_windows(start, stop, chunk):
+    '''
+    Splits [start, stop] into consecutive windows of length chunk.
+
+    Parameters
+    ----------
+    start, stop : Timestamp
+        Simulation start and stop.
+    chunk : str or DateOffset
+        Window length, a count and unit such as '5Y', '6M', '2W' or '30D'.
+
+    Returns
+    -------
+    list of (window start, window stop) Timestamps; the last window ends at stop
+    '''
+    if isinstance(chunk, str):
+        match = re.fullmatch(r'\s*(\d*)\s*([YMWD])\s*', chunk.upper())
+        if not match:
+            raise ValueError(f"chunk '{chunk}' is not a count and one of the units Y, M, W or D")
+        chunk = DateOffset(**{_UNITS[match.group(2)]: int(match.group(1) or 1)})
+
+    windows = []
+    window_start = start
+    count = 1
+    while window_start < stop:
+        window_stop = min(start + chunk * count, stop)
+        if window_stop <= window_start:
+            raise ValueError(f'chunk {chunk} does not advance the simulation')
+        windows.append((window_start, window_stop))
+        window_start = window_stop
+        count += 1
+    return windows
+
+
+def check_windows(windows, opseq):
+    '''every window boundary must fall on a time step of every operation'''
+    for delt in set(opseq.INDELT_minutes):
+        for window_start, _ in windows:
+            if (window_start - windows[0][0]) % Timedelta(Minute(int(delt))):
+                raise ValueError(f'window start {window_start} is not a multiple of DELT {delt} minutes')
+
+
+def carry_states(uci, operation, segment, ts):
+    '''
+    Copies the last value of the state members in ts into the uci tables of the
+    segment so the next time window starts from the end of this one. Values the
+    modules flag as undefined (-1.0E30) keep the previous initial value.
+    '''
+    flags = uci[(operation, 'GENERAL', segment)]['ACTIVITY']
+    for (op, activity), names in states.items():
+        if op == operation and flags.get(activity) and (operation, activity, segment) in uci:
+            ui = uci[(operation, activity, segment)]
+            values = _last_values(ts, names, names)
+            for name, adjust in _ADJUST.get(activity, {}).items():
+                if name in values and adjust in values:
+                    values[name] -= values[adjust]
+            for name, value in values.items():
+                table = next((t for t in ('STATES', 'PARAMETERS', 'FLAGS') if name in ui.get(t, {})), 'STATES')
+                ui.setdefault(table, {})[name] = value
+
+    for (op, activity), (table, names) in constituent_states.items():
+        if op == operation and flags.get(activity) and (operation, activity, segment) in uci:
+            ui = uci[(operation, activity, segment)]
+            index = 1
+            while table.replace('#', str(index)) in ui:
+                prefix = table.replace('#', str(index)).split('_')[0]
+                values = _last_values(ts, names, [f'{prefix}_{name}' for name in names])
+                ui[table.replace('#', str(index))].update(values)
+                index += 1
+
+
+def next_window_uci(initial, previous):
+    '''
+    The modules modify their uci tables while they run, so every time window
+    starts from a copy of the initial uci with the states carried over from
+    the previous window by carry_states.
+    '''
+    uci = deepcopy(initial)
+    for key, ui in previous.items():
+        if len(key) != 3 or key not in uci:
+            continue
+        operation, activity, segment = key
+        if (operation, activity) in states:
+            for table in ('STATES', 'PARAMETERS', 'FLAGS'):
+                for name in set(states[operation, activity]) & set(ui.get(table, {})):
+                    uci[key].setdefault(table, {})[name] = ui[table][name]
+        if (operation, activity) in constituent_states:
+            table, names = constituent_states[operation, activity]
+            index = 1
+            while table.replace('#', str(index)) in ui:
+                constituent = table.replace('#', str(index))
+                for name in set(names) & set(ui[constituent]):
+                    uci[key].setdefault(constituent, {})[name] = ui[constituent][name]
+                index += 1
+    return uci
+
+
+def _last_values(ts, names, members):
+    values = {}
+    for name, member in zip(names, members):
+        if member in ts and len(ts[member]):
+            value = float(ts[member][-1])
+            if value > -1.0e29:
+                values[name] = value
+    return values
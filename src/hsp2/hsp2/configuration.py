@@ -3,38 +3,35 @@ Author: Robert Heaphy, Ph.D.
 License: LGPL2
 '''
 
+from collections.abc import Mapping
+from importlib import import_module
 from numpy import zeros
 
 
-# new activity modules must be added here and in *activites* below
-from hsp2.hsp2.ATEMP  import atemp
-from hsp2.hsp2.SNOW   import snow
-from hsp2.hsp2.PWATER import pwater
-from hsp2.hsp2.SEDMNT import sedmnt
-from hsp2.hsp2.PSTEMP import pstemp
-from hsp2.hsp2.PWTGAS import pwtgas
-from hsp2.hsp2.PQUAL  import pqual
-
-from hsp2.hsp2.IWATER import iwater
-from hsp2.hsp2.SOLIDS import solids
-from hsp2.hsp2.IWTGAS import iwtgas
-from hsp2.hsp2.IQUAL  import iqual
-
-from hsp2.hsp2.HYDR   import hydr, expand_HYDR_masslinks
-from hsp2.hsp2.ADCALC import adcalc
-from hsp2.hsp2.HTRCH import htrch, expand_HTRCH_masslinks
-from hsp2.hsp2.SEDTRN import sedtrn, expand_SEDTRN_masslinks
-from hsp2.hsp2.CONS import cons, expand_CONS_masslinks
-from hsp2.hsp2.GQUAL import gqual, expand_GQUAL_masslinks
-from hsp2.hsp2.RQUAL import rqual
-from hsp2.hsp2.RQUAL import expand_OXRX_masslinks
-from hsp2.hsp2.RQUAL import expand_NUTRX_masslinks
-from hsp2.hsp2.RQUAL import expand_PLANK_masslinks
-from hsp2.hsp2.RQUAL import expand_PHCARB_masslinks
-
-#from hsp2.hsp2.GENER import gener
-from hsp2.hsp2.COPY import Copy
-from hsp2.hsp2.GENER import Gener
+class LazyActivities(Mapping):
+    '''
+    Activity functions by name. Entries given as 'MODULE.function' are imported
+    from hsp2.hsp2.MODULE on first access, so a run only imports (and compiles)
+    the activity modules its OP_SEQUENCE uses. Iterating gives the names in
+    execution order without importing anything.
+    '''
+    def __init__(self, entries):
+        self._entries = entries
+
+    def __getitem__(self, name):
+        entry = self._entries[name]
+        if isinstance(entry, str):
+            module, function = entry.rsplit('.', 1)
+            entry = getattr(import_module(f'hsp2.hsp2.{module}'), function)
+            self._entries[name] = entry
+        return entry
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
 
 def noop (store, siminfo, ui, ts):
     ERRMSGS = []
@@ -42,30 +39,53 @@ def noop (store, siminfo, ui, ts):
     return errors, ERRMSGS
 
 # Note: This is the ONLY place in HSP2 that defines activity execution order
-activities = {
-  'COPY' : Copy,
-  'GENER' : Gener,
-  'PERLND': {'ATEMP':atemp, 'SNOW':snow, 'PWATER':pwater, 'SEDMNT':sedmnt,
-     'PSTEMP':pstemp, 'PWTGAS':pwtgas, 'PQUAL':pqual, 'MSTLAY':noop, 'PEST':noop,
-     'NITR':noop, 'PHOS':noop, 'TRACER':noop},
-  'IMPLND': {'ATEMP':atemp, 'SNOW':snow, 'IWATER':iwater, 'SOLIDS':solids,
-     'IWTGAS':iwtgas, 'IQUAL':iqual},
-  'RCHRES': {'HYDR':hydr, 'ADCALC':adcalc, 'CONS':cons, 'HTRCH':htrch,
-     'SEDTRN':sedtrn, 'RQUAL':rqual, 'GQUAL':gqual, 'OXRX':noop, 'NUTRX':noop, 'PLANK':noop,
-     'PHCARB':noop}}
+# new activity modules must be added here as 'MODULE.function'
+activities = LazyActivities({
+  'COPY' : 'COPY.Copy',
+  'GENER' : 'GENER.Gener',
+  'PERLND': LazyActivities({'ATEMP':'ATEMP.atemp', 'SNOW':'SNOW.snow', 'PWATER':'PWATER.pwater',
+     'SEDMNT':'SEDMNT.sedmnt', 'PSTEMP':'PSTEMP.pstemp', 'PWTGAS':'PWTGAS.pwtgas', 'PQUAL':'PQUAL.pqual',
+     'MSTLAY':noop, 'PEST':noop, 'NITR':noop, 'PHOS':noop, 'TRACER':noop}),
+  'IMPLND': LazyActivities({'ATEMP':'ATEMP.atemp', 'SNOW':'SNOW.snow', 'IWATER':'IWATER.iwater',
+     'SOLIDS':'SOLIDS.solids', 'IWTGAS':'IWTGAS.iwtgas', 'IQUAL':'IQUAL.iqual'}),
+  'RCHRES': LazyActivities({'HYDR':'HYDR.hydr', 'ADCALC':'ADCALC.adcalc', 'CONS':'CONS.cons',
+     'HTRCH':'HTRCH.htrch', 'SEDTRN':'SEDTRN.sedtrn', 'RQUAL':'RQUAL.rqual', 'GQUAL':'GQUAL.gqual',
+     'OXRX':noop, 'NUTRX':noop, 'PLANK':noop, 'PHCARB':noop})})
+
+# expansion of ROFLOW and OFLOW mass links, by the RCHRES activity flag they depend on
+masslink_expanders = LazyActivities({
+  'HYDR':   'HYDR.expand_HYDR_masslinks',
+  'HTRCH':  'HTRCH.expand_HTRCH_masslinks',
+  'CONS':   'CONS.expand_CONS_masslinks',
+  'SEDTRN': 'SEDTRN.expand_SEDTRN_masslinks',
+  'GQUAL':  'GQUAL.expand_GQUAL_masslinks',
+  'OXRX':   'RQUAL.expand_OXRX_masslinks',
+  'NUTRX':  'RQUAL.expand_NUTRX_masslinks',
+  'PLANK':  'RQUAL.expand_PLANK_masslinks',
+  'PHCARB': 'RQUAL.expand_PHCARB_masslinks'})
+
+
+def load_activities(opseq, uci):
+    '''imports the activity modules of the activities that are active in an operation of opseq'''
+    for _, operation, segment, delt in opseq.itertuples():
+        if operation in ('COPY', 'GENER'):
+            activities[operation]
+            continue
+        flags = uci[(operation, 'GENERAL', segment)]['ACTIVITY']
+        for activity in activities[operation]:
+            if activity in flags and not flags[activity]:
+                continue
+            if activity == 'RQUAL' and not (flags['OXRX'] or flags['NUTRX'] or flags['PLANK'] or flags['PHCARB']):
+                continue
+            activities[operation][activity]
+
 
 def expand_masslinks(flags, uci, dat, recs):
-    recs = expand_HYDR_masslinks(flags, uci, dat, recs)
-    recs = expand_HTRCH_masslinks(flags, uci, dat, recs)
-    recs = expand_CONS_masslinks(flags, uci, dat, recs)
-    recs = expand_SEDTRN_masslinks(flags, uci, dat, recs)
-    recs = expand_GQUAL_masslinks(flags, uci, dat, recs)
-    recs = expand_OXRX_masslinks(flags, uci, dat, recs)
-    recs = expand_NUTRX_masslinks(flags, uci, dat, recs)
-    recs = expand_PLANK_masslinks(flags, uci, dat, recs)
-    recs = expand_PHCARB_masslinks(flags, uci, dat, recs)
+    for activity in masslink_expanders:
+        if flags[activity]:
+            recs = masslink_expanders[activity](flags, uci, dat, recs)
 
     return recs
 
 # NOTE: the flowtype (Python set) at the top of utilities.py may need to be
-# updated for new types of flows in new or modified HSP2 modules.
\ No newline at end of file
+# updated for new types of flows in new or modified HSP2 modules.
@@ -0,0 +1,116 @@
+''' Copyright (c) 2020 by RESPEC, INC.
+Author: Robert Heaphy, Ph.D.
+License: LGPL2
+Numba compile cache: location, status and ahead-of-time warm-up of the HSP2 kernels
+
+use_cache_dir and cache_status reach into Numba beyond its documented API
+(config.CACHE_DIR after import, the index file of a kernel's cache). They
+follow the Numba versions pyproject.toml allows; errors are not hidden, so
+a Numba change shows up instead of reporting every kernel as uncached.
+compile_stats, which main logs on every run, only uses dispatcher.stats.
+'''
+
+import os
+import sys
+from numba.core import config
+from numba.core.caching import FunctionCache
+from numba.core.dispatcher import Dispatcher
+from pandas import Timedelta
+
+# NUMBA_CACHE_DIR and config.CACHE_DIR before the first use_cache_dir, restored by use_cache_dir(None)
+_saved = None
+
+
+def kernels():
+    '''
+    Numba functions compiled with cache=True in the loaded hsp2 modules,
+    keyed by their qualified name, e.g. hsp2.hsp2.PWATER._pwater_
+    '''
+    found = {}
+    for name, module in list(sys.modules.items()):
+        if not name.startswith('hsp2.') or module is None:
+            continue
+        for value in list(vars(module).values()):
+            if (isinstance(value, Dispatcher) and value.py_func.__module__ == name
+              and isinstance(value._cache, FunctionCache)):
+                found[f'{name}.{value.__name__}'] = value
+    return found
+
+
+def use_cache_dir(path):
+    '''
+    Keeps the compiled kernels in path instead of the __pycache__ directories
+    next to the sources, which may not be writable in a shared installation.
+    The directory can be copied to other machines with the same hsp2 install
+    path and Numba version. None restores the location in use before the
+    first call, including a NUMBA_CACHE_DIR of the user's environment.
+    Process pool workers started later inherit the setting through NUMBA_CACHE_DIR.
+    '''
+    global _saved
+    if path is None:
+        if _saved is None:
+            return
+        environ, config.CACHE_DIR = _saved
+        _saved = None
+        if environ is None:
+            os.environ.pop('NUMBA_CACHE_DIR', None)
+        else:
+            os.environ['NUMBA_CACHE_DIR'] = environ
+    else:
+        if _saved is None:
+            _saved = (os.environ.get('NUMBA_CACHE_DIR'), config.CACHE_DIR)
+        path = os.path.abspath(path)
+        os.makedirs(path, exist_ok=True)
+        os.environ['NUMBA_CACHE_DIR'] = path
+        config.CACHE_DIR = path
+    for dispatcher in kernels().values():
+        dispatcher.enable_caching()
+
+
+def cache_status():
+    '''
+    Returns (cached, uncached) lists of kernel names; a kernel is cached when
+    the cache holds code compiled from its current source by this Numba version.
+    Cached kernels load without compiling on first call.
+    '''
+    cached, uncached = [], []
+    for name, dispatcher in sorted(kernels().items()):
+        overloads = dispatcher._cache._cache_file._load_index()
+        (cached if overloads else uncached).append(name)
+    return cached, uncached
+
+
+def compile_stats():
+    '''Numbers of kernel signatures loaded from the cache and compiled in this process'''
+    hits = misses = 0
+    for dispatcher in kernels().values():
+        hits += sum(dispatcher.stats.cache_hits.values())
+        misses += sum(dispatcher.stats.cache_misses.values())
+    return hits, misses
+
+
+def warmup(h5file, days=1):
+    '''
+    Compiles every kernel the model in h5file uses, for the signatures it uses,
+    into the compile cache by running the model for its first days. The model
+    file is only read, the results of the short run are discarded.
+    '''
+    from tempfile import TemporaryDirectory
+    from hsp2.hsp2.main import main
+    from hsp2.hsp2io.hdf import HDF5
+    from hsp2.hsp2io.io import IOManager
+
+    class ShortRun:
+        def __init__(self, model):
+            self._model = model
+
+        def read_uci(self, *args, **kwargs):
+            uci_obj = self._model.read_uci()
+            siminfo = uci_obj.siminfo
+            siminfo['stop'] = min(siminfo['stop'], siminfo['start'] + Timedelta(days=days))
+            return uci_obj
+
+    with TemporaryDirectory() as directory:
+        with HDF5(h5file, uci_snapshot=False) as model, HDF5(os.path.join(directory, 'warmup.h5')) as output:
+            main(IOManager(model, uci=ShortRun(model), output=output, log=output), saveall=True, jupyterlab=False)
+    return compile_stats()
@@ -3,33 +3,78 @@ Author: Robert Heaphy, Ph.D.
 License: LGPL2
 '''
 
-from re import S
 from numpy import float64, float32
 from pandas import DataFrame, date_range
 from pandas.tseries.offsets import Minute
 from datetime import datetime as dt
 from typing import Union
+from time import perf_counter
+from copy import deepcopy
 import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from hsp2.hsp2io.hdf import HDF5
-from hsp2.hsp2.utilities import versions, get_timeseries, expand_timeseries_names, save_timeseries, get_gener_timeseries
-from hsp2.hsp2.configuration import activities, noop, expand_masslinks
+from hsp2.hsp2.utilities import versions, get_timeseries, expand_timeseries_names, save_timeseries, get_gener_timeseries, clear_transforms
+from hsp2.hsp2.configuration import activities, noop, expand_masslinks, load_activities
 from hsp2.hsp2.state import init_state_dicts, state_siminfo_hsp2, state_load_dynamics_hsp2, state_init_hsp2, state_context_hsp2
 from hsp2.hsp2.om import om_init_state, state_om_model_run_prep, state_load_dynamics_om
 from hsp2.hsp2.SPECL import specl_load_state
-
-from hsp2.hsp2io.io import IOManager, SupportsReadTS, Category
-
-def main(io_manager:Union[str, IOManager], saveall:bool=False, jupyterlab:bool=True) -> None:
+from hsp2.hsp2.simcalendar import sim_calendar, clear_calendars
+from hsp2.hsp2.chunking import time_windows, check_windows, carry_states, next_window_uci
+from hsp2.hsp2.jitcache import compile_stats
+from hsp2.hsp2.profiler import Profile, kernel_seconds, peak_rss
+from hsp2.hsp2.memo import SegmentMemo
+from hsp2.hsp2.records import build_tables
+from hsp2.hsp2.scheduler import LAND_OPERATIONS, DeferredWriter, operation_levels, segment_uci, pack_ts, unpack_ts
+
+from hsp2.hsp2io.io import IOManager, SupportsReadTS, Category, WRITE_BUDGET
+
+def main(io_manager:Union[str, IOManager], saveall:bool=False, jupyterlab:bool=True, workers:int=1, chunk:Union[str,None]=None,
+        pwater_batch:bool=False, memoize:bool=False, prefetch:int=0, implnd_threads:int=1) -> None:
     """
     Run main HSP2 program.
     Parameters
     ----------
     io_manager
-        An instance of IOManager class.
+        An instance of IOManager class, or the path of a HDF5 model file, which
+        is opened with results written by a background thread.
     saveall: bool, default=False
         Saves all calculated data ignoring SAVE tables.
     jupyterlab: bool, default=True
         Flag for specific output behavior for  jupyter lab.
+    workers: int, default=1
+        Number of worker processes. When greater than 1, the OP_SEQUENCE is
+        grouped into LINKS dependency levels and the PERLND/IMPLND segments of
+        each level run on a process pool while RCHRES, COPY and GENER run in
+        OP_SEQUENCE order in this process. Not supported (ValueError) for
+        models with SPEC-ACTIONS or dynamic model components.
+    chunk: str, default=None
+        Run the whole OP_SEQUENCE over consecutive time windows of this length,
+        for example '5Y', '6M' or '30D', so memory is proportional to the window
+        instead of the simulation. The end STATES of each window are the initial
+        STATES of the next one and results are appended to the output. Not
+        supported (ValueError) for models with SPEC-ACTIONS or dynamic model
+        components.
+    pwater_batch: bool, default=False
+        Run the PWATER kernel of consecutive PERLND segments (same DELT) in
+        one call that simulates the segments in parallel threads. Segments
+        on the process pool (workers > 1) are not batched.
+    memoize: bool, default=False
+        PERLND and IMPLND segments with the same DELT, UCI tables of their
+        active activities and EXT_SOURCES inputs as an earlier segment save
+        the results of that segment instead of running (logged as 'same as').
+        Not used for segments on the process pool (workers > 1).
+    prefetch: int, default=0
+        Number of threads reading the EXT_SOURCES input timeseries into the
+        input cache, in OP_SEQUENCE order, while the simulation runs. 0 reads
+        each input when a segment first uses it.
+    implnd_threads: int, default=1
+        When greater than 1, consecutive IMPLND segments in the OP_SEQUENCE
+        run their whole activity chain (ATEMP to IQUAL, in activity order)
+        concurrently on this many threads; the IMPLND kernels release the
+        GIL. Results are written in OP_SEQUENCE order once the segments are
+        done, before the next non IMPLND operation. Segments on the process
+        pool (workers > 1) do not use the threads. Not supported (ValueError)
+        for models with SPEC-ACTIONS or dynamic model components.
     
     Return
     ------------
@@ -38,13 +83,16 @@ def main(io_manager:Union[str, IOManager], saveall:bool=False, jupyterlab:bool=T
     """
     if isinstance(io_manager, str):
         hdf5_instance = HDF5(io_manager)
-        io_manager = IOManager(hdf5_instance)
-    hdfname = io_manager._input.file_path
-    if not os.path.exists(hdfname):
+        io_manager = IOManager(hdf5_instance, write_budget=WRITE_BUDGET)
+    # input stores other than HDF5 (ArrayStore, Parquet) have no model file
+    hdfname = getattr(io_manager._input, 'file_path', None)
+    if hdfname is not None and not os.path.exists(hdfname):
         raise FileNotFoundError(f'{hdfname} HDF5 File Not Found')
 
     msg = messages()
     msg(1, f'Processing started for file {hdfname}; saveall={saveall}')
+    clear_calendars()
+    clear_transforms()
 
     # read user control, parameters, states, and flags uci and map to local variables
     uci_obj = io_manager.read_uci()
@@ -60,9 +108,12 @@ def main(io_manager:Union[str, IOManager], saveall:bool=False, jupyterlab:bool=T
     monthdata = uci_obj.monthdata
     
     start, stop = siminfo['start'], siminfo['stop']
+    if prefetch > 0:
+        io_manager.prefetch((row.SVOLNO for _, operation, segment, _ in opseq.itertuples()
+            for row in ddext_sources.get((operation, segment), [])), threads=prefetch)
 
-    copy_instances = {}
-    gener_instances = {}
+    # only the activity modules this model uses are imported
+    load_activities(opseq, uci)
 
     #######################################################################################
     # initialize STATE dicts
@@ -87,203 +138,171 @@ def main(io_manager:Union[str, IOManager], saveall:bool=False, jupyterlab:bool=T
 
     # main processing loop
     msg(1, f'Simulation Start: {start}, Stop: {stop}')
-    tscat = {}
-    for _, operation, segment, delt in opseq.itertuples():
-        msg(2, f'{operation} {segment} DELT(minutes): {delt}')
-        siminfo['delt'] = delt
-        siminfo['tindex'] = date_range(start, stop, freq=Minute(delt))[1:]
-        siminfo['steps'] = len(siminfo['tindex'])
-
-        if operation == 'COPY':
-            copy_instances[segment] = activities[operation](io_manager, siminfo, ddext_sources[(operation,segment)]) 
-        elif operation == 'GENER':
-            try:
-                ts = get_timeseries(io_manager, ddext_sources[(operation, segment)], siminfo)
-                ts = get_gener_timeseries(ts, gener_instances, ddlinks[segment], ddmasslinks)
-                get_flows(io_manager, ts, {}, uci, segment, ddlinks, ddmasslinks, siminfo['steps'], msg)
-                gener_instances[segment] = activities[operation](segment, siminfo, copy_instances, gener_instances, ddlinks, ddmasslinks, ts, ddgener)
-            except NotImplementedError as e:
-                print(f"GENER '{segment}' may not function correctly. '{e}'")
-        else:
-
-            # now conditionally execute all activity modules for the op, segment
-            ts = get_timeseries(io_manager,ddext_sources[(operation,segment)],siminfo)
-            ts = get_gener_timeseries(ts, gener_instances, ddlinks[segment],ddmasslinks)
-            flags = uci[(operation, 'GENERAL', segment)]['ACTIVITY']
-            if operation == 'RCHRES':
-                # Add nutrient adsorption flags:
-                if flags['NUTRX'] == 1:
-                    flags['TAMFG'] = uci[(operation, 'NUTRX', segment)]['FLAGS']['NH3FG']
-                    flags['ADNHFG'] = uci[(operation, 'NUTRX', segment)]['FLAGS']['ADNHFG']
-                    flags['PO4FG'] = uci[(operation, 'NUTRX', segment)]['FLAGS']['PO4FG']
-                    flags['ADPOFG'] = uci[(operation, 'NUTRX', segment)]['FLAGS']['ADPOFG']
-                
-                get_flows(io_manager, ts, flags, uci, segment, ddlinks, ddmasslinks, siminfo['steps'], msg)
-
-            for activity, function in activities[operation].items():
-                if function == noop: #or not flags[activity]:
-                    continue
-
-                if (activity in flags) and (not flags[activity]):
-                    continue
-
-                if (activity == 'RQUAL') and (not flags['OXRX']) and (not flags['NUTRX']) and (not flags['PLANK']) and (not flags['PHCARB']):
-                    continue
-
-                msg(3, f'{activity}')
-                # Set context for dynamic executables and special actions
-                state_context_hsp2(state, operation, segment, activity)
-                
-                ui = uci[(operation, activity, segment)]   # ui is a dictionary
-                if operation == 'PERLND' and activity == 'SEDMNT':
-                    # special exception here to make CSNOFG available
-                    ui['PARAMETERS']['CSNOFG'] = uci[(operation, 'PWATER', segment)]['PARAMETERS']['CSNOFG']
-                if operation == 'PERLND' and activity == 'PSTEMP':
-                    # special exception here to make AIRTFG available
-                    ui['PARAMETERS']['AIRTFG'] = flags['ATEMP']
-                if operation == 'PERLND' and activity == 'PWTGAS':
-                    # special exception here to make CSNOFG available
-                    ui['PARAMETERS']['CSNOFG'] = uci[(operation, 'PWATER', segment)]['PARAMETERS']['CSNOFG']
-                if operation == 'RCHRES':
-                    if not 'PARAMETERS' in ui:
-                        ui['PARAMETERS'] = {}
-                    ui['PARAMETERS']['NEXITS'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['NEXITS']
-                    if activity == 'ADCALC':
-                        ui['PARAMETERS']['ADFG'] = flags['ADCALC']
-                        ui['PARAMETERS']['KS']   = uci[(operation, 'HYDR', segment)]['PARAMETERS']['KS']
-                        ui['PARAMETERS']['VOL']  = uci[(operation, 'HYDR', segment)]['STATES']['VOL']
-                        ui['PARAMETERS']['ROS']  = uci[(operation, 'HYDR', segment)]['PARAMETERS']['ROS']
-                        nexits = uci[(operation, 'HYDR', segment)]['PARAMETERS']['NEXITS']
-                        for index in range(nexits):
-                            ui['PARAMETERS']['OS' + str(index + 1)] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['OS'+ str(index + 1)]
-                    if activity == 'HTRCH':
-                        ui['PARAMETERS']['ADFG'] = flags['ADCALC']
-                        ui['advectData'] = uci[(operation, 'ADCALC', segment)]['adcalcData']
-                        # ui['STATES']['VOL'] = uci[(operation, 'HYDR', segment)]['STATES']['VOL']
-                    if activity == 'CONS':
-                        ui['advectData'] = uci[(operation, 'ADCALC', segment)]['adcalcData']
-                    if activity == 'SEDTRN':
-                        ui['PARAMETERS']['ADFG'] = flags['ADCALC']
-                        ui['advectData'] = uci[(operation, 'ADCALC', segment)]['adcalcData']
-                        # ui['STATES']['VOL'] = uci[(operation, 'HYDR', segment)]['STATES']['VOL']
-                        ui['PARAMETERS']['HTFG'] = flags['HTRCH']
-                        ui['PARAMETERS']['AUX3FG'] = 0
-                        if flags['HYDR']:
-                            ui['PARAMETERS']['LEN'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['LEN']
-                            ui['PARAMETERS']['DELTH'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['DELTH']
-                            ui['PARAMETERS']['DB50'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['DB50']
-                            ui['PARAMETERS']['AUX3FG'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['AUX3FG']
-                    if activity == 'GQUAL':
-                        ui['advectData'] = uci[(operation, 'ADCALC', segment)]['adcalcData']
-                        ui['PARAMETERS']['HTFG'] = flags['HTRCH']
-                        ui['PARAMETERS']['SEDFG'] = flags['SEDTRN']
-                        # ui['PARAMETERS']['REAMFG'] = uci[(operation, 'OXRX', segment)]['PARAMETERS']['REAMFG']
-                        ui['PARAMETERS']['HYDRFG'] = flags['HYDR']
-                        if flags['HYDR']:
-                            ui['PARAMETERS']['LKFG'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['LKFG']
-                            ui['PARAMETERS']['AUX1FG'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['AUX1FG']
-                            ui['PARAMETERS']['AUX2FG'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['AUX2FG']
-                            ui['PARAMETERS']['LEN'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['LEN']
-                            ui['PARAMETERS']['DELTH'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['DELTH']
-                        if flags['OXRX']:
-                            ui['PARAMETERS']['LKFG'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['LKFG']
-                            ui['PARAMETERS']['CFOREA'] = uci[(operation, 'OXRX', segment)]['PARAMETERS']['CFOREA']
-                        if flags['SEDTRN']:
-                            ui['PARAMETERS']['SSED1'] = uci[(operation, 'SEDTRN', segment)]['STATES']['SSED1']
-                            ui['PARAMETERS']['SSED2'] = uci[(operation, 'SEDTRN', segment)]['STATES']['SSED2']
-                            ui['PARAMETERS']['SSED3'] = uci[(operation, 'SEDTRN', segment)]['STATES']['SSED3']
-                        if flags['HTRCH']:
-                            ui['PARAMETERS']['CFSAEX'] = uci[(operation, 'HTRCH', segment)]['PARAMETERS']['CFSAEX']
-                        elif flags['PLANK']:
-                            if 'CFSAEX' in uci[(operation, 'PLANK', segment)]['PARAMETERS']:
-                                ui['PARAMETERS']['CFSAEX'] = uci[(operation, 'PLANK', segment)]['PARAMETERS']['CFSAEX']
+    # SPEC-ACTIONS and dynamic model components act on the STATE of this process
+    stateful = state['state_step_hydr'] == 'enabled' or len(state['model_exec_list']) > 1
+    if workers > 1 and stateful:
+        raise ValueError('workers > 1 is not supported with SPEC-ACTIONS or dynamic model components')
+    if implnd_threads > 1 and stateful:
+        raise ValueError('implnd_threads > 1 is not supported with SPEC-ACTIONS or dynamic model components')
+    if workers > 1:
+        levels = operation_levels(opseq, ddlinks)
+        pool = ProcessPoolExecutor(max_workers=workers)
+    else:
+        levels = [[(operation, segment, delt) for _, operation, segment, delt in opseq.itertuples()]]
+        pool = None
+    threads = ThreadPoolExecutor(max_workers=implnd_threads) if implnd_threads > 1 and pool is None else None
+    profile = Profile()
+    if pwater_batch:
+        from hsp2.hsp2.PWATER import PwaterBatch   # only imported for models that batch PWATER
+    windows = [(start, stop)]
+    if chunk is not None:
+        windows = time_windows(start, stop, chunk)
+        check_windows(windows, opseq)
+        if state['state_step_hydr'] == 'enabled' or len(state['model_exec_list']) > 1:
+            raise ValueError('chunk is not supported with SPEC-ACTIONS or dynamic model components')
+    siminfo['chunk'] = chunk if len(windows) > 1 else None
+    if len(windows) > 1:
+        initial_uci = deepcopy(uci)
+
+    for window, (window_start, window_stop) in enumerate(windows):
+        if len(windows) > 1:
+            msg(1, f'Window Start: {window_start}, Stop: {window_stop}')
+            if window > 0:
+                uci = next_window_uci(initial_uci, uci)
+            siminfo['start'], siminfo['stop'] = window_start, window_stop
+            clear_calendars()
+            clear_transforms()
+            io_manager.begin_window(window == 0, window == len(windows) - 1, window_start, window_stop)
+        # parameter records of the kernels that take them, rebuilt as each window has its own UCI
+        build_tables(uci)
+
+        # upstream results are held in memory until every segment reading them through get_flows has run
+        io_manager.bus.set_consumers(((link.SVOL, link.SVOLNO), segment)
+            for _, operation, segment, delt in opseq.itertuples() if operation in {'RCHRES', 'GENER'}
+            for link in ddlinks[segment])
+        copy_instances = {}
+        gener_instances = {}
+        memo = None
+        if memoize and pool is None:
+            memo = SegmentMemo(opseq, uci, ddext_sources, ddlinks)
+            if len(memo):
+                msg(1, f'{len(memo)} land segments repeat an earlier segment and reuse its results')
+
+        for level in levels:
+            pending = []
+            batch, batched = None, []
+            threaded = []
+            for operation, segment, delt in level:
+                if threaded and (operation != 'IMPLND' or (memo is not None and
+                 memo.aliases.get((operation, segment)) in {member for member, _, _, _ in threaded})):
+                    # later operations read the IMPLND results, an alias needs its original's
+                    collect_threaded(threaded, io_manager, uci, memo, siminfo, msg, profile)
+                    threaded = []
+                if batch is not None and (operation != 'PERLND' or delt != siminfo['delt']):
+                    run_pwater_batch(io_manager, siminfo, uci, batch, batched, ftables, state, monthdata, saveall, jupyterlab, msg, profile)
+                    batch, batched = None, []
+                siminfo['delt'] = delt
+                calendar = sim_calendar(siminfo)
+                siminfo['tindex'] = calendar.tindex
+                siminfo['steps'] = calendar.steps
+
+                if operation == 'COPY':
+                    msg(2, f'{operation} {segment} DELT(minutes): {delt}')
+                    with profile.phase('INPUT', io_manager, operation, segment):
+                        copy_instances[segment] = activities[operation](io_manager, siminfo, ddext_sources[(operation,segment)]) 
+                elif operation == 'GENER':
+                    msg(2, f'{operation} {segment} DELT(minutes): {delt}')
+                    try:
+                        with profile.phase('INPUT', io_manager, operation, segment):
+                            ts = get_timeseries(io_manager, ddext_sources[(operation, segment)], siminfo)
+                            ts = get_gener_timeseries(ts, gener_instances, ddlinks[segment], ddmasslinks)
+                            get_flows(io_manager, ts, {}, uci, segment, ddlinks, ddmasslinks, siminfo['steps'], msg)
+                        with profile.phase('SETUP', io_manager, operation, segment):
+                            gener_instances[segment] = activities[operation](segment, siminfo, copy_instances, gener_instances, ddlinks, ddmasslinks, ts, ddgener)
+                    except NotImplementedError as e:
+                        print(f"GENER '{segment}' may not function correctly. '{e}'")
+                else:
+                    reused = memo.reuse(operation, segment, siminfo) if memo is not None and operation in LAND_OPERATIONS else None
+                    if reused is not None:
+                        original, original_ts = reused
+                        msg(2, f'{operation} {segment} DELT(minutes): {delt} same as {original}, results reused')
+                        flags = uci[(operation, 'GENERAL', segment)]['ACTIVITY']
+                        if any(original == member for member, _, _, alias in batched if alias is None):
+                            # the results of the original are complete once the batch has run
+                            batched.append((segment, original_ts, flags, original))
+                        else:
+                            save_alias(io_manager, siminfo, uci, operation, segment, original_ts, flags, saveall, jupyterlab, profile)
+                        continue
+
+                    # now conditionally execute all activity modules for the op, segment
+                    with profile.phase('INPUT', io_manager, operation, segment):
+                        ts = get_timeseries(io_manager,ddext_sources[(operation,segment)],siminfo)
+                        ts = get_gener_timeseries(ts, gener_instances, ddlinks[segment],ddmasslinks)
+                    if pool is not None and operation in LAND_OPERATIONS:
+                        # land segments run on the process pool, results are written by collect_operation()
+                        pooled_siminfo = {key: value for key, value in siminfo.items() if key != 'ICEFG'}
+                        future = pool.submit(run_pooled_operation, operation, segment, delt, pooled_siminfo,
+                            segment_uci(uci, operation, segment), pack_ts(ts), saveall, jupyterlab)
+                        pending.append(future)
+                        continue
+
+                    msg(2, f'{operation} {segment} DELT(minutes): {delt}')
+                    flags = uci[(operation, 'GENERAL', segment)]['ACTIVITY']
+                    if operation == 'RCHRES':
+                        # Add nutrient adsorption flags:
+                        if flags['NUTRX'] == 1:
+                            flags['TAMFG'] = uci[(operation, 'NUTRX', segment)]['FLAGS']['NH3FG']
+                            flags['ADNHFG'] = uci[(operation, 'NUTRX', segment)]['FLAGS']['ADNHFG']
+                            flags['PO4FG'] = uci[(operation, 'NUTRX', segment)]['FLAGS']['PO4FG']
+                            flags['ADPOFG'] = uci[(operation, 'NUTRX', segment)]['FLAGS']['ADPOFG']
                     
-                    if activity == 'RQUAL':
-                        # RQUAL inputs:
-                        ui['advectData'] = uci[(operation, 'ADCALC', segment)]['adcalcData']
-                        if flags['HYDR']:
-                            ui['PARAMETERS']['LKFG'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['LKFG']
-
-                        ui['FLAGS']['HTFG'] = flags['HTRCH']
-                        ui['FLAGS']['SEDFG'] = flags['SEDTRN']
-                        ui['FLAGS']['GQFG'] = flags['GQUAL']
-                        ui['FLAGS']['OXFG'] = flags['OXFG']
-                        ui['FLAGS']['NUTFG'] = flags['NUTRX']
-                        ui['FLAGS']['PLKFG'] = flags['PLANK']
-                        ui['FLAGS']['PHFG'] = flags['PHCARB']
-                        if flags['CONS']:
-                            if 'PARAMETERS' in uci[(operation, 'CONS', segment)]:
-                                if 'NCONS' in uci[(operation, 'CONS', segment)]['PARAMETERS']:
-                                    ui['PARAMETERS']['NCONS'] = uci[(operation, 'CONS', segment)]['PARAMETERS']['NCONS']
-
-                        # OXRX module inputs:
-                        ui_oxrx = uci[(operation, 'OXRX', segment)] 
-                        
-                        if flags['HYDR']:
-                            ui_oxrx['PARAMETERS']['LEN'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['LEN']
-                            ui_oxrx['PARAMETERS']['DELTH'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['DELTH']
-                        
-                        if flags['HTRCH']:
-                            ui_oxrx['PARAMETERS']['ELEV'] = uci[(operation, 'HTRCH', segment)]['PARAMETERS']['ELEV']
-
-                        if flags['SEDTRN']:
-                            ui['PARAMETERS']['SSED1'] = uci[(operation, 'SEDTRN', segment)]['STATES']['SSED1']
-                            ui['PARAMETERS']['SSED2'] = uci[(operation, 'SEDTRN', segment)]['STATES']['SSED2']
-                            ui['PARAMETERS']['SSED3'] = uci[(operation, 'SEDTRN', segment)]['STATES']['SSED3']
-
-                        # PLANK module inputs:
-                        if flags['HTRCH']:
-                            ui['PARAMETERS']['CFSAEX'] = uci[(operation, 'HTRCH', segment)]['PARAMETERS']['CFSAEX']
-
-                        # NUTRX, PLANK, PHCARB module inputs:
-                        ui_nutrx = uci[(operation, 'NUTRX', segment)] 
-                        ui_plank = uci[(operation, 'PLANK', segment)] 
-                        ui_phcarb = uci[(operation, 'PHCARB', segment)] 
-
-                ############ calls activity function like snow() ##############
-                if operation not in ['COPY','GENER']:
-                    if (activity == 'HYDR'):
-                        errors, errmessages = function(io_manager, siminfo, ui, ts, ftables, state)
-                    elif (activity == 'SEDTRN'):
-                        errors, errmessages = function(io_manager, siminfo, ui, ts, state)
-                    elif (activity != 'RQUAL'):
-                        errors, errmessages = function(io_manager, siminfo, ui, ts)
-                    else:                    
-                        errors, errmessages = function(io_manager, siminfo, ui, ui_oxrx, ui_nutrx, ui_plank, ui_phcarb, ts, monthdata)
-                ###############################################################
-
-                for errorcnt, errormsg in zip(errors, errmessages):
-                    if errorcnt > 0:
-                        msg(4, f'Error count {errorcnt}: {errormsg}')
-
-                # default to hourly output
-                outstep = 2
-                outstep_oxrx = 2
-                outstep_nutrx = 2
-                outstep_plank = 2
-                outstep_phcarb = 2
-                if 'BINOUT' in uci[(operation, 'GENERAL', segment)]:
-                    if activity in uci[(operation, 'GENERAL', segment)]['BINOUT']:
-                        outstep = uci[(operation, 'GENERAL', segment)]['BINOUT'][activity]
-                    elif activity == 'RQUAL':
-                        outstep_oxrx = uci[(operation, 'GENERAL', segment)]['BINOUT']['OXRX']
-                        outstep_nutrx = uci[(operation, 'GENERAL', segment)]['BINOUT']['NUTRX']
-                        outstep_plank = uci[(operation, 'GENERAL', segment)]['BINOUT']['PLANK']
-                        outstep_phcarb = uci[(operation, 'GENERAL', segment)]['BINOUT']['PHCARB']
-
-                if 'SAVE' in ui:
-                    save_timeseries(io_manager,ts,ui['SAVE'],siminfo,saveall,operation,segment,activity,jupyterlab,outstep)
-    
-                if (activity == 'RQUAL'):
-                    if 'SAVE' in ui_oxrx:   save_timeseries(io_manager,ts,ui_oxrx['SAVE'],siminfo,saveall,operation,segment,'OXRX',jupyterlab,outstep_oxrx)
-                    if 'SAVE' in ui_nutrx and flags['NUTRX'] == 1:   save_timeseries(io_manager,ts,ui_nutrx['SAVE'],siminfo,saveall,operation,segment,'NUTRX',jupyterlab,outstep_nutrx)
-                    if 'SAVE' in ui_plank and flags['PLANK'] == 1:  save_timeseries(io_manager,ts,ui_plank['SAVE'],siminfo,saveall,operation,segment,'PLANK',jupyterlab,outstep_plank)
-                    if 'SAVE' in ui_phcarb and flags['PHCARB'] == 1:   save_timeseries(io_manager,ts,ui_phcarb['SAVE'],siminfo,saveall,operation,segment,'PHCARB',jupyterlab,outstep_phcarb)
+                        with profile.phase('INPUT', io_manager, operation, segment):
+                            get_flows(io_manager, ts, flags, uci, segment, ddlinks, ddmasslinks, siminfo['steps'], msg)
+
+                    icefg = siminfo.get('ICEFG')
+                    if threads is not None and operation == 'IMPLND':
+                        # each segment gets its own siminfo, the IMPLND modules write to it
+                        threaded_siminfo = {key: value for key, value in siminfo.items() if key != 'ICEFG'}
+                        future = threads.submit(run_deferred_operation, operation, segment, delt, threaded_siminfo,
+                            segment_uci(uci, operation, segment), ts, saveall, jupyterlab)
+                        threaded.append((segment, ts, icefg, future))
+                        continue
+                    if pwater_batch and operation == 'PERLND' and flags['PWATER']:
+                        # runs the activities before PWATER and adds the segment to the batch
+                        batch = batch if batch is not None else PwaterBatch()
+                        run_activities(io_manager, siminfo, uci, operation, segment, ts, flags, ftables, state, monthdata, saveall, jupyterlab, msg, profile, batch)
+                        batched.append((segment, ts, flags, None))
+                    else:
+                        run_activities(io_manager, siminfo, uci, operation, segment, ts, flags, ftables, state, monthdata, saveall, jupyterlab, msg, profile)
+                    if memo is not None:
+                        memo.record(operation, segment, ts, icefg, siminfo)
+
+            if threaded:
+                collect_threaded(threaded, io_manager, uci, memo, siminfo, msg, profile)
+            if batch is not None:
+                run_pwater_batch(io_manager, siminfo, uci, batch, batched, ftables, state, monthdata, saveall, jupyterlab, msg, profile)
+            for future in pending:
+                collect_operation(future, io_manager, uci, msg, profile)
+
+    if pool is not None:
+        pool.shutdown()
+    if threads is not None:
+        threads.shutdown()
+    io_manager.end_prefetch()
+    if len(windows) > 1:
+        io_manager.end_windows()
+        siminfo['start'], siminfo['stop'] = start, stop
+    io_manager.flush()
+    stats = io_manager.cache.stats()
+    msg(1, f"Input cache: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions")
+    hits, misses = compile_stats()
+    msg(1, f'Numba cache: {hits} kernel signatures loaded, {misses} compiled')
 
     msglist = msg(1, 'Done', final=True)
 
     df = DataFrame(msglist, columns=['logfile'])
     io_manager.write_log(df)
+    io_manager.write_profile(profile.to_dataframe())
 
     if jupyterlab:
         df = versions(['jupyterlab', 'notebook'])
@@ -291,6 +310,260 @@ def main(io_manager:Union[str, IOManager], saveall:bool=False, jupyterlab:bool=T
         print('\n\n', df)
     return
 
+def run_activities(io_manager, siminfo, uci, operation, segment, ts, flags, ftables, state, monthdata, saveall, jupyterlab, msg, profile=None, batch=None):
+    '''Runs the active modules of one PERLND, IMPLND or RCHRES segment in activity order and saves their results.
+    With a PwaterBatch the call stops once the segment is added to the batch; after the batch has run
+    the same call resumes the segment at PWATER.'''
+    if profile is None:
+        profile = Profile()
+    resume = batch is not None and batch.done
+    for activity in activities[operation]:
+        if resume and activity != 'PWATER':
+            continue
+
+        if (activity in flags) and (not flags[activity]):
+            continue
+
+        if (activity == 'RQUAL') and (not flags['OXRX']) and (not flags['NUTRX']) and (not flags['PLANK']) and (not flags['PHCARB']):
+            continue
+
+        start, kernel = perf_counter(), kernel_seconds()
+        function = activities[operation][activity]   # imports the activity module on first use
+        if function == noop:
+            continue
+
+        if not resume:
+            msg(3, f'{activity}')   # a resumed PWATER was reported when it joined the batch
+        resume = False
+        # Set context for dynamic executables and special actions
+        state_context_hsp2(state, operation, segment, activity)
+        
+        ui = uci[(operation, activity, segment)]   # ui is a dictionary
+        if operation == 'PERLND' and activity == 'SEDMNT':
+            # special exception here to make CSNOFG available
+            ui['PARAMETERS']['CSNOFG'] = uci[(operation, 'PWATER', segment)]['PARAMETERS']['CSNOFG']
+        if operation == 'PERLND' and activity == 'PSTEMP':
+            # special exception here to make AIRTFG available
+            ui['PARAMETERS']['AIRTFG'] = flags['ATEMP']
+        if operation == 'PERLND' and activity == 'PWTGAS':
+            # special exception here to make CSNOFG available
+            ui['PARAMETERS']['CSNOFG'] = uci[(operation, 'PWATER', segment)]['PARAMETERS']['CSNOFG']
+        if operation == 'RCHRES':
+            if not 'PARAMETERS' in ui:
+                ui['PARAMETERS'] = {}
+            ui['PARAMETERS']['NEXITS'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['NEXITS']
+            if activity == 'ADCALC':
+                ui['PARAMETERS']['ADFG'] = flags['ADCALC']
+                ui['PARAMETERS']['KS']   = uci[(operation, 'HYDR', segment)]['PARAMETERS']['KS']
+                ui['PARAMETERS']['VOL']  = uci[(operation, 'HYDR', segment)]['STATES']['VOL']
+                ui['PARAMETERS']['ROS']  = uci[(operation, 'HYDR', segment)]['PARAMETERS']['ROS']
+                nexits = uci[(operation, 'HYDR', segment)]['PARAMETERS']['NEXITS']
+                for index in range(nexits):
+                    ui['PARAMETERS']['OS' + str(index + 1)] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['OS'+ str(index + 1)]
+            if activity == 'HTRCH':
+                ui['PARAMETERS']['ADFG'] = flags['ADCALC']
+                ui['advectData'] = uci[(operation, 'ADCALC', segment)]['adcalcData']
+                # ui['STATES']['VOL'] = uci[(operation, 'HYDR', segment)]['STATES']['VOL']
+            if activity == 'CONS':
+                ui['advectData'] = uci[(operation, 'ADCALC', segment)]['adcalcData']
+            if activity == 'SEDTRN':
+                ui['PARAMETERS']['ADFG'] = flags['ADCALC']
+                ui['advectData'] = uci[(operation, 'ADCALC', segment)]['adcalcData']
+                # ui['STATES']['VOL'] = uci[(operation, 'HYDR', segment)]['STATES']['VOL']
+                ui['PARAMETERS']['HTFG'] = flags['HTRCH']
+                ui['PARAMETERS']['AUX3FG'] = 0
+                if flags['HYDR']:
+                    ui['PARAMETERS']['LEN'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['LEN']
+                    ui['PARAMETERS']['DELTH'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['DELTH']
+                    ui['PARAMETERS']['DB50'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['DB50']
+                    ui['PARAMETERS']['AUX3FG'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['AUX3FG']
+            if activity == 'GQUAL':
+                ui['advectData'] = uci[(operation, 'ADCALC', segment)]['adcalcData']
+                ui['PARAMETERS']['HTFG'] = flags['HTRCH']
+                ui['PARAMETERS']['SEDFG'] = flags['SEDTRN']
+                # ui['PARAMETERS']['REAMFG'] = uci[(operation, 'OXRX', segment)]['PARAMETERS']['REAMFG']
+                ui['PARAMETERS']['HYDRFG'] = flags['HYDR']
+                if flags['HYDR']:
+                    ui['PARAMETERS']['LKFG'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['LKFG']
+                    ui['PARAMETERS']['AUX1FG'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['AUX1FG']
+                    ui['PARAMETERS']['AUX2FG'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['AUX2FG']
+                    ui['PARAMETERS']['LEN'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['LEN']
+                    ui['PARAMETERS']['DELTH'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['DELTH']
+                if flags['OXRX']:
+                    ui['PARAMETERS']['LKFG'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['LKFG']
+                    ui['PARAMETERS']['CFOREA'] = uci[(operation, 'OXRX', segment)]['PARAMETERS']['CFOREA']
+                if flags['SEDTRN']:
+                    ui['PARAMETERS']['SSED1'] = uci[(operation, 'SEDTRN', segment)]['STATES']['SSED1']
+                    ui['PARAMETERS']['SSED2'] = uci[(operation, 'SEDTRN', segment)]['STATES']['SSED2']
+                    ui['PARAMETERS']['SSED3'] = uci[(operation, 'SEDTRN', segment)]['STATES']['SSED3']
+                if flags['HTRCH']:
+                    ui['PARAMETERS']['CFSAEX'] = uci[(operation, 'HTRCH', segment)]['PARAMETERS']['CFSAEX']
+                elif flags['PLANK']:
+                    if 'CFSAEX' in uci[(operation, 'PLANK', segment)]['PARAMETERS']:
+                        ui['PARAMETERS']['CFSAEX'] = uci[(operation, 'PLANK', segment)]['PARAMETERS']['CFSAEX']
+            
+            if activity == 'RQUAL':
+                # RQUAL inputs:
+                ui['advectData'] = uci[(operation, 'ADCALC', segment)]['adcalcData']
+                if flags['HYDR']:
+                    ui['PARAMETERS']['LKFG'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['LKFG']
+
+                ui['FLAGS']['HTFG'] = flags['HTRCH']
+                ui['FLAGS']['SEDFG'] = flags['SEDTRN']
+                ui['FLAGS']['GQFG'] = flags['GQUAL']
+                ui['FLAGS']['OXFG'] = flags['OXFG']
+                ui['FLAGS']['NUTFG'] = flags['NUTRX']
+                ui['FLAGS']['PLKFG'] = flags['PLANK']
+                ui['FLAGS']['PHFG'] = flags['PHCARB']
+                if flags['CONS']:
+                    if 'PARAMETERS' in uci[(operation, 'CONS', segment)]:
+                        if 'NCONS' in uci[(operation, 'CONS', segment)]['PARAMETERS']:
+                            ui['PARAMETERS']['NCONS'] = uci[(operation, 'CONS', segment)]['PARAMETERS']['NCONS']
+
+                # OXRX module inputs:
+                ui_oxrx = uci[(operation, 'OXRX', segment)] 
+                
+                if flags['HYDR']:
+                    ui_oxrx['PARAMETERS']['LEN'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['LEN']
+                    ui_oxrx['PARAMETERS']['DELTH'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['DELTH']
+                
+                if flags['HTRCH']:
+                    ui_oxrx['PARAMETERS']['ELEV'] = uci[(operation, 'HTRCH', segment)]['PARAMETERS']['ELEV']
+
+                if flags['SEDTRN']:
+                    ui['PARAMETERS']['SSED1'] = uci[(operation, 'SEDTRN', segment)]['STATES']['SSED1']
+                    ui['PARAMETERS']['SSED2'] = uci[(operation, 'SEDTRN', segment)]['STATES']['SSED2']
+                    ui['PARAMETERS']['SSED3'] = uci[(operation, 'SEDTRN', segment)]['STATES']['SSED3']
+
+                # PLANK module inputs:
+                if flags['HTRCH']:
+                    ui['PARAMETERS']['CFSAEX'] = uci[(operation, 'HTRCH', segment)]['PARAMETERS']['CFSAEX']
+
+                # NUTRX, PLANK, PHCARB module inputs:
+                ui_nutrx = uci[(operation, 'NUTRX', segment)] 
+                ui_plank = uci[(operation, 'PLANK', segment)] 
+                ui_phcarb = uci[(operation, 'PHCARB', segment)] 
+
+        ############ calls activity function like snow() ##############
+        if operation not in ['COPY','GENER']:
+            if batch is not None and activity == 'PWATER':
+                if not batch.done:
+                    batch.add(segment, siminfo, ui, ts)
+                    profile.add(operation, segment, activity, SETUP=perf_counter() - start, PEAK_RSS=peak_rss())
+                    return
+                errors, errmessages = batch.result(segment)
+            elif (activity == 'HYDR'):
+                errors, errmessages = function(io_manager, siminfo, ui, ts, ftables, state)
+            elif (activity == 'SEDTRN'):
+                errors, errmessages = function(io_manager, siminfo, ui, ts, state)
+            elif (activity != 'RQUAL'):
+                errors, errmessages = function(io_manager, siminfo, ui, ts)
+            else:                    
+                errors, errmessages = function(io_manager, siminfo, ui, ui_oxrx, ui_nutrx, ui_plank, ui_phcarb, ts, monthdata)
+        ###############################################################
+        kernel = kernel_seconds() - kernel
+        profile.add(operation, segment, activity, SETUP=perf_counter() - start - kernel, KERNEL=kernel, PEAK_RSS=peak_rss())
+
+        for errorcnt, errormsg in zip(errors, errmessages):
+            if errorcnt > 0:
+                msg(4, f'Error count {errorcnt}: {errormsg}')
+
+        # default to hourly output
+        outstep = 2
+        outstep_oxrx = 2
+        outstep_nutrx = 2
+        outstep_plank = 2
+        outstep_phcarb = 2
+        if 'BINOUT' in uci[(operation, 'GENERAL', segment)]:
+            if activity in uci[(operation, 'GENERAL', segment)]['BINOUT']:
+                outstep = uci[(operation, 'GENERAL', segment)]['BINOUT'][activity]
+            elif activity == 'RQUAL':
+                outstep_oxrx = uci[(operation, 'GENERAL', segment)]['BINOUT']['OXRX']
+                outstep_nutrx = uci[(operation, 'GENERAL', segment)]['BINOUT']['NUTRX']
+                outstep_plank = uci[(operation, 'GENERAL', segment)]['BINOUT']['PLANK']
+                outstep_phcarb = uci[(operation, 'GENERAL', segment)]['BINOUT']['PHCARB']
+
+        with profile.phase('SAVE', io_manager, operation, segment, activity):
+            if 'SAVE' in ui:
+                save_timeseries(io_manager,ts,ui['SAVE'],siminfo,saveall,operation,segment,activity,jupyterlab,outstep)
+
+            if (activity == 'RQUAL'):
+                if 'SAVE' in ui_oxrx:   save_timeseries(io_manager,ts,ui_oxrx['SAVE'],siminfo,saveall,operation,segment,'OXRX',jupyterlab,outstep_oxrx)
+                if 'SAVE' in ui_nutrx and flags['NUTRX'] == 1:   save_timeseries(io_manager,ts,ui_nutrx['SAVE'],siminfo,saveall,operation,segment,'NUTRX',jupyterlab,outstep_nutrx)
+                if 'SAVE' in ui_plank and flags['PLANK'] == 1:  save_timeseries(io_manager,ts,ui_plank['SAVE'],siminfo,saveall,operation,segment,'PLANK',jupyterlab,outstep_plank)
+                if 'SAVE' in ui_phcarb and flags['PHCARB'] == 1:   save_timeseries(io_manager,ts,ui_phcarb['SAVE'],siminfo,saveall,operation,segment,'PHCARB',jupyterlab,outstep_phcarb)
+
+    if siminfo.get('chunk'):
+        # the next time window starts from the end states of this one
+        carry_states(uci, operation, segment, ts)
+    return
+
+def run_pwater_batch(io_manager, siminfo, uci, batch, batched, ftables, state, monthdata, saveall, jupyterlab, msg, profile):
+    '''Runs the PWATER kernel of the batched PERLND segments, then their remaining activities'''
+    msg(2, f'PERLND PWATER batch of {len(batch)} segments')
+    with profile.phase('KERNEL', io_manager, 'PERLND', 'BATCH', 'PWATER'):
+        batch.run()
+    for segment, ts, flags, original in batched:
+        if original is None:
+            run_activities(io_manager, siminfo, uci, 'PERLND', segment, ts, flags, ftables, state, monthdata, saveall, jupyterlab, msg, profile, batch)
+        else:
+            save_alias(io_manager, siminfo, uci, 'PERLND', segment, ts, flags, saveall, jupyterlab, profile)
+    return
+
+def save_alias(io_manager, siminfo, uci, operation, segment, ts, flags, saveall, jupyterlab, profile):
+    '''Saves the results (ts) of an identical, earlier land segment as the results of segment'''
+    binout = uci[(operation, 'GENERAL', segment)].get('BINOUT', {})
+    for activity in activities[operation]:
+        if (activity in flags) and (not flags[activity]):
+            continue
+        if activities[operation][activity] == noop:
+            continue
+        ui = uci[(operation, activity, segment)]
+        with profile.phase('SAVE', io_manager, operation, segment, activity):
+            if 'SAVE' in ui:
+                save_timeseries(io_manager,ts,ui['SAVE'],siminfo,saveall,operation,segment,activity,jupyterlab,binout.get(activity, 2))
+
+    if siminfo.get('chunk'):
+        carry_states(uci, operation, segment, ts)
+    return
+
+def run_pooled_operation(operation, segment, delt, siminfo, uci, ts, saveall, jupyterlab):
+    '''Process pool entry point for one land segment; returns the deferred results for collect_operation()'''
+    return run_deferred_operation(operation, segment, delt, siminfo, uci, unpack_ts(ts), saveall, jupyterlab)
+
+def run_deferred_operation(operation, segment, delt, siminfo, uci, ts, saveall, jupyterlab):
+    '''Runs one land segment, keeping its results, messages and profile for collect_operation();
+    the process pool and the IMPLND threads run segments with it'''
+    mlist = []
+    def msg(indent, message, final=False):
+        mlist.append((indent, message))
+        return mlist
+
+    msg(2, f'{operation} {segment} DELT(minutes): {delt}')
+    writer = DeferredWriter()
+    profile = Profile()
+    flags = uci[(operation, 'GENERAL', segment)]['ACTIVITY']
+    run_activities(writer, siminfo, uci, operation, segment, ts, flags, None, {}, None, saveall, jupyterlab, msg, profile)
+    return writer, uci, mlist, profile
+
+def collect_threaded(threaded, io_manager, uci, memo, siminfo, msg, profile):
+    '''Writes the results of the IMPLND segments run on the threads, in OP_SEQUENCE order'''
+    for segment, ts, icefg, future in threaded:
+        collect_operation(future, io_manager, uci, msg, profile)
+        if memo is not None:
+            memo.record('IMPLND', segment, ts, icefg, siminfo)
+    return
+
+def collect_operation(future, io_manager, uci, msg, profile):
+    '''Writes the results, run log and profile of a pooled land segment from the parent process'''
+    writer, segment_uci, mlist, segment_profile = future.result()
+    for indent, message in mlist:
+        msg(indent, message)
+    uci.update(segment_uci)
+    profile.merge(segment_profile)
+    writer.replay(io_manager)
+    return
+
 def messages():
     '''Closure routine; msg() prints messages to screen and run log'''
     start = dt.now()
@@ -399,10 +672,11 @@ def get_flows(io_manager:SupportsReadTS, ts, flags, uci, segment, ddlinks, ddmas
                 AFname = f'{x.SVOL}{x.SVOLNO}_AFACTR'
                 data = f'{smemn}{smemsb1}{smemsb2}'
 
-                data_frame = io_manager.read_ts(Category.RESULTS,x.SVOL,x.SVOLNO, sgrpn)
                 try:
-                    if data in data_frame.columns: t = data_frame[data].astype(float64).to_numpy()[0:steps]
-                    else: t = data_frame[smemn].astype(float64).to_numpy()[0:steps]
+                    t = io_manager.read_member(x.SVOL, x.SVOLNO, sgrpn, data)
+                    if t is None: t = io_manager.read_member(x.SVOL, x.SVOLNO, sgrpn, smemn)
+                    if t is None: raise KeyError(smemn)
+                    t = t[0:steps]   # read_member returns a new float64 array, scaled in place
 
                     if MFname in ts and AFname in ts:
                         t *= ts[MFname][:steps] * ts[AFname][0:steps]
@@ -432,6 +706,10 @@ def get_flows(io_manager:SupportsReadTS, ts, flags, uci, segment, ddlinks, ddmas
                 except KeyError:
                     print('ERROR in FLOWS, cant resolve ', path + ' ' + smemn)
 
+    # the result bus can free the upstream results once their last consumer has read them,
+    # after all LINKS rows of this segment, as several rows can read the same source
+    for x in ddlinks[segment]:
+        io_manager.bus.consumed(x.SVOL, x.SVOLNO, segment)
     return
 
 '''
@@ -0,0 +1,128 @@
+''' Copyright (c) 2020 by RESPEC, INC.
+Author: Robert Heaphy, Ph.D.
+License: LGPL2
+Reuse of the results of identical land segments
+'''
+
+from collections import Counter, defaultdict
+from hashlib import sha1
+import numpy as np
+from hsp2.hsp2.scheduler import LAND_OPERATIONS
+
+# EXT_SOURCES and LINKS columns that name the target or only document a row
+_TARGET_COLUMNS = {'Index', 'TVOL', 'TVOLNO', 'TOPFST', 'TOPLST', 'COMMENT'}
+
+
+def segment_fingerprint(operation, segment, delt, tables, ext_sources, links):
+    '''
+    Digest of everything a land segment's results depend on: its DELT, the
+    GENERAL table and the tables of its active activities, and the source
+    timeseries, factors and transformations of its EXT_SOURCES and LINKS rows.
+    The segment name itself (and the LSID label) are left out, so segments
+    that only differ in name get the same fingerprint.
+
+    Parameters
+    ----------
+    tables : dict
+        UCI tables of the segment keyed by table name ('GENERAL', 'PWATER', ...).
+    ext_sources, links : list
+        EXT_SOURCES and LINKS rows (namedtuples) targeting the segment.
+    '''
+
+    flags = tables['GENERAL']['ACTIVITY']
+    general = {name: {key: value for key, value in table.items() if key != 'LSID'}
+        for name, table in tables['GENERAL'].items()}
+    used = {'GENERAL': general}
+    for name, table in tables.items():
+        # SEDMNT and PWTGAS also read CSNOFG from the PWATER table
+        if name != 'GENERAL' and (flags.get(name, 1) or name == 'PWATER'):
+            used[name] = table
+    rows = [_row(row) for row in ext_sources] + [_row(row) for row in links]
+    key = (operation, delt, _canonical(used), tuple(rows))
+    return sha1(repr(key).encode()).hexdigest()
+
+
+def segment_aliases(opseq, uci, ddext_sources, ddlinks):
+    '''maps (operation, segment) of every land segment that repeats an earlier
+    segment of the OP_SEQUENCE to the name of that earlier segment'''
+    tables = defaultdict(dict)
+    for (operation, table, segment), value in uci.items():
+        if operation in LAND_OPERATIONS:
+            tables[(operation, segment)][table] = value
+
+    first = {}
+    aliases = {}
+    for _, operation, segment, delt in opseq.itertuples():
+        if operation not in LAND_OPERATIONS:
+            continue
+        fingerprint = segment_fingerprint(operation, segment, delt, tables[(operation, segment)],
+            ddext_sources.get((operation, segment), []), ddlinks.get(segment, []))
+        original = first.setdefault(fingerprint, segment)
+        if original != segment:
+            aliases[(operation, segment)] = original
+    return aliases
+
+
+class SegmentMemo:
+    '''
+    Results (ts) of the land segments that are repeated later in the
+    OP_SEQUENCE. A ts is kept until the last segment repeating it has saved it.
+
+    PWATER reads the ICEFG left in siminfo by the SNOW of the segment, or of an
+    earlier segment when SNOW is not active. A segment without SNOW therefore
+    only reuses results computed from the same ICEFG.
+    '''
+
+    def __init__(self, opseq, uci, ddext_sources, ddlinks):
+        self.aliases = segment_aliases(opseq, uci, ddext_sources, ddlinks)
+        self._pending = Counter((operation, original) for (operation, _), original in self.aliases.items())
+        self._results = {}
+        self._inherits_icefg = {(operation, segment) for operation, segment in self._pending
+            if operation == 'PERLND' and not uci[(operation, 'GENERAL', segment)]['ACTIVITY']['SNOW']}
+
+    def __len__(self):
+        return len(self.aliases)
+
+    def record(self, operation, segment, ts, icefg, siminfo):
+        '''keeps the ts of a segment that ran, if a later segment repeats it;
+        icefg is the siminfo ICEFG before the segment ran'''
+        if (operation, segment) in self._pending:
+            self._results[(operation, segment)] = (ts, icefg, siminfo.get('ICEFG'))
+
+    def reuse(self, operation, segment, siminfo):
+        '''
+        The (original, ts) of the earlier segment whose results this segment
+        reuses, None when the segment has to run. The ICEFG in siminfo is set
+        as if the segment had run.
+        '''
+        original = self.aliases.get((operation, segment))
+        if original is None:
+            return None
+        key = (operation, original)
+        result = self._results.get(key)
+        self._pending[key] -= 1
+        if self._pending[key] == 0:
+            self._results.pop(key, None)
+        if result is None:
+            return None
+        ts, icefg_before, icefg_after = result
+        if key in self._inherits_icefg and siminfo.get('ICEFG') != icefg_before:
+            return None
+        if icefg_after is not None:
+            siminfo['ICEFG'] = icefg_after
+        return original, ts
+
+
+def _row(row):
+    return tuple((name, value) for name, value in row._asdict().items() if name not in _TARGET_COLUMNS)
+
+
+def _canonical(value):
+    '''nested tuples with sorted keys, so equal tables give equal reprs'''
+    if isinstance(value, dict):
+        return tuple(sorted((str(key), _canonical(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_canonical(item) for item in value)
+    if isinstance(value, np.ndarray):
+        return (value.dtype.str, value.shape, value.tobytes())
+    return value
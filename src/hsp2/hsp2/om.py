@@ -90,7 +90,9 @@ def state_load_om_json(state, io_manager, siminfo):
     # - model objects defined in file named '[model h5 base].json -- this will populate an array of object definitions that will 
     #   be loadable by "model_loader_recursive()"
     # JSON file would be in same path as hdf5
-    hdf5_path = io_manager._input.file_path
+    hdf5_path = getattr(io_manager._input, 'file_path', None)
+    if hdf5_path is None:
+        return
     (fbase, fext) = os.path.splitext(hdf5_path)
     # see if there is custom json
     fjson = fbase + ".json"
@@ -114,7 +116,9 @@ def state_load_om_python(state, io_manager, siminfo):
     # - this file may also contain other dynamically redefined functions such as state_step_hydr()
     #   which can contain code that is executed every timestep inside the _hydr_() function
     #   and can literally supply hooks for any desired user customizable code
-    hdf5_path = io_manager._input.file_path
+    hdf5_path = getattr(io_manager._input, 'file_path', None)
+    if hdf5_path is None:
+        return
     (fbase, fext) = os.path.splitext(hdf5_path)
     # see if there is a code module with custom python 
     # print("Looking for custom om loader in python code ", (fbase + ".py"))
@@ -501,7 +505,7 @@ def save_object_ts(io_manager, siminfo, op_tokens, ts_ix, ts):
     x = 0 # dummy
     return
 
-@njit
+@njit(cache=True)
 def iterate_models(model_exec_list, op_tokens, state_ix, dict_ix, ts_ix, steps, dstep = -1):
     checksum = 0.0
     for step in range(steps):
@@ -510,7 +514,7 @@ def iterate_models(model_exec_list, op_tokens, state_ix, dict_ix, ts_ix, steps,
     #print("Steps completed", step)
     return checksum
 
-@njit
+@njit(cache=True)
 def pre_step_model(model_exec_list, op_tokens, state_ix, dict_ix, ts_ix, step):
     for i in model_exec_list:
         if op_tokens[i][0] == 12:
@@ -518,7 +522,7 @@ def pre_step_model(model_exec_list, op_tokens, state_ix, dict_ix, ts_ix, step):
             pre_step_register(op_tokens[i], state_ix)
     return
 
-@njit
+@njit(cache=True)
 def step_model(model_exec_list, op_tokens, state_ix, dict_ix, ts_ix, step):
     for i in model_exec_list:
         step_one(op_tokens, op_tokens[i], state_ix, dict_ix, ts_ix, step, 0)
@@ -526,7 +530,7 @@ def step_model(model_exec_list, op_tokens, state_ix, dict_ix, ts_ix, step):
 
 
 
-@njit
+@njit(cache=True)
 def step_one(op_tokens, ops, state_ix, dict_ix, ts_ix, step, debug = 0):
     # op_tokens is passed in for ops like matrices that have lookups from other 
     # locations.  All others rely only on ops 
@@ -565,7 +569,7 @@ def step_one(op_tokens, ops, state_ix, dict_ix, ts_ix, step, debug = 0):
         step_special_action(ops, state_ix, dict_ix, step)
     return 
 
-@njit
+@njit(cache=True)
 def step_model_test(model_exec_list, op_tokens, state_ix, dict_ix, ts_ix, step, debug_step = -1):
     for i in model_exec_list:
         ops = op_tokens[i]
@@ -577,7 +581,7 @@ def step_model_test(model_exec_list, op_tokens, state_ix, dict_ix, ts_ix, step,
         step_one(op_tokens, op_tokens[i], state_ix, dict_ix, ts_ix, step, 0)
     return 
 
-@njit
+@njit(cache=True)
 def step_model_pcode(model_exec_list, op_tokens, state_info, state_paths, state_ix, dict_ix, ts_ix, step):
     '''
     This routine includes support for dynamically loaded python code which is powerful but slow
@@ -594,7 +598,7 @@ def step_model_pcode(model_exec_list, op_tokens, state_info, state_paths, state_
         step_one(op_tokens, op_tokens[i], state_ix, dict_ix, ts_ix, step, 0)
     return 
 
-@njit
+@njit(cache=True)
 def post_step_model(model_exec_list, op_tokens, state_ix, dict_ix, ts_ix, step):
     return 
 
@@ -604,7 +608,7 @@ def step_object(thisobject, step):
     step_one(thisobject.op_tokens, thisobject.op_tokens[thisobject.ix], thisobject.state_ix, thisobject.dict_ix, thisobject.ts_ix, step)
 
 
-@njit
+@njit(cache=True)
 def pre_step_test(model_exec_list, op_tokens, state_ix, dict_ix, ts_ix, step):
     for i in model_exec_list:
         ops = op_tokens[i]
@@ -619,7 +623,7 @@ def pre_step_test(model_exec_list, op_tokens, state_ix, dict_ix, ts_ix, step):
         #    continue
     return
 
-@njit
+@njit(cache=True)
 def iterate_perf(model_exec_list, op_tokens, state_ix, dict_ix, ts_ix, steps, debug_step = -1):
     checksum = 0.0
     for step in range(steps):
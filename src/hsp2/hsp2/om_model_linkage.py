@@ -101,7 +101,7 @@ class ModelLinkage(ModelObject):
             #print("tokenize() result", self.ops)
 
 # Function for use during model simulations of tokenized objects
-@njit
+@njit(cache=True)
 def step_model_link(op_token, state_ix, ts_ix, step):
     #if step == 2:
         #print("step_model_link() called at step 2 with op_token=", op_token)
@@ -419,7 +419,7 @@ class ModelRegister(ModelVariable):
         return req_props
 
 # njit functions for runtime
-@njit
+@njit(cache=True)
 def pre_step_register(op, state_ix):
     ix = op[1]
     #print("Resetting register", ix,"to zero")
@@ -430,12 +430,12 @@ def pre_step_register(op, state_ix):
 
 
 # njit functions for end of model run
-@njit
+@njit(cache=True)
 def finish_model_object(op_token, state_ix, ts_ix):
     return
 
 
-@njit
+@njit(cache=True)
 def finish_register(op_token, state_ix, ts_ix):
     # todo: push the values of ts_ix back to the hdf5? or does this happen in larger simulation as it is external to OM?
     return
\ No newline at end of file
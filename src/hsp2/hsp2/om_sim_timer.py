@@ -68,7 +68,7 @@ class SimTimer(ModelObject):
         return time_array
 
 # Function for use during model simulations of tokenized objects
-@njit
+@njit(cache=True)
 def step_sim_timer(op_token, state_ix, dict_ix, ts_ix, step):
     # note: the op_token and state index are off by 1 since the dict_ix does not store type 
     #print("Exec step_sim_timer at step:", step, "jday", dict_ix[op_token[1]][step][9] )
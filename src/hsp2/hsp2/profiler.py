@@ -0,0 +1,95 @@
+''' Copyright (c) 2020 by RESPEC, INC.
+Author: Robert Heaphy, Ph.D.
+License: LGPL2
+Run time profile by operation, segment and activity
+'''
+
+import sys
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+from pandas import DataFrame
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+COLUMNS = ['INPUT', 'SETUP', 'KERNEL', 'SAVE', 'BYTES_READ', 'BYTES_WRITTEN', 'PEAK_RSS']
+
+# kernel time of each thread, segments may run on a thread pool (see main, implnd_threads)
+_kernel_seconds = threading.local()
+
+
+def timed_kernel(kernel, *args):
+    '''calls the Numba kernel of an activity module, adding its time (including any compilation) to the profile'''
+    start = perf_counter()
+    try:
+        return kernel(*args)
+    finally:
+        _kernel_seconds.seconds = kernel_seconds() + perf_counter() - start
+
+
+def kernel_seconds():
+    '''seconds spent in timed_kernel by this thread'''
+    return getattr(_kernel_seconds, 'seconds', 0.0)
+
+
+def peak_rss():
+    '''peak resident set size of this process in bytes, 0 where it is not available'''
+    if resource is None:
+        return 0
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+
+class Profile:
+    '''
+    Run time profile of a simulation, one row per (operation, segment, activity):
+    INPUT    seconds in get_timeseries, get_gener_timeseries and get_flows
+    SETUP    seconds of Python in the activity, outside its Numba kernel
+    KERNEL   seconds in the Numba kernel, including compilation on first use
+    SAVE     seconds in save_timeseries (queuing, when results are written in the background)
+    BYTES_READ, BYTES_WRITTEN  size of the timeseries read from the input or output
+             store and handed to the output
+    PEAK_RSS peak resident memory of the process running the row, in bytes
+    The input of a segment is fetched once for all its activities, so it is
+    recorded in a row with an empty activity.
+    '''
+
+    def __init__(self):
+        self.rows = {}
+
+    def add(self, operation, segment, activity, **values):
+        row = self.rows.setdefault((operation, segment, activity), dict.fromkeys(COLUMNS, 0))
+        for column, value in values.items():
+            if column == 'PEAK_RSS':
+                row[column] = max(row[column], value)
+            else:
+                row[column] += value
+
+    @contextmanager
+    def phase(self, column, io_manager, operation, segment, activity=''):
+        '''records the seconds and bytes of the enclosed code under column'''
+        start = perf_counter()
+        read, written = _bytes(io_manager)
+        try:
+            yield
+        finally:
+            seconds = perf_counter() - start
+            now_read, now_written = _bytes(io_manager)
+            self.add(operation, segment, activity, **{column: seconds},
+                BYTES_READ=now_read - read, BYTES_WRITTEN=now_written - written, PEAK_RSS=peak_rss())
+
+    def merge(self, other):
+        '''adds the rows of the profile of a worker process'''
+        for (operation, segment, activity), row in other.rows.items():
+            self.add(operation, segment, activity, **row)
+
+    def to_dataframe(self):
+        data = [(*key, *row.values()) for key, row in self.rows.items()]
+        return DataFrame(data, columns=['OPERATION', 'SEGMENT', 'ACTIVITY'] + COLUMNS)
+
+
+def _bytes(io_manager):
+    return getattr(io_manager, 'bytes_read', 0), getattr(io_manager, 'bytes_written', 0)
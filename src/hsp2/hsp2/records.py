@@ -0,0 +1,97 @@
+''' Copyright (c) 2020 by RESPEC, INC.
+Author: Robert Heaphy, Ph.D.
+License: LGPL2
+Parameter records: the numeric FLAGS, PARAMETERS and STATES of an activity
+for all its segments as rows of one NumPy structured array '''
+
+import os.path
+from csv import DictReader
+from functools import lru_cache
+
+from numpy import full, nan, float64
+
+from hsp2 import hsp2tools
+
+CATEGORIES = ('FLAGS', 'PARAMETERS', 'STATES')
+
+# (operation, activity) of the kernels that read a parameter record instead of a ui Dict
+RECORD_ACTIVITIES = (('IMPLND', 'IWATER'),)
+
+# id of a segment's UCI dict: (the dict, its ParameterTable, its row), see build_tables
+_records = {}
+
+
+@lru_cache(maxsize=None)
+def table_fields(operation, activity):
+    '''names of the numeric FLAGS, PARAMETERS and STATES of an activity in hsp2tools/data/ParseTable.csv'''
+    names = []
+    with open(os.path.join(hsp2tools.__path__[0], 'data', 'ParseTable.csv'), newline='') as file:
+        for row in DictReader(file):
+            if (row['OP'] == operation and row['SAVE'] == activity and row['CAT'] in CATEGORIES
+             and row['TYPE'] in ('I', 'R') and row['NAME'] not in names):
+                names.append(row['NAME'])
+    return tuple(names)
+
+
+def numeric_values(ui):
+    '''(name, value) of the int and float FLAGS, PARAMETERS and STATES of a UCI dict, like make_numba_dict'''
+    for category in CATEGORIES:
+        for name, value in ui.get(category, {}).items():
+            if type(value) in {int, float}:
+                yield name, float(value)
+
+
+class ParameterTable:
+    '''
+    FLAGS, PARAMETERS and STATES of one operation and activity with a row per
+    segment, in a NumPy structured array of float64 fields. The fields are
+    those of the activity in ParseTable.csv, whatever the model's UCI tables
+    hold, so kernels are compiled once for every model; other values of the
+    UCI are left out and a value a segment does not have is NaN.
+
+    A kernel receives a segment's row (a record) and reads its fields by name,
+    so no Dict is built per call. table[name] is the column of a parameter
+    across all segments, for example to perturb it in ensemble runs.
+    '''
+
+    def __init__(self, operation, activity, uis):
+        names = table_fields(operation, activity)
+        self.operation = operation
+        self.activity = activity
+        self.rows = {segment: row for row, segment in enumerate(uis)}
+        self.table = full(len(uis), nan, dtype=[(name, float64) for name in names])
+        for row, ui in enumerate(uis.values()):
+            for name, value in numeric_values(ui):
+                if name in names:
+                    self.table[name][row] = value
+
+    def __len__(self):
+        return len(self.table)
+
+    def record(self, segment):
+        return self.table[self.rows[segment]]
+
+
+def build_tables(uci, activities=RECORD_ACTIVITIES):
+    '''
+    ParameterTables over all segments of each (operation, activity) in activities,
+    built once per run or time window; parameter_record then finds a segment's row
+    from its UCI dict. Returns the tables by (operation, activity).
+    '''
+    _records.clear()
+    tables = {}
+    for operation, activity in activities:
+        uis = {key[2]: ui for key, ui in uci.items() if key[0] == operation and key[1] == activity}
+        if uis:
+            table = tables[(operation, activity)] = ParameterTable(operation, activity, uis)
+            for segment, ui in uis.items():
+                _records[id(ui)] = (ui, table, table.rows[segment])
+    return tables
+
+
+def parameter_record(ui, operation, activity):
+    '''record of the segment with UCI dict ui, from build_tables or else a table of its own'''
+    entry = _records.get(id(ui))
+    if entry is not None and entry[0] is ui:
+        return entry[1].table[entry[2]]
+    return ParameterTable(operation, activity, {None: ui}).table[0]
@@ -0,0 +1,103 @@
+''' Copyright (c) 2020 by RESPEC, INC.
+Author: Robert Heaphy, Ph.D.
+License: LGPL2
+Resampling of regular input timeseries on int64 timestamps (nanoseconds) and
+float64 values, with the bins and fills of pandas resample(Minute(delt)) '''
+
+from numpy import arange, empty, full, int64, nan, isnan
+from numba import njit
+
+DAY = 86_400_000_000_000
+
+
+def bin_labels(first, last, freq):
+    '''
+    Left labels of the bins of width freq (ns) covering [first, last], as
+    pandas resample does for a fixed frequency: bins start at the midnight
+    before first plus a multiple of freq (origin='start_day').
+    '''
+    origin = first - first % DAY
+    start = first - (first - origin) % freq
+    stop = last - (last - origin) % freq
+    return arange(start, stop + 1, freq, dtype=int64)
+
+
+def ffill(stamps, values, labels):
+    '''value of the last input at or before each label, like resample().ffill()'''
+    return _reindex_(stamps, values, labels, True, nan)
+
+
+def asfreq(stamps, values, labels, fill=nan):
+    '''value of the input at each label, fill where there is none, like resample().asfreq()'''
+    return _reindex_(stamps, values, labels, False, fill)
+
+
+def aggregate(stamps, values, labels, freq, method):
+    '''SUM, MEAN, MAX or MIN of the inputs in each bin, skipping missing values like pandas;
+    the sum of an empty bin is 0.0, the other methods give NaN'''
+    return _bins_(stamps, values, labels, freq, ('SUM', 'MEAN', 'MAX', 'MIN').index(method))
+
+
+def interpolate(stamps, values, labels):
+    '''inputs at the labels, linearly interpolated in between, like resample().interpolate()'''
+    return _interpolate_(asfreq(stamps, values, labels))
+
+
+@njit(cache=True)
+def _reindex_(stamps, values, labels, forward, fill):
+    result = full(len(labels), fill)
+    position = -1
+    for index in range(len(labels)):
+        while position + 1 < len(stamps) and stamps[position + 1] <= labels[index]:
+            position += 1
+        if position < 0:
+            continue
+        if forward or stamps[position] == labels[index]:
+            result[index] = values[position]
+    return result
+
+
+@njit(cache=True)
+def _bins_(stamps, values, labels, freq, method):
+    bins = len(labels)
+    total = full(bins, 0.0)
+    count = full(bins, 0)
+    extreme = full(bins, nan)
+    for index in range(len(stamps)):
+        value = values[index]
+        if isnan(value):
+            continue
+        position = (stamps[index] - labels[0]) // freq
+        if position < 0 or position >= bins:
+            continue
+        total[position] += value
+        count[position] += 1
+        if count[position] == 1 or (method == 2 and value > extreme[position]) or (method == 3 and value < extreme[position]):
+            extreme[position] = value
+    if method == 0:
+        return total
+    if method == 1:
+        result = empty(bins)
+        for position in range(bins):
+            result[position] = total[position] / count[position] if count[position] else nan
+        return result
+    return extreme
+
+
+@njit(cache=True)
+def _interpolate_(values):
+    ''' linear in position between valid values; leading NaNs stay, trailing NaNs get the last value '''
+    result = values.copy()
+    previous = -1
+    for index in range(len(values)):
+        if isnan(values[index]):
+            continue
+        if previous >= 0:
+            for gap in range(previous + 1, index):
+                weight = (gap - previous) / (index - previous)
+                result[gap] = values[previous] + weight * (values[index] - values[previous])
+        previous = index
+    if previous >= 0:
+        for gap in range(previous + 1, len(values)):
+            result[gap] = values[previous]
+    return result
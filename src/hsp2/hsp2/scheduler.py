@@ -0,0 +1,95 @@
+''' Copyright (c) 2020 by RESPEC, INC.
+Author: Robert Heaphy, Ph.D.
+License: LGPL2
+Dependency-aware scheduling of the OP_SEQUENCE for parallel runs
+'''
+
+from collections import defaultdict
+import numpy as np
+from numba import types
+from numba.typed import Dict
+
+# operations that only depend on EXT_SOURCES and upstream results, and never
+# touch the shared STATE used by SPECL and the operational model (HYDR, SEDTRN)
+LAND_OPERATIONS = {'PERLND', 'IMPLND'}
+
+
+def operation_levels(opseq, ddlinks):
+    '''
+    Groups the OP_SEQUENCE into topological levels using the LINKS table.
+
+    Every operation is placed one level after the latest operation that feeds
+    it through LINKS. Operations outside LAND_OPERATIONS share STATE, so they
+    also keep their relative OP_SEQUENCE order. Only links from operations
+    earlier in the OP_SEQUENCE are honored, matching the serial run.
+
+    Parameters
+    ----------
+    opseq : DataFrame
+        The CONTROL/OP_SEQUENCE table.
+    ddlinks : dict
+        LINKS rows keyed by target segment, as built by read_uci().
+
+    Returns
+    -------
+    List of lists of (operation, segment, delt) tuples, one list per level,
+    each in OP_SEQUENCE order.
+    '''
+
+    level = {}
+    levels = defaultdict(list)
+    serial_level = 0
+    for _, operation, segment, delt in opseq.itertuples():
+        lvl = 0
+        for link in ddlinks.get(segment, []):
+            source = (link.SVOL, link.SVOLNO)
+            if source in level:
+                lvl = max(lvl, level[source] + 1)
+        if operation not in LAND_OPERATIONS:
+            lvl = max(lvl, serial_level)
+            serial_level = lvl
+        level[(operation, segment)] = lvl
+        levels[lvl].append((operation, segment, delt))
+    return [levels[lvl] for lvl in sorted(levels)]
+
+
+def segment_uci(uci, operation, segment):
+    '''UCI tables of one operation and segment, the only part a land operation reads'''
+    subset = defaultdict(dict)
+    for key, value in uci.items():
+        if key[0] == operation and key[2] == segment:
+            subset[key] = value
+    return subset
+
+
+def pack_ts(ts):
+    '''Numba typed ts Dict to a plain (picklable) dict of arrays'''
+    return {name: array for name, array in ts.items()}
+
+
+def unpack_ts(packed):
+    '''plain dict of arrays back to the Numba typed ts Dict used by the modules'''
+    ts = Dict.empty(key_type=types.unicode_type, value_type=types.float64[:])
+    for name, array in packed.items():
+        ts[name] = array
+    return ts
+
+
+class DeferredWriter:
+    '''
+    Stand-in for the IOManager inside a worker process. It records the
+    write_ts calls so the parent process can replay them through its own
+    IOManager, keeping a single writer on the output store.
+    '''
+
+    def __init__(self) -> None:
+        self.records = []
+        self.bytes_written = 0
+
+    def write_ts(self, data_frame, *args, **kwargs) -> None:
+        self.bytes_written += int(np.sum(data_frame.memory_usage(index=True)))
+        self.records.append(((data_frame, *args), kwargs))
+
+    def replay(self, io_manager) -> None:
+        for args, kwargs in self.records:
+            io_manager.write_ts(*args, **kwargs)
@@ -0,0 +1,153 @@
+''' Copyright (c) 2020 by RESPEC, INC.
+Author: Robert Heaphy, Ph.D.
+License: LGPL2
+Shared simulation time index and calendar helper arrays '''
+
+from pandas import Series, date_range
+from pandas.tseries.offsets import Minute
+from numpy import asarray, add, ones, zeros, tile
+
+# one calendar per (start, stop, delt) for the life of a run (or worker process)
+_calendars = {}
+
+
+def sim_calendar(siminfo):
+    '''SimCalendar for the start, stop and delt of siminfo, built once and then shared'''
+    key = (siminfo['start'], siminfo['stop'], int(siminfo['delt']))
+    if key not in _calendars:
+        _calendars[key] = SimCalendar(*key)
+    return _calendars[key]
+
+
+def clear_calendars():
+    '''drop all cached calendars, called at the start of a run'''
+    _calendars.clear()
+
+
+def _readonly(array):
+    array.flags.writeable = False
+    return array
+
+
+class SimCalendar:
+    '''
+    Simulation time index for one interval length plus the calendar helper
+    arrays (hour flags, LAPSE/SEASONS like broadcasts, monthly interpolation)
+    used by the activity modules. Each helper is computed once and returned as
+    a read-only NumPy array; callers that need to modify one must copy it.
+
+    Helper arrays follow the HSPF convention used by the modules: element i
+    belongs to the interval starting at start + i * delt.
+    '''
+
+    def __init__(self, start, stop, delt) -> None:
+        self.start = start
+        self.stop  = stop
+        self.delt  = delt
+        self.tindex = date_range(start, stop, freq=Minute(delt))[1:]
+        self.steps  = len(self.tindex)
+
+        begins = self.tindex - Minute(delt)
+        self.hour      = _readonly(begins.hour.to_numpy())
+        self.month     = _readonly(begins.month.to_numpy())
+        self.dayofyear = _readonly(begins.dayofyear.to_numpy())
+        self._memo = {}
+        self._parts = None
+
+    def _lookup(self, key, compute, *args):
+        if key not in self._memo:
+            self._memo[key] = _readonly(compute(*args))
+        return self._memo[key]
+
+    @property
+    def dayfg(self):
+        '''true the first time and at the start of every day of simulation'''
+        hours24 = zeros(24)
+        hours24[0] = 1.0
+        return self.hoursval(hours24, dofirst=True)
+
+    @property
+    def hrfg(self):
+        '''true the first time and at every hour of simulation'''
+        return self.hoursval(ones(24), dofirst=True)
+
+    def hoursval(self, hours24, dofirst=False, lapselike=False):
+        '''hours flags, flag on the hour or lapse table over full simulation'''
+        key = ('hoursval', tuple(float(x) for x in hours24), dofirst, lapselike)
+        return self._lookup(key, self._hoursval, hours24, dofirst, lapselike)
+
+    def monthval(self, monthly):
+        '''value at start of month for all times within the month;
+        monthly is 12 values or a 2-D block of 12 values per row (not cached)'''
+        monthly = asarray(monthly, dtype=float)
+        if monthly.ndim == 2:
+            return self._monthly(monthly, False)
+        key = ('monthval', tuple(float(x) for x in monthly))
+        return self._lookup(key, self._monthly, monthly, False)
+
+    def dayval(self, monthly):
+        '''HSPF monthly data interpolated to day, but constant within day;
+        monthly is 12 values or a 2-D block of 12 values per row (not cached)'''
+        monthly = asarray(monthly, dtype=float)
+        if monthly.ndim == 2:
+            return self._monthly(monthly, True)
+        key = ('dayval', tuple(float(x) for x in monthly))
+        return self._lookup(key, self._monthly, monthly, True)
+
+    def _hoursval(self, hours24, dofirst, lapselike):
+        start, stop, freq = self.start, self.stop, Minute(self.delt)
+
+        dr = date_range(start=f'{start.year}-01-01', end=f'{stop.year}-12-31', freq=Minute(60))
+        hours = tile(hours24, (len(dr) + 23) // 24).astype(float)
+        if dofirst:
+            hours[0] = 1
+
+        ts = Series(hours[0:len(dr)], dr)
+        if lapselike:
+            if ts.index.freq > freq:     # upsample
+                ts = ts.resample(freq).asfreq().ffill()
+            elif ts.index.freq < freq:   # downsample
+                ts = ts.resample(freq).mean()
+        else:
+            if ts.index.freq > freq:     # upsample
+                ts = ts.resample(freq).asfreq().fillna(0.0)
+            elif ts.index.freq < freq:   # downsample
+                ts = ts.resample(freq).max()
+        return ts.truncate(start, stop).to_numpy()
+
+    def _monthparts(self):
+        '''
+        month (0-11) and fraction of the month elapsed at the start of the day
+        for every step from start to stop, or for delt longer than a day, for
+        every day together with the first day of each step
+        '''
+        if self._parts is None:
+            freq = Minute(self.delt)
+            if self.delt <= 1440:
+                days, first = date_range(self.start, self.stop, freq=freq), None
+            else:
+                days = date_range(self.start.normalize(), self.stop + freq, freq='D', inclusive='left')
+                first = ((date_range(self.start, self.stop, freq=freq) - days[0]) // Minute(1440)).to_numpy()
+            month = days.month.to_numpy() - 1
+            fraction = (days.day.to_numpy() - 1) / days.days_in_month.to_numpy()
+            self._parts = (month, fraction, first)
+        return self._parts
+
+    def _monthly(self, monthly, interpolate):
+        '''
+        monthval (interpolate False) or dayval (interpolate True) of 12
+        monthly values, or of a block with 12 values per row, in one pass:
+        the value of day d of month m is monthly[m], or interpolated from
+        monthly[m] on the first of m to monthly[m+1] on the first of the next
+        month, December to January of the following year.
+        '''
+        month, fraction, first = self._monthparts()
+        values = monthly[..., month]
+        if interpolate:
+            values = values + (monthly[..., (month + 1) % 12] - values) * fraction
+        if first is not None:   # mean of the days of each step
+            counts = zeros(len(first))
+            counts[:-1] = first[1:] - first[:-1]
+            counts[-1] = values.shape[-1] - first[-1]
+            values = add.reduceat(values, first, axis=-1) / counts
+        return values
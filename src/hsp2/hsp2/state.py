@@ -10,6 +10,7 @@ from numba import int8, float32, njit, types, typed # import the types
 import os
 import importlib.util
 import sys
+from hsp2.hsp2.simcalendar import sim_calendar
 
 def init_state_dicts():
     """
@@ -117,15 +118,16 @@ def state_siminfo_hsp2(uci_obj, siminfo):
     # Add crucial simulation info for dynamic operation support
     delt = uci_obj.opseq.INDELT_minutes[0] # get initial value for STATE objects
     siminfo['delt'] = delt
-    siminfo['tindex'] = date_range(siminfo['start'], siminfo['stop'], freq=Minute(delt))[1:]
-    siminfo['steps'] = len(siminfo['tindex'])
+    calendar = sim_calendar(siminfo)
+    siminfo['tindex'] = calendar.tindex
+    siminfo['steps'] = calendar.steps
 
 def state_init_hsp2(state, opseq, activities):
     # This sets up the state entries for all state compatible HSP2 model variables
     # print("STATE initializing contexts.")
     for _, operation, segment, delt in opseq.itertuples():
         if operation != 'GENER' and operation != 'COPY':
-            for activity, function in activities[operation].items():
+            for activity in activities[operation]:
                 if activity == 'HYDR':
                     state_context_hsp2(state, operation, segment, activity)
                     hydr_init_ix(state, state['domain'])
@@ -164,7 +166,7 @@ def sedtrn_init_ix(state, domain):
         sedtrn_ix[i] = set_state(state['state_ix'], state['state_paths'], var_path, 0.0)
     return sedtrn_ix
     
-@njit
+@njit(cache=True)
 def hydr_get_ix(state_ix, state_paths, domain):
     # get a list of keys for all hydr state variables
     hydr_state = ["DEP","IVOL","O1","O2","O3","OVOL1","OVOL2","OVOL3","PRSUPY","RO","ROVOL","SAREA","TAU","USTAR","VOL","VOLEV"]
@@ -175,7 +177,7 @@ def hydr_get_ix(state_ix, state_paths, domain):
         hydr_ix[i] = state_paths[var_path]
     return hydr_ix    
 
-@njit
+@njit(cache=True)
 def sedtrn_get_ix(state_ix, state_paths, domain):
     # get a list of keys for all sedtrn state variables
     sedtrn_state = ["RSED4", "RSED5", "RSED6"]
@@ -215,12 +217,15 @@ def dynamic_module_import(local_name, local_path, module_name):
 def load_dynamics(io_manager, siminfo):
     local_path = os.getcwd()
     # try this
-    hdf5_path = io_manager._input.file_path
+    hdf5_path = getattr(io_manager._input, 'file_path', None)
+    siminfo['state_step_hydr'] = 'disabled'
+    if hdf5_path is None:
+        # no model file next to which custom python code could be
+        return False
     (fbase, fext) = os.path.splitext(hdf5_path)
     # see if there is a code module with custom python 
     # print("Looking for SPECL with custom python code ", (fbase + ".py"))
     hsp2_local_py = dynamic_module_import(fbase, fbase + ".py", "hsp2_local_py")
-    siminfo['state_step_hydr'] = 'disabled'
     if 'state_step_hydr' in dir(hsp2_local_py):
         siminfo['state_step_hydr'] = 'enabled'
         print("state_step_hydr function defined, using custom python code")
@@ -1,6 +1,6 @@
 # null function to be loaded when not supplied by user
 from numba import int8, float32, njit, types, typed # import the types
 
-@njit
+@njit(cache=True)
 def state_step_hydr(state_info, state_paths, state_ix, dict_ix, ts_ix, hydr_ix, step):
     return
\ No newline at end of file
@@ -17,6 +17,8 @@ from numba import types
 from numba.typed import Dict
 
 from hsp2.hsp2io.protocols import Category, SupportsReadTS, SupportsWriteTS
+from hsp2.hsp2.simcalendar import sim_calendar
+from hsp2.hsp2 import resample
 from typing import List
 
 
@@ -87,75 +89,71 @@ def transform(ts, name, how, siminfo):
          disaggregate: LAST, SAME, DIV, ZEROFILL, INTERPOLATE
          aggregate: MEAN, SUM, MAX, MIN
     NOTE: these routines work for both regular and sparse timeseries input
+    Regular timeseries are resampled by the compiled kernels of hsp2.hsp2.resample
+    on int64 timestamps, with the bins of pandas resample(Minute(delt)).
     '''
 
     tsfreq = ts.index.freq
     freq   = Minute(siminfo['delt'])
-    stop   = siminfo['stop']
+    start, stop, steps = siminfo['start'], siminfo['stop'], siminfo['steps']
+
+    if tsfreq == None:     # Sparse time base, frequency not defined
+        if ts.index[-1] < stop:
+            ts = ts.copy()
+            ts[stop] = ts.iloc[-1]
+        ts = ts.reindex(siminfo['tbase']).ffill().bfill()
+        return ts[start:stop].to_numpy().astype(float64)[0:steps]
+
+    if isinstance(ts, pd.DataFrame):
+        ts = ts.iloc[:, 0]
+    stamps = ts.index.to_numpy(dtype='datetime64[ns]').view(np.int64)
+    values = ts.to_numpy(dtype=float64)
 
     # append duplicate of last point to force processing last full interval
-    if ts.index[-1] < stop:
-        ts[stop] = ts.iloc[-1]
+    last = pd.Timestamp(stop).value
+    if stamps[-1] < last:
+        stamps = np.append(stamps, last)
+        values = np.append(values, values[-1])
 
+    step = freq.nanos
+    labels = resample.bin_labels(stamps[0], stamps[-1], step)
     if freq == tsfreq:
-        pass
-    elif tsfreq == None:     # Sparse time base, frequency not defined
-         ts = ts.reindex(siminfo['tbase']).ffill().bfill()
+        labels = stamps
     elif how == 'SAME':
-        ts = ts.resample(freq).ffill()  # tsfreq >= freq assumed, or bad user choice
+        values = resample.ffill(stamps, values, labels)  # tsfreq >= freq assumed, or bad user choice
     elif not how:
+        coarse = 'Y' in str(tsfreq) or 'M' in str(tsfreq) or tsfreq > freq
         if name in flowtype:
-            if 'Y' in str(tsfreq) or 'M' in str(tsfreq) or tsfreq > freq:
+            if coarse:
                 if   'M' in str(tsfreq):  ratio = 1.0/730.5
                 elif 'Y' in str(tsfreq):  ratio = 1.0/8766.0
                 else:                     ratio = freq / tsfreq
-                ts = (ratio * ts).resample(freq).ffill()   # HSP2 how = div
+                values = resample.ffill(stamps, ratio * values, labels)   # HSP2 how = div
             else:
-                ts = ts.resample(freq).sum()
+                values = resample.aggregate(stamps, values, labels, step, 'SUM')
         else:
-            if 'Y' in str(tsfreq) or 'M' in str(tsfreq) or tsfreq > freq:
-                ts = ts.resample(freq).ffill()
+            if coarse:
+                values = resample.ffill(stamps, values, labels)
             else:
-                ts = ts.resample(freq).mean()
-    elif how == 'MEAN':        ts = ts.resample(freq).mean()
-    elif how == 'SUM':         ts = ts.resample(freq).sum()
-    elif how == 'MAX':         ts = ts.resample(freq).max()
-    elif how == 'MIN':         ts = ts.resample(freq).min()
-    elif how == 'LAST':        ts = ts.resample(freq).ffill()
-    elif how == 'DIV':         ts = (ts * (freq / ts.index.freq)).resample(freq).ffill()
-    elif how == 'ZEROFILL':    ts = ts.resample(freq).fillna(0.0)
-    elif how == 'INTERPOLATE': ts = ts.resample(freq).interpolate()
+                values = resample.aggregate(stamps, values, labels, step, 'MEAN')
+    elif how in ('MEAN', 'SUM', 'MAX', 'MIN'):
+        values = resample.aggregate(stamps, values, labels, step, how)
+    elif how == 'LAST':        values = resample.ffill(stamps, values, labels)
+    elif how == 'DIV':         values = resample.ffill(stamps, values * (freq / tsfreq), labels)
+    elif how == 'ZEROFILL':    values = resample.asfreq(stamps, values, labels, 0.0)
+    elif how == 'INTERPOLATE': values = resample.interpolate(stamps, values, labels)
     else:
         print(f'UNKNOWN method in TRANS, {how}')
         return zeros(1)
 
-    start, steps = siminfo['start'], siminfo['steps']
-    return ts[start:stop].to_numpy().astype(float64)[0:steps]
+    first = np.searchsorted(labels, pd.Timestamp(start).value, side='left')
+    final = np.searchsorted(labels, last, side='right')
+    return np.array(values[first:final][0:steps], dtype=float64)
 
 
 def hoursval(siminfo, hours24, dofirst=False, lapselike=False):
     '''create hours flags, flag on the hour or lapse table over full simulation'''
-    start = siminfo['start']
-    stop  = siminfo['stop']
-    freq  = Minute(siminfo['delt'])
-
-    dr = date_range(start=f'{start.year}-01-01', end=f'{stop.year}-12-31', freq=Minute(60))
-    hours = tile(hours24, (len(dr) + 23) // 24).astype(float)
-    if dofirst:
-        hours[0] = 1
-
-    ts = Series(hours[0:len(dr)], dr)
-    if lapselike:
-        if ts.index.freq > freq:     # upsample
-            ts = ts.resample(freq).asfreq().ffill()
-        elif ts.index.freq < freq:   # downsample
-            ts = ts.resample(freq).mean()
-    else:
-        if ts.index.freq > freq:     # upsample
-            ts = ts.resample(freq).asfreq().fillna(0.0)
-        elif ts.index.freq < freq:   # downsample
-            ts = ts.resample(freq).max()
-    return ts.truncate(start, stop).to_numpy()
+    return sim_calendar(siminfo).hoursval(hours24, dofirst, lapselike).copy()
 
 
 def hourflag(siminfo, hourfg, dofirst=False):
@@ -167,39 +165,13 @@ def hourflag(siminfo, hourfg, dofirst=False):
 
 def monthval(siminfo, monthly):
     ''' returns value at start of month for all times within the month'''
-    start = siminfo['start']
-    stop  = siminfo['stop']
-    freq  = Minute(siminfo['delt'])
-
-    months = tile(monthly, stop.year - start.year + 1).astype(float)
-    dr = date_range(start=f'{start.year}-01-01', end=f'{stop.year}-12-31',
-     freq='MS')
-    ts = Series(months, index=dr).resample('D').ffill()
-
-    if ts.index.freq > freq:     # upsample
-        ts = ts.resample(freq).asfreq().ffill()
-    elif ts.index.freq < freq:   # downsample
-        ts = ts.resample(freq).mean()
-    return ts.truncate(start, stop).to_numpy()
+    return sim_calendar(siminfo).monthval(monthly).copy()
 
 
 def dayval(siminfo, monthly):
     '''broadcasts HSPF monthly data onto timeseries at desired freq with HSPF
     interpolation to day, but constant within day'''
-    start = siminfo['start']
-    stop  = siminfo['stop']
-    freq  = Minute(siminfo['delt'])
-
-    months = tile(monthly, stop.year - start.year + 1).astype(float)
-    dr = date_range(start=f'{start.year}-01-01', end=f'{stop.year}-12-31',
-     freq='MS')
-    ts = Series(months, index=dr).resample('D').interpolate('time')
-
-    if ts.index.freq > freq:     # upsample
-        ts = ts.resample(freq).ffill()
-    elif ts.index.freq < freq:   # downsample
-        ts = ts.resample(freq).mean()
-    return ts.truncate(start, stop).to_numpy()
+    return sim_calendar(siminfo).dayval(monthly).copy()
 
 
 def initm(siminfo, ui, flag, monthly, default):
@@ -276,11 +248,7 @@ def get_timeseries(timeseries_inputs:SupportsReadTS, ext_sourcesdd, siminfo):
     # explicit creation of Numba dictionary with signatures
     ts = Dict.empty(key_type=types.unicode_type, value_type=types.float64[:])
     for row in ext_sourcesdd:
-        data_frame = timeseries_inputs.read_ts(category=Category.INPUTS,segment=row.SVOLNO)
-
-        if row.MFACTOR != 1.0:
-            data_frame *= row.MFACTOR
-        t = transform(data_frame, row.TMEMN, row.TRAN, siminfo)
+        t = transformed_input(timeseries_inputs, row, siminfo)
 
         tname = clean_name(row.TMEMN,row.TMEMSB)
         if tname in ts:
@@ -289,37 +257,90 @@ def get_timeseries(timeseries_inputs:SupportsReadTS, ext_sourcesdd, siminfo):
             ts[tname]  = t
     return ts
 
-def save_timeseries(timeseries:SupportsWriteTS, ts, savedict, siminfo, saveall, operation, segment, activity, compress=True, outstep=2):
-    df = pd.DataFrame(index=siminfo['tindex'])
+# transformed input timeseries shared by the segments reading them, see transformed_input
+_transforms = {}
+
+
+def clear_transforms():
+    '''drop all transformed inputs, called at the start of a run (or time window)'''
+    _transforms.clear()
+
+
+def transformed_input(timeseries_inputs:SupportsReadTS, row, siminfo):
+    '''
+    Input timeseries row.SVOLNO of an EXT_SOURCES row, transformed to the
+    simulation interval and multiplied by row.MFACTOR. The transformation is
+    computed once per source, flow or point type, TRAN, delt and simulation
+    period and then shared; MFACTOR is applied afterwards, as all TRAN methods
+    are linear (MAX and MIN only for MFACTOR >= 0, otherwise not shared).
+    '''
+    if row.MFACTOR < 0.0 and row.TRAN in ('MAX', 'MIN'):
+        data_frame = timeseries_inputs.read_ts(category=Category.INPUTS,segment=row.SVOLNO)
+        return transform(data_frame * row.MFACTOR, row.TMEMN, row.TRAN, siminfo)
+
+    key = (row.SVOLNO, row.TMEMN in flowtype, row.TRAN, siminfo['delt'], siminfo['start'], siminfo['stop'])
+    values = _transforms.get(key)
+    if values is None:
+        data_frame = timeseries_inputs.read_ts(category=Category.INPUTS,segment=row.SVOLNO)
+        values = transform(data_frame, row.TMEMN, row.TRAN, siminfo)
+        values.flags.writeable = False
+        _transforms[key] = values
+    return values * row.MFACTOR   # a new array, the segment may modify it
+
+# output column plans of save_timeseries, by operation, activity, SAVE table and ts names
+_save_plans = {}
+
+
+def save_plan(savedict, ts_names, saveall, operation, activity):
+    '''
+    Columns saved for an activity: the ts names to read, the output column
+    names (sorted) and the columns the output store keeps. Resolved once for
+    each operation, activity, SAVE table, saveall and set of ts names.
+    '''
+    ts_names = frozenset(ts_names)
+    key = (operation, activity, tuple(savedict.items()), saveall, ts_names)
+    plan = _save_plans.get(key)
+    if plan is not None:
+        return plan
+
+    columns = {}    # output name: ts name
     if (operation == 'IMPLND' and activity == 'IQUAL') or (operation == 'PERLND' and activity == 'PQUAL'):
         for y in savedict.keys():
-            for z in set(ts.keys()):
+            for z in ts_names:
                 if '/' + y in z:
-                    zrep = z.replace('/','_')
-                    zrep2 = zrep.replace(' ', '')
-                    df[zrep2] = ts[z]
+                    columns[z.replace('/','_').replace(' ', '')] = z
                 if '_' + y in z:
-                    df[z] = ts[z]
+                    columns[z] = z
     elif (operation == 'RCHRES' and (activity == 'CONS' or activity == 'GQUAL')):
         for y in savedict.keys():
-            for z in set(ts.keys()):
+            for z in ts_names:
                 if '_' + y in z:
-                    df[z] = ts[z]
-        for y in (savedict.keys() & set(ts.keys())):
-            df[y] = ts[y]
+                    columns[z] = z
+        for y in (savedict.keys() & ts_names):
+            columns[y] = y
     else:
-        for y in (savedict.keys() & set(ts.keys())):
-            df[y] = ts[y]
-    df = df.astype(np.float32).sort_index(axis='columns')
+        for y in (savedict.keys() & ts_names):
+            columns[y] = y
 
+    names = sorted(columns)
     if saveall:
-        save_columns = df.columns
+        save_columns = names
     else:
         save_columns = [key for key,value in savedict.items() if value or saveall]
+    plan = _save_plans[key] = ([columns[name] for name in names], names, save_columns)
+    return plan
+
+
+def save_timeseries(timeseries:SupportsWriteTS, ts, savedict, siminfo, saveall, operation, segment, activity, compress=True, outstep=2):
+    sources, names, save_columns = save_plan(savedict, ts.keys(), saveall, operation, activity)
 
-    if not df.empty:
+    if names:
+        # one preallocated block, a column per saved timeseries
+        block = np.empty((len(siminfo['tindex']), len(names)), dtype=float64, order='F')
+        for column, name in enumerate(sources):
+            block[:, column] = ts[name]
         timeseries.write_ts(
-            data_frame=df,
+            data_frame=pd.DataFrame(block, index=siminfo['tindex'], columns=names, copy=False),
             save_columns=save_columns,
             category = Category.RESULTS,
             operation=operation,
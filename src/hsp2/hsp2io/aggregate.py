@@ -0,0 +1,109 @@
+from math import isnan
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+from numba import njit
+from pandas.tseries.offsets import MonthEnd, YearEnd
+
+# BINOUT outstep of the daily, monthly and annual output
+RULES = {3: 'D', 4: 'M', 5: 'Y'}
+
+_DAY = np.int64(86_400_000_000_000)
+
+# period boundaries of the indexes seen, keyed by (rule, first, last, length);
+# the activities of a run share a few simulation time indexes
+_periods = {}
+
+
+def periods(index:pd.DatetimeIndex, outstep:int) -> Tuple[np.ndarray, pd.DatetimeIndex]:
+	"""Row numbers where each aggregation period of index starts, and the period labels.
+
+	The periods are those of the pandas resample used before: days counted from
+	the first timestamp labelled by their start (origin='start'), and calendar
+	months and years labelled by their last day.
+	"""
+	rule = RULES[outstep]
+	if len(index) == 0:
+		return np.zeros(0, dtype=np.int64), pd.DatetimeIndex([], name=index.name)
+	key = (rule, index[0], index[-1], len(index))
+	if key not in _periods:
+		if len(_periods) > 64:
+			_periods.clear()
+		_periods[key] = _boundaries(index, rule)
+	starts, labels = _periods[key]
+	return starts, labels.rename(index.name)
+
+
+def _boundaries(index, rule):
+	stamps = index.to_numpy(dtype='datetime64[ns]').view(np.int64)
+	if rule == 'D':
+		codes = (stamps - stamps[0]) // _DAY
+	elif rule == 'M':
+		codes = index.year.to_numpy() * 12 + index.month.to_numpy()
+	else:
+		codes = index.year.to_numpy()
+	starts = np.concatenate(([0], np.flatnonzero(np.diff(codes)) + 1)).astype(np.int64)
+	if rule == 'D':
+		labels = pd.DatetimeIndex((stamps[0] + codes[starts] * _DAY).view('datetime64[ns]'))
+	elif rule == 'M':
+		labels = index[starts].normalize() + MonthEnd(0)
+	else:
+		labels = index[starts].normalize() + YearEnd(0)
+	starts.flags.writeable = False
+	return starts, pd.DatetimeIndex(labels.to_numpy(), freq=None)
+
+
+def aggregate(data_frame:pd.DataFrame, outstep:int, extremes:bool=False) -> pd.DataFrame:
+	"""Daily (outstep 3), monthly (4) or annual (5) last, sum and mean of every column,
+	as columns NAME_last, then NAME_sum, then NAME_aver; with extremes also NAME_min
+	and NAME_max. Missing values are skipped, as by pandas."""
+	starts, labels = periods(data_frame.index, outstep)
+	columns = list(data_frame.columns)
+	values = np.ascontiguousarray(data_frame.to_numpy(dtype=np.float64))
+	result = _aggregate_(values, starts, extremes)
+	suffixes = ['_last', '_sum', '_aver'] + (['_min', '_max'] if extremes else [])
+	names = [f'{column}{suffix}' for suffix in suffixes for column in columns]
+	dtype = np.float32 if all(dtype == np.float32 for dtype in data_frame.dtypes) else np.float64
+	return pd.DataFrame(result.astype(dtype, copy=False), index=labels, columns=names, copy=False)
+
+
+@njit(cache=True)
+def _aggregate_(values, starts, extremes):
+	''' one pass over the rows, accumulating every column of the current period '''
+	rows, columns = values.shape
+	width = 5 if extremes else 3
+	result = np.full((len(starts), width * columns), np.nan)
+	total = np.zeros(columns)
+	count = np.zeros(columns, dtype=np.int64)
+	last = np.zeros(columns)
+	low = np.zeros(columns)
+	high = np.zeros(columns)
+	for period in range(len(starts)):
+		first = starts[period]
+		stop = starts[period + 1] if period + 1 < len(starts) else rows
+		total[:] = 0.0
+		count[:] = 0
+		for row in range(first, stop):
+			for column in range(columns):
+				value = values[row, column]
+				if isnan(value):
+					continue
+				if count[column] == 0:
+					low[column] = value
+					high[column] = value
+				else:
+					low[column] = min(low[column], value)
+					high[column] = max(high[column], value)
+				total[column] += value
+				count[column] += 1
+				last[column] = value
+		for column in range(columns):
+			result[period, columns + column] = total[column]
+			if count[column]:
+				result[period, column] = last[column]
+				result[period, 2 * columns + column] = total[column] / count[column]
+				if extremes:
+					result[period, 3 * columns + column] = low[column]
+					result[period, 4 * columns + column] = high[column]
+	return result
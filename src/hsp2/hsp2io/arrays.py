@@ -0,0 +1,192 @@
+import json
+import os
+import zlib
+from hashlib import sha1
+from threading import Lock
+from typing import Any, List, Union
+
+import numpy as np
+import pandas as pd
+
+from hsp2.hsp2io.protocols import Category
+
+
+class ArrayStore:
+	"""Timeseries as chunked columnar NumPy arrays in a directory tree.
+
+	Each timeseries is a directory, RESULTS/{operation}_{segment}/{activity} or
+	TIMESERIES/{segment}, holding meta.json and one subdirectory per column with
+	the column's values in chunks of chunk_rows rows. The time axes are kept once
+	in TIME/ and shared by every timeseries written with the same index.
+
+	Chunks are .npy files read through memory mapping, or with compress=True
+	zlib compressed .z files that are decompressed on read. read_ts only loads
+	the chunks of the columns and time range asked for. Timeseries are written
+	to separate files, so writers of different timeseries do not contend; the
+	run log, versions and profile are written as CSV files in RUN_INFO.
+	"""
+
+	def __init__(self, path:str, compress:bool=False, chunk_rows:int=2**16) -> None:
+		self.path = path
+		self.compress = compress
+		self.chunk_rows = chunk_rows
+		os.makedirs(path, exist_ok=True)
+		# meta.json of a timeseries written in parts is read, updated and replaced
+		self.lock = Lock()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, trace):
+		pass
+
+	def read_ts(self,
+			category:Category,
+			operation:Union[str,None]=None,
+			segment:Union[str,None]=None,
+			activity:Union[str,None]=None,
+			columns:Union[List[str],None]=None,
+			start:Any=None,
+			stop:Any=None) -> pd.DataFrame:
+		"""Reads a timeseries, an empty DataFrame when it does not exist.
+		columns and the [start, stop] time range limit what is read."""
+		directory = self._directory(category, operation, segment, activity)
+		meta = self._meta(directory)
+		if meta is None:
+			return pd.DataFrame()
+		names = meta['columns'] if columns is None else [name for name in columns if name in meta['columns']]
+		lower = None if start is None else pd.Timestamp(start).value
+		upper = None if stop is None else pd.Timestamp(stop).value
+
+		stamps = []
+		values = {name: [] for name in names}
+		for number, part in enumerate(meta['parts']):
+			axis = np.load(os.path.join(self.path, 'TIME', part['axis'] + '.npy'), mmap_mode='r')
+			first = 0 if lower is None else int(np.searchsorted(axis, lower, side='left'))
+			last = len(axis) if upper is None else int(np.searchsorted(axis, upper, side='right'))
+			if first >= last:
+				continue
+			stamps.append(np.asarray(axis[first:last]))
+			for name in names:
+				column = meta['columns'].index(name)
+				values[name].append(self._read_column(directory, meta, column, number, first, last))
+
+		index = pd.DatetimeIndex(np.concatenate(stamps).view('datetime64[ns]') if stamps else [], name=meta['index'],
+			freq=meta.get('freq'))
+		data = {name: np.concatenate(parts) if parts else np.zeros(0, dtype=meta['dtypes'][name])
+			for name, parts in values.items()}
+		if meta['series'] is not False:
+			return pd.Series(data[names[0]] if names else [], index=index, name=meta['series'])
+		return pd.DataFrame(data, index=index, columns=names)
+
+	def write_ts(self,
+			data_frame:pd.DataFrame,
+			category:Category,
+			operation:Union[str,None]=None,
+			segment:Union[str,None]=None,
+			activity:Union[str,None]=None,
+			*args:Any,
+			append:Union[bool,None]=None,
+			**kwargs:Any) -> None:
+		"""Saves a timeseries. append=None or False replaces it, append=True adds the rows
+		of data_frame, which follow those already written, as a new part."""
+		directory = self._directory(category, operation, segment, activity)
+		series = data_frame.name if isinstance(data_frame, pd.Series) else False
+		if series is not False:
+			data_frame = data_frame.to_frame()
+		columns = [str(name) for name in data_frame.columns]
+		axis = self._write_axis(data_frame.index)
+
+		with self.lock:
+			meta = self._meta(directory) if append else None
+			if meta is not None and meta['columns'] != columns:
+				raise ValueError(f'columns of {directory} differ from those already written')
+			if meta is None:
+				for name in os.listdir(directory) if os.path.isdir(directory) else []:
+					if name.startswith('c'):
+						for chunk in os.listdir(os.path.join(directory, name)):
+							os.remove(os.path.join(directory, name, chunk))
+				# the frequency of input timeseries decides how transform resamples them
+				meta = {'columns': columns, 'series': series, 'index': data_frame.index.name,
+					'freq': getattr(data_frame.index, 'freqstr', None),
+					'dtypes': {name: data_frame[column].dtype.str for name, column in zip(columns, data_frame.columns)},
+					'compress': self.compress, 'chunk_rows': self.chunk_rows, 'parts': []}
+			number = len(meta['parts'])
+			for column, name in enumerate(data_frame.columns):
+				values = np.ascontiguousarray(data_frame[name].to_numpy())
+				folder = os.path.join(directory, f'c{column:04d}')
+				os.makedirs(folder, exist_ok=True)
+				for chunk, first in enumerate(range(0, len(values), meta['chunk_rows'])):
+					self._write_chunk(os.path.join(folder, f'{number:04d}_{chunk:06d}'),
+						values[first:first + meta['chunk_rows']], meta['compress'])
+			meta['parts'].append({'axis': axis, 'rows': len(data_frame)})
+			_replace(os.path.join(directory, 'meta.json'), json.dumps(meta).encode())
+
+	def write_log(self, hsp2_log:pd.DataFrame) -> None:
+		self._write_info(hsp2_log, 'LOGFILE')
+
+	def write_versioning(self, versioning:pd.DataFrame) -> None:
+		self._write_info(versioning, 'VERSIONS')
+
+	def write_profile(self, profile:pd.DataFrame) -> None:
+		self._write_info(profile, 'PROFILE')
+
+	def _write_info(self, data_frame:pd.DataFrame, name:str) -> None:
+		os.makedirs(os.path.join(self.path, 'RUN_INFO'), exist_ok=True)
+		data_frame.to_csv(os.path.join(self.path, 'RUN_INFO', name + '.csv'))
+
+	def _directory(self, category, operation, segment, activity) -> str:
+		if category == Category.INPUTS:
+			return os.path.join(self.path, 'TIMESERIES', f'{segment}')
+		return os.path.join(self.path, 'RESULTS', f'{operation}_{segment}', f'{activity}')
+
+	def _meta(self, directory:str) -> Union[dict, None]:
+		try:
+			with open(os.path.join(directory, 'meta.json')) as file:
+				return json.load(file)
+		except FileNotFoundError:
+			return None
+
+	def _write_axis(self, index:pd.Index) -> str:
+		"""stores the time axis once under TIME/, named by its digest"""
+		stamps = np.ascontiguousarray(pd.DatetimeIndex(index).to_numpy(dtype='datetime64[ns]').view(np.int64))
+		name = sha1(stamps.tobytes()).hexdigest()
+		path = os.path.join(self.path, 'TIME', name + '.npy')
+		if not os.path.exists(path):
+			os.makedirs(os.path.dirname(path), exist_ok=True)
+			temporary = f'{path}.{os.getpid()}.{id(stamps)}'
+			with open(temporary, 'wb') as file:
+				np.save(file, stamps)
+			os.replace(temporary, path)
+		return name
+
+	def _write_chunk(self, path:str, values:np.ndarray, compress:bool) -> None:
+		if compress:
+			with open(path + '.z', 'wb') as file:
+				file.write(zlib.compress(values.tobytes(), 1))
+		else:
+			np.save(path + '.npy', values)
+
+	def _read_column(self, directory, meta, column, number, first, last) -> np.ndarray:
+		"""rows first:last of part number of a column, from the chunks holding them"""
+		rows = meta['chunk_rows']
+		dtype = np.dtype(meta['dtypes'][meta['columns'][column]])
+		pieces = []
+		for chunk in range(first // rows, (last - 1) // rows + 1):
+			path = os.path.join(directory, f'c{column:04d}', f'{number:04d}_{chunk:06d}')
+			if meta['compress']:
+				with open(path + '.z', 'rb') as file:
+					values = np.frombuffer(zlib.decompress(file.read()), dtype=dtype)
+			else:
+				values = np.load(path + '.npy', mmap_mode='r')
+			offset = chunk * rows
+			pieces.append(values[max(first - offset, 0):last - offset])
+		return np.concatenate(pieces)
+
+
+def _replace(path:str, content:bytes) -> None:
+	"""writes path through a temporary file, so readers never see a partial file"""
+	temporary = f'{path}.{os.getpid()}'
+	with open(temporary, 'wb') as file:
+		file.write(content)
+	os.replace(temporary, path)
@@ -0,0 +1,65 @@
+from collections import defaultdict
+from typing import Dict, Iterable, Tuple, Union
+
+import numpy as np
+
+Source = Tuple[str, str]
+
+class ResultBus:
+	"""In-memory results of the activities, keyed by (operation, segment, group, member).
+
+	IOManager publishes the float32 values it hands to the output store, at
+	simulation resolution (before BINOUT aggregation). float32 is on purpose:
+	get_flows always read its inflows back from the float32 output store, so
+	it gets the same values as before, without the round trip, and the held
+	results take half the memory. IOManager.read_member converts a member to
+	float64 once, as the array get_flows scales.
+	Once consumers are registered, a source segment's results are only held
+	until every downstream segment linked to it has read its inflows.
+	"""
+
+	def __init__(self) -> None:
+		self._results = {}
+		self._consumers = None
+
+	def set_consumers(self, links:Iterable[Tuple[Source, str]]) -> None:
+		"""links: ((operation, segment), target segment) pairs, one per LINKS row read by get_flows.
+		Results of segments without consumers are no longer held."""
+		self._consumers = defaultdict(set)
+		for source, target in links:
+			self._consumers[source].add(target)
+
+	def publish(self, operation:str, segment:str, group:str, members:Dict[str, np.ndarray]) -> None:
+		source = (operation, segment)
+		if self._consumers is not None and not self._consumers.get(source):
+			return
+		self._results.setdefault(source, {})[group] = members
+
+	def get(self, operation:str, segment:str, group:str, member:str) -> Union[np.ndarray, None]:
+		"""Read-only view of a member, or None when the bus does not hold it"""
+		try:
+			array = self._results[(operation, segment)][group][member]
+		except KeyError:
+			return None
+		view = array.view()
+		view.flags.writeable = False
+		return view
+
+	def consumed(self, operation:str, segment:str, target:str) -> None:
+		"""target has read its inflows from (operation, segment); frees the source after its last consumer"""
+		if self._consumers is None:
+			return
+		source = (operation, segment)
+		consumers = self._consumers.get(source)
+		if consumers is None:
+			return
+		consumers.discard(target)
+		if not consumers:
+			del self._consumers[source]
+			self._results.pop(source, None)
+
+	def __contains__(self, source:Source) -> bool:
+		return source in self._results
+
+	def __len__(self) -> int:
+		return len(self._results)
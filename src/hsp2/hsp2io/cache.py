@@ -0,0 +1,89 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Hashable, Union
+
+import numpy as np
+import pandas as pd
+
+
+class TimeseriesCache:
+	"""Least recently used cache of the timeseries read from the input store.
+
+	A frame is stored once, with read-only values, and get hands out shallow
+	copies that share those values instead of deep copies. Callers derive new
+	frames (df * factor, resample, ...) rather than writing into a cached
+	frame; a write into the shared values raises ValueError.
+
+	The cache is bounded by a byte budget: inserting a frame evicts the least
+	recently used frames until the cached bytes fit the budget. A frame larger
+	than the budget is not cached. A budget of None keeps every frame.
+	The cache can be shared by threads, see IOManager.prefetch.
+	"""
+
+	def __init__(self, budget:Union[int,None]) -> None:
+		self.budget = budget
+		self.nbytes = 0
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self._frames = OrderedDict()
+		self._lock = Lock()
+
+	def get(self, key:Hashable) -> Union[pd.DataFrame, pd.Series, None]:
+		"""Shallow copy of the cached frame, or None (a miss) when the cache does not hold it"""
+		with self._lock:
+			try:
+				data_frame, _ = self._frames[key]
+			except KeyError:
+				self.misses += 1
+				return None
+			self._frames.move_to_end(key)
+			self.hits += 1
+		return data_frame.copy(deep=False)
+
+	def put(self, key:Hashable, data_frame:Union[pd.DataFrame, pd.Series]) -> Union[pd.DataFrame, pd.Series]:
+		"""Cache data_frame under key; returns the frame to hand to the caller"""
+		nbytes = int(np.sum(data_frame.memory_usage(index=True)))
+		if self.budget is not None and nbytes > self.budget:
+			return data_frame
+		cached = _read_only(data_frame)
+		with self._lock:
+			if key in self._frames:
+				self.nbytes -= self._frames.pop(key)[1]
+			self._frames[key] = (cached, nbytes)
+			self.nbytes += nbytes
+			while self.budget is not None and self.nbytes > self.budget:
+				_, (_, evicted) = self._frames.popitem(last=False)
+				self.nbytes -= evicted
+				self.evictions += 1
+		return cached.copy(deep=False)
+
+	def clear(self) -> None:
+		with self._lock:
+			self._frames.clear()
+			self.nbytes = 0
+
+	def stats(self) -> dict:
+		return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+			'frames': len(self._frames), 'bytes': self.nbytes}
+
+	def __contains__(self, key:Hashable) -> bool:
+		return key in self._frames
+
+	def __len__(self) -> int:
+		return len(self._frames)
+
+
+def _read_only(data_frame:Union[pd.DataFrame, pd.Series]) -> Union[pd.DataFrame, pd.Series]:
+	"""data_frame backed by a read-only view of its values; frames of mixed dtypes are kept as they are"""
+	if isinstance(data_frame, pd.Series):
+		view = data_frame.to_numpy().view()
+		view.flags.writeable = False
+		return pd.Series(view, index=data_frame.index, name=data_frame.name, copy=False)
+	if len(set(data_frame.dtypes)) != 1:
+		return data_frame
+	# the transposed view is the column-major block pandas holds, so no data is copied
+	block = np.ascontiguousarray(data_frame.to_numpy().T)
+	view = block.view()
+	view.flags.writeable = False
+	return pd.DataFrame(view.T, index=data_frame.index, columns=data_frame.columns, copy=False)
@@ -1,17 +1,99 @@
-from typing import Any, Union
+import json
+import os
+from collections import defaultdict, namedtuple
+from hashlib import sha1
+from threading import Lock
+from typing import Any, Dict, List, Tuple, Union
 
+import numpy as np
 import pandas as pd
 
 from hsp2.hsp2.uci import UCI
 from hsp2.hsp2io.protocols import Category
 
+# top level groups read by read_uci
+UCI_GROUPS = ('CONTROL', 'PERLND', 'IMPLND', 'RCHRES', 'GENER', 'FTABLES', 'SPEC_ACTIONS', 'MONTHDATA')
+# parsed UCI of the last run is saved next to the model file, see read_uci;
+# SNAPSHOT_FORMAT changes with _snapshot
+SNAPSHOT_SUFFIX = '.uci.json'
+SNAPSHOT_FORMAT = 2
+# UCI attributes holding lists of table rows
+_ROWS = ('ddlinks', 'ddmasslinks', 'ddext_sources')
+# UCI tables kept as DataFrames, read from the model file rather than the snapshot
+_FRAME_GROUPS = ('FTABLES', 'SPEC_ACTIONS', 'MONTHDATA')
+
+
+class OutputFormat:
+	"""How HDF5 writes a result timeseries.
+
+	format: 'table' (PyTables table, can be queried and appended to) or 'fixed'
+		(array format, fastest to write and read whole). Timeseries written in
+		parts (chunked runs) are always tables.
+	complib: compressor, e.g. 'zlib', 'blosc:lz4', 'blosc:zstd'; None is zlib
+		when complevel is set.
+	complevel: 0-9, None writes uncompressed.
+	index_columns: tables get every column as an indexed data column (queryable
+		with where); False stores the columns as one block without indexes.
+	chunksize: rows written per PyTables append call of a table, None for pandas' default.
+	expectedrows: expected rows of a table, which PyTables uses to size its chunks.
+
+	There is no chunkshape option: pandas does not pass one on to PyTables, which
+	derives the HDF5 chunk shape of a table from expectedrows instead (and chooses
+	the chunks of compressed fixed format arrays itself).
+	"""
+
+	def __init__(self, format:str='table', complib:Union[str,None]=None, complevel:Union[int,None]=None,
+			index_columns:bool=True, chunksize:Union[int,None]=None, expectedrows:Union[int,None]=None) -> None:
+		if format not in ('table', 'fixed'):
+			raise ValueError(f"OutputFormat format must be 'table' or 'fixed', not '{format}'")
+		if complevel is not None and not 0 <= complevel <= 9:
+			raise ValueError(f'OutputFormat complevel must be 0-9, not {complevel}')
+		self.format = format
+		self.complib = complib
+		self.complevel = complevel
+		self.index_columns = index_columns
+		self.chunksize = chunksize
+		self.expectedrows = expectedrows
+
+	def options(self, parts:bool=False) -> Dict[str, Any]:
+		"""to_hdf keywords; parts for a timeseries written in parts"""
+		options = {'complevel': self.complevel}
+		if self.complib is not None and self.complevel:
+			options['complib'] = self.complib
+		if self.format == 'fixed' and not parts:
+			options['format'] = 'fixed'
+			return options
+		options['format'] = 't'
+		if self.index_columns and not parts:
+			options['data_columns'] = True
+		else:
+			options['index'] = False
+		if self.chunksize is not None:
+			options['chunksize'] = self.chunksize
+		if self.expectedrows is not None:
+			options['expectedrows'] = self.expectedrows
+		return options
+
+	def __repr__(self) -> str:
+		return (f'OutputFormat(format={self.format!r}, complib={self.complib!r}, complevel={self.complevel!r}, '
+			f'index_columns={self.index_columns!r}, chunksize={self.chunksize!r}, expectedrows={self.expectedrows!r})')
+
 
 class HDF5:
 
-	def __init__(self, file_path:str) -> None:
+	def __init__(self, file_path:str, uci_snapshot:bool=False, output_format:Union['OutputFormat',None]=None,
+			activity_formats:Union[Dict[Union[str, Tuple[str, str]], 'OutputFormat'],None]=None) -> None:
+		"""uci_snapshot: save the parsed UCI as JSON in {model}.uci.json and reuse it, see read_uci.
+		output_format: how result timeseries are written, default OutputFormat().
+		activity_formats: OutputFormats of single activities, keyed by activity name
+		('RQUAL') or by (operation, activity) (('RCHRES', 'RQUAL'))."""
 		self.file_path = file_path
+		self.uci_snapshot = uci_snapshot
+		self.output_format = OutputFormat() if output_format is None else output_format
+		self.activity_formats = {} if activity_formats is None else dict(activity_formats)
 		self._store = pd.HDFStore(file_path)
-		None
+		# PyTables is not thread safe; results are written by IOManager's background writer
+		self.lock = Lock()
 
 	def __del__(self):
 		self._store.close()
@@ -29,9 +111,35 @@ class HDF5:
 
 		Returns: UCITuple
 
+		Only the UCI groups of the file are read. With uci_snapshot the parsed UCI
+		is also saved as JSON in a file next to the model (snapshot_path), keyed by a
+		digest of the UCI tables, and reused by later runs while the tables are
+		unchanged. The model file itself is not written.
 		"""
+		keys = self._uci_keys()
+		if not self.uci_snapshot:
+			return self._parse_uci(keys)
+		digest = self._uci_digest(keys)
+		uci = self._read_snapshot(digest, keys)
+		if uci is None:
+			uci = self._parse_uci(keys)
+			self._write_snapshot(digest, uci)
+		return uci
+
+	def _uci_keys(self) -> List[str]:
+		"""paths of the pandas objects in the UCI groups, without walking RESULTS and TIMESERIES"""
+		keys = []
+		with self.lock:
+			for group in UCI_GROUPS:
+				if self._store.get_node(group) is None:
+					continue
+				for path, _, leaves in self._store.walk(f'/{group}'):
+					keys.extend(f'{path}/{leaf}' for leaf in leaves)
+		return sorted(keys)
+
+	def _parse_uci(self, keys:List[str]) -> UCI:
 		uci = UCI()
-		for path in self._store.keys():   # finds ALL data sets into HDF5 file
+		for path in keys:
 			op, module, *other = path[1:].split(sep='/', maxsplit=3)
 			s = '_'.join(other)
 			if op == 'CONTROL':
@@ -78,18 +186,80 @@ class HDF5:
 				uci.monthdata[f'{op}/{module}'] = self._store[path]
 		return uci
 
+	def _uci_digest(self, keys:List[str]) -> str:
+		"""digest of the stored UCI tables, from their raw PyTables leaves"""
+		digest = sha1(f'{SNAPSHOT_FORMAT} {pd.__version__}'.encode())
+		with self.lock:
+			for key in keys:
+				digest.update(key.encode())
+				node = self._store.get_node(key)
+				for leaf in node._f_walknodes('Leaf') if hasattr(node, '_f_walknodes') else [node]:
+					values = leaf.read()
+					if isinstance(values, np.ndarray) and values.dtype != object:
+						digest.update(values.tobytes())
+					else:
+						digest.update(repr(values.tolist() if isinstance(values, np.ndarray) else values).encode())
+		return digest.hexdigest()
+
+	@property
+	def snapshot_path(self) -> str:
+		return os.path.splitext(self.file_path)[0] + SNAPSHOT_SUFFIX
+
+	def _read_snapshot(self, digest:str, keys:List[str]) -> Union[UCI, None]:
+		try:
+			with open(self.snapshot_path) as file:
+				snapshot = json.load(file)
+		except (OSError, ValueError):
+			return None
+		if snapshot.get('digest') != digest:
+			return None
+		# the DataFrames of the UCI are read from the model file
+		uci = self._parse_uci([key for key in keys if _frame_key(key)])
+		_restore(uci, snapshot)
+		return uci
+
+	def _write_snapshot(self, digest:str, uci:UCI) -> None:
+		path = self.snapshot_path
+		try:
+			with open(path + '.tmp', 'w') as file:
+				json.dump({'digest': digest, **_snapshot(uci)}, file, default=_native)
+			os.replace(path + '.tmp', path)
+		except OSError:
+			pass   # the snapshot only saves parsing time
+
 	def read_ts(self,
 			category:Category,
 			operation:Union[str,None]=None,
 			segment:Union[str,None]=None,
-			activity:Union[str,None]=None) -> pd.DataFrame:
+			activity:Union[str,None]=None,
+			columns:Union[List[str],None]=None,
+			start:Any=None,
+			stop:Any=None) -> pd.DataFrame:
+		"""Reads a timeseries, an empty DataFrame when it does not exist.
+		columns (members missing from the table are left out) and the [start, stop]
+		time range are selected by PyTables for tables (format 't'), so only those
+		rows and columns are read; fixed format timeseries are read whole and then selected."""
 		try:
 			path = ''
 			if category == category.INPUTS:
 				path = f'TIMESERIES/{segment}'
 			elif category == category.RESULTS:
 				path = f'RESULTS/{operation}_{segment}/{activity}'
-			return pd.read_hdf(self._store, path)
+			with self.lock:
+				storer = self._store.get_storer(path)
+				if not storer.is_table:
+					return _select(self._store.select(path), columns, start, stop)
+				where = []
+				if start is not None:
+					where.append(f"index>='{pd.Timestamp(start)}'")
+				if stop is not None:
+					where.append(f"index<='{pd.Timestamp(stop)}'")
+				if columns is not None and storer.non_index_axes:
+					available = storer.non_index_axes[0][1]
+					columns = [column for column in columns if column in available]
+				else:
+					columns = None
+				return self._store.select(path, where=where or None, columns=columns)
 		except KeyError:
 			return pd.DataFrame()
 
@@ -100,22 +270,93 @@ class HDF5:
 			segment:str,
 			activity:str,
 			*args:Any,
+			append:Union[bool,None]=None,
+			compress:bool=True,
 			**kwargs:Any) -> None:
-		"""Saves timeseries to HDF5"""
+		"""Saves timeseries to HDF5 in the OutputFormat of the operation and activity.
+		append=None writes the whole timeseries at once. Timeseries written in parts
+		start with append=False and add the later parts with append=True; these are
+		always tables without data columns, which PyTables would update on every append.
+		compress=False writes without compression whatever the OutputFormat."""
 		path=f'{operation}_{segment}/{activity}'
 		if category:
 			path = 'RESULTS/' + path
-		complevel = None
-		if 'compress' in kwargs:
-			if kwargs['compress']:
-				complevel = 9
-		data_frame.to_hdf(self._store, key=path, format='t', data_columns=True, complevel=complevel)
-		#data_frame.to_hdf(self._store, key=path)
+		output_format = self.output_format_for(operation, activity)
+		options = output_format.options(append is not None)
+		if not compress:
+			options.pop('complib', None)
+			options['complevel'] = None
+		with self.lock:
+			if append is None:
+				data_frame.to_hdf(self._store, key=path, **options)
+			else:
+				data_frame.to_hdf(self._store, key=path, append=append, **options)
+
+	def output_format_for(self, operation:str, activity:str) -> 'OutputFormat':
+		"""the OutputFormat of (operation, activity), else of activity, else the run's"""
+		formats = self.activity_formats
+		return formats.get((operation, activity), formats.get(activity, self.output_format))
 
 	def write_log(self, hsp2_log:pd.DataFrame) -> None:
-		hsp2_log.to_hdf(self._store, key='RUN_INFO/LOGFILE', data_columns=True, format='t')
+		with self.lock:
+			hsp2_log.to_hdf(self._store, key='RUN_INFO/LOGFILE', data_columns=True, format='t')
 
 	def write_versioning(self, versioning:pd.DataFrame) -> None:
-		versioning.to_hdf(self._store, key='RUN_INFO/VERSIONS', data_columns=True, format='t')
+		with self.lock:
+			versioning.to_hdf(self._store, key='RUN_INFO/VERSIONS', data_columns=True, format='t')
+
+	def write_profile(self, profile:pd.DataFrame) -> None:
+		with self.lock:
+			profile.to_hdf(self._store, key='RUN_INFO/PROFILE', data_columns=True, format='t')
+
+
+def _frame_key(key:str) -> bool:
+	"""UCI tables that _parse_uci keeps as DataFrames"""
+	return key == '/CONTROL/OP_SEQUENCE' or key[1:].split('/')[0] in _FRAME_GROUPS
+
+
+def _snapshot(uci:UCI) -> dict:
+	"""JSON-ready copy of the parsed parts of uci; the itertuples rows become lists plus their field names"""
+	snapshot = {
+		'siminfo': {name: str(value) if isinstance(value, pd.Timestamp) else value for name, value in uci.siminfo.items()},
+		'uci': [[*key, tables] for key, tables in uci.uci.items()],
+		'ddgener': uci.ddgener,
+	}
+	for name in _ROWS:
+		rows = getattr(uci, name)
+		fields = next((row._fields for values in rows.values() for row in values), ())
+		# ddext_sources is keyed by (TVOL, TVOLNO)
+		snapshot[name] = [fields, [[key, [list(row) for row in values]] for key, values in rows.items()]]
+	return snapshot
+
+
+def _restore(uci:UCI, snapshot:dict) -> None:
+	"""adds the parts of a _snapshot to uci"""
+	uci.siminfo = {name: pd.Timestamp(value) if name in ('start', 'stop') else value
+		for name, value in snapshot['siminfo'].items()}
+	for *key, tables in snapshot['uci']:
+		uci.uci[tuple(key)] = tables
+	for module, segments in snapshot['ddgener'].items():
+		uci.ddgener[module] = segments
+	for name in _ROWS:
+		fields, rows = snapshot[name]
+		Row = namedtuple('Pandas', fields, rename=True)
+		target = getattr(uci, name)
+		for key, values in rows:
+			target[tuple(key) if isinstance(key, list) else key] = [Row(*row) for row in values]
+
+
+def _native(value:Any) -> Any:
+	"""NumPy scalars for json.dump"""
+	if isinstance(value, np.generic):
+		return value.item()
+	raise TypeError(f'{type(value).__name__} is not JSON serializable')
 
 
+def _select(data_frame:pd.DataFrame, columns:Union[List[str],None], start:Any, stop:Any) -> pd.DataFrame:
+	"""the columns and [start, stop] rows of a timeseries read whole"""
+	if columns is not None and isinstance(data_frame, pd.DataFrame):
+		data_frame = data_frame[[column for column in columns if column in data_frame.columns]]
+	if start is not None or stop is not None:
+		data_frame = data_frame.loc[start:stop]
+	return data_frame
@@ -1,10 +1,19 @@
+import numpy as np
 import pandas as pd
 from pandas.core.frame import DataFrame
+from hsp2.hsp2io.bus import ResultBus
+from hsp2.hsp2io.cache import TimeseriesCache
+from hsp2.hsp2io.aggregate import aggregate, periods
+from hsp2.hsp2io.writer import BackgroundWriter
 from hsp2.hsp2io.protocols import Category, SupportsReadUCI, SupportsReadTS, SupportsWriteTS, SupportsWriteLogging
-from typing import Union, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable, Union, List
 
 from hsp2.hsp2.uci import UCI
 
+# bytes of queued result timeseries for the background writer of main and the hsp2 run command
+WRITE_BUDGET = 256 * 2**20
+
 class IOManager:
 	"""Management class for IO operations needed to execute the HSP2 model"""
 
@@ -13,7 +22,9 @@ class IOManager:
 			uci: Union[SupportsReadUCI,None]=None,
 			input: Union[SupportsReadTS,None]=None,
 			output: Union[SupportsReadTS,SupportsWriteTS,None]=None,
-			log: Union[SupportsWriteLogging,None]=None,) -> None:
+			log: Union[SupportsWriteLogging,None]=None,
+			write_budget: Union[int,None]=None,
+			cache_budget: Union[int,None]=1024 * 2**20,) -> None:
 		""" io_combined: SupportsReadUCI & SupportsReadTS & SupportsWriteTS & SupportsWriteLogging / None
 			Intended to allow users with a object that combines protocols for
 			UCI, Input, Output and Log a shortcut where only a
@@ -37,6 +48,15 @@ class IOManager:
 			A class implementing SupportWriteLogging protocol. This class
 			This class acts as the location to output logging information.
 			The argument io_combined be used in place by default if this argument is not specified.
+		write_budget: int/None (Default None)
+			None writes result timeseries synchronously. Otherwise they are written to
+			output by a background thread so the simulation can continue while they are
+			aggregated and stored; write_ts blocks when the writes still queued exceed
+			this many bytes (main and the hsp2 run command use WRITE_BUDGET).
+		cache_budget: int/None (Default 1 GiB)
+			Input timeseries are cached after their first read. The least recently
+			used ones are evicted when the cached bytes exceed this many bytes.
+			None never evicts. Hits, misses and evictions are counted in cache.
 		"""
 
 		self._input = io_combined if input is None else input
@@ -44,9 +64,23 @@ class IOManager:
 		self._uci = io_combined if uci is None else uci
 		self._log = io_combined if log is None else log
 
-		self._in_memory = {}
+		self.cache = TimeseriesCache(cache_budget)
+		self.bus = ResultBus()
+		self._writer = None if write_budget is None else BackgroundWriter(write_budget)
+		self._window = None
+		self._appending = set()
+		self._tails = {}
+		# sizes of the timeseries read from the stores and handed to write_ts, for the run profile
+		self.bytes_read = 0
+		self.bytes_written = 0
+		# input timeseries being read by prefetch threads, keyed like the cache
+		self._prefetching = {}
+		self._prefetcher = None
 
 	def __del__(self):
+		self.end_prefetch()
+		if self._writer is not None:
+			self._writer.close()
 		del(self._input)
 		del(self._output)
 		del(self._uci)
@@ -63,68 +97,181 @@ class IOManager:
 			segment:Union[str,None]=None,
 			activity:Union[str,None]=None,
 		    outstep:int=2,
+			compress:bool=True,
 			*args, **kwargs) -> None:
-		key = (category, operation, segment, activity)
-		self._in_memory[key] = data_frame.copy(deep=True)
+		"""compress=False asks the output store to write data_frame uncompressed"""
+		self.bytes_written += int(np.sum(data_frame.memory_usage(index=True)))
+		if category == Category.RESULTS:
+			# get_flows reads the float32 values the output store gets, unaggregated, from the bus
+			data_frame = data_frame.astype(np.float32)
+			self.bus.publish(operation, segment, activity,
+				{column: data_frame[column].to_numpy() for column in data_frame.columns})
+
+		# rows of the last aggregation period of a time window wait for the next window
+		hold = self._window is not None and not self._window[1]
+		if self._writer is None:
+			self._write_output(data_frame, save_columns, category, operation, segment, activity, outstep, hold, compress)
+		else:
+			nbytes = int(data_frame.memory_usage(index=True).sum())
+			self._writer.submit(nbytes, self._write_output, data_frame, save_columns, category, operation, segment, activity, outstep, hold, compress)
+
+	def begin_window(self, first:bool, last:bool, start:Any=None, stop:Any=None) -> None:
+		"""Start a time window [start, stop] of a chunked run (see main). Results of a window
+		are appended to those of the previous windows. For aggregated output (outstep 3, 4 and 5)
+		the rows of the last, possibly incomplete, period of a window are held back and aggregated
+		together with the next window, so every period is stored once."""
+		if first:
+			self.flush()
+			self._appending = set()
+			self._tails = {}
+		self._window = (first, last, start, stop)
+
+	def end_windows(self) -> None:
+		"""End a chunked run; called after the last window"""
+		self.flush()
+		self._window = None
 
+	def flush(self) -> None:
+		"""Wait for the background writer to store all queued result timeseries"""
+		if self._writer is not None:
+			self._writer.flush()
+
+	def _write_output(self,
+			data_frame:pd.DataFrame,
+			save_columns: List[str],
+			category:Category,
+			operation:Union[str,None],
+			segment:Union[str,None],
+			activity:Union[str,None],
+			outstep:int,
+			hold:bool=False,
+			compress:bool=True) -> None:
 		drop_columns = [c for c in data_frame.columns if c not in save_columns ]
 		if drop_columns:
 			data_frame = data_frame.drop(columns=drop_columns)
 
-		if outstep == 3:
-			# change time step of output to daily
-			sumdf1 = data_frame.resample('D',kind='timestamp',origin='start').sum()
-			lastdf2 = data_frame.resample('D', kind='timestamp', origin='start').last()
-			meandf3 = data_frame.resample('D', kind='timestamp', origin='start').mean()
-			data_frame= pd.merge(lastdf2.add_suffix('_last'), sumdf1.add_suffix('_sum'), left_index=True, right_index=True)
-			data_frame = pd.merge(data_frame, meandf3.add_suffix('_aver'), left_index=True,right_index=True)
-		elif outstep == 4:
-			# change to monthly
-			sumdf1 = data_frame.resample('M',kind='timestamp',origin='start').sum()
-			lastdf2 = data_frame.resample('M', kind='timestamp', origin='start').last()
-			meandf3 = data_frame.resample('M', kind='timestamp', origin='start').mean()
-			data_frame = pd.merge(lastdf2.add_suffix('_last'), sumdf1.add_suffix('_sum'), left_index=True, right_index=True)
-			data_frame = pd.merge(data_frame, meandf3.add_suffix('_aver'), left_index=True, right_index=True)
-		elif outstep == 5:
-			# change to annual
-			sumdf1 = data_frame.resample('Y',kind='timestamp',origin='start').sum()
-			lastdf2 = data_frame.resample('Y', kind='timestamp', origin='start').last()
-			meandf3 = data_frame.resample('Y', kind='timestamp', origin='start').mean()
-			data_frame = pd.merge(lastdf2.add_suffix('_last'), sumdf1.add_suffix('_sum'), left_index=True, right_index=True)
-			data_frame = pd.merge(data_frame, meandf3.add_suffix('_aver'), left_index=True, right_index=True)
-		self._output.write_ts(data_frame, category, operation, segment, activity)
+		key = (category, operation, segment, activity)
+		if outstep in (3, 4, 5):
+			tail = self._tails.pop(key, None)
+			if tail is not None:
+				data_frame = pd.concat([tail, data_frame])
+			if hold:
+				starts, _ = periods(data_frame.index, outstep)
+				self._tails[key] = data_frame.iloc[starts[-1]:]
+				data_frame = data_frame.iloc[:starts[-1]]
+				if data_frame.empty:
+					return
+			# change time step of output to daily, monthly or annual
+			data_frame = aggregate(data_frame, outstep)
+
+		if self._window is None:
+			self._output.write_ts(data_frame, category, operation, segment, activity, compress=compress)
+		else:
+			self._output.write_ts(data_frame, category, operation, segment, activity, append=key in self._appending, compress=compress)
+			self._appending.add(key)
 
 	def read_ts(self,
 			category:Category,
 			operation:Union[str,None]=None,
 			segment:Union[str,None]=None,
 			activity:Union[str,None]=None,
+			columns:Union[List[str],None]=None,
+			start:Any=None,
+			stop:Any=None,
 			*args, **kwargs) -> pd.DataFrame:
-		data_frame = self._get_in_memory(category, operation, segment, activity)
-		if data_frame is not None:
-			return data_frame
+		"""columns and the [start, stop] time range limit what is read of results from the
+		output store; inputs are always read whole"""
 		if category == Category.INPUTS:
-			data_frame = self._input.read_ts(category, operation, segment, activity)
+			# cached frames are shared, read-only: derive new frames instead of writing into them
 			key = (category, operation, segment, activity)
-			self._in_memory[key] = data_frame.copy(deep=True)
+			future = self._prefetching.pop(key, None)
+			if future is not None:
+				future.result()   # re-raises an error of the read
+			data_frame = self.cache.get(key)
+			if data_frame is None:
+				data_frame = self._read_input(key)
+			elif future is None:
+				return data_frame
+			# counted at first use, so a prefetched input is charged to the segment using it
+			self.bytes_read += int(np.sum(data_frame.memory_usage(index=True)))
 			return data_frame
 		if category == Category.RESULTS:
-			return self._output.read_ts(category, operation, segment, activity)
+			self.flush()
+			# only selections that were asked for, so backends without them keep working
+			selection = {name: value for name, value in (('columns', columns), ('start', start), ('stop', stop))
+				if value is not None}
+			data_frame = self._output.read_ts(category, operation, segment, activity, **selection)
+			self.bytes_read += int(np.sum(data_frame.memory_usage(index=True)))
+			return data_frame
 		return pd.DataFrame
 
+	def prefetch(self, segments:Iterable[str], threads:int=4) -> None:
+		"""Starts reading the input timeseries of segments (TIMESERIES/{segment}), in that
+		order, into the cache on a pool of threads, so the simulation does not wait for them.
+		read_ts of a timeseries still being read waits for its thread. Prefetching stops
+		once the cache is full; later timeseries are read when they are first used.
+		Backends serialize their own reads (HDF5 holds a lock per file). Call end_prefetch
+		before closing the input store."""
+		self.end_prefetch()
+		self._prefetcher = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='hsp2-prefetch')
+		for segment in dict.fromkeys(segments):
+			key = (Category.INPUTS, None, segment, None)
+			if key not in self.cache and key not in self._prefetching:
+				self._prefetching[key] = self._prefetcher.submit(self._prefetch_input, key)
+
+	def end_prefetch(self) -> None:
+		"""Cancels the prefetching of the inputs not yet started and waits for the reads
+		still running"""
+		if self._prefetcher is None:
+			return
+		for future in self._prefetching.values():
+			future.cancel()
+		self._prefetcher.shutdown(wait=True)
+		self._prefetcher = None
+		self._prefetching = {}
+
+	def _read_input(self, key) -> pd.DataFrame:
+		"""reads an input timeseries into the cache"""
+		return self.cache.put(key, self._input.read_ts(*key))
+
+	def _prefetch_input(self, key) -> None:
+		if self.cache.budget is None or self.cache.nbytes < self.cache.budget:
+			self._read_input(key)
+
+	def read_member(self,
+			operation:str,
+			segment:str,
+			activity:str,
+			member:str,
+			start:Any=None,
+			stop:Any=None) -> Union[np.ndarray, None]:
+		"""float64 values of one results member, from the result bus when it still holds
+		them, otherwise from the output store, where only the member and the [start, stop]
+		rows are read (default the current time window of a chunked run). None when the
+		member does not exist. The array is a new one the caller may scale in place."""
+		values = self.bus.get(operation, segment, activity, member)
+		if values is not None:
+			return values.astype(np.float64)
+		after = None
+		if self._window is not None and start is None and stop is None:
+			# the output store also holds the earlier time windows of a chunked run; the
+			# rows of the current window are labeled (window start, window stop]
+			after, start, stop = self._window[2], self._window[2], self._window[3]
+		data_frame = self.read_ts(Category.RESULTS, operation, segment, activity, columns=[member], start=start, stop=stop)
+		if after is not None:
+			data_frame = data_frame[data_frame.index > after]
+		if member in data_frame.columns:
+			return data_frame[member].to_numpy(dtype=np.float64, copy=True)
+		return None
+
 	def write_log(self, data_frame)-> None:
+		self.flush()
 		if self._log: self._log.write_log(data_frame)
 
 	def write_versioning(self, data_frame)-> None:
+		self.flush()
 		if self._log: self._log.write_versioning(data_frame)
 
-	def _get_in_memory(self,
-			category:Category,
-			operation:Union[str,None]=None,
-			segment:Union[str,None]=None,
-			activity:Union[str,None]=None) -> Union[pd.DataFrame, None]:
-		key = (category, operation, segment, activity)
-		try:
-			return self._in_memory[key].copy(deep=True)
-		except KeyError:
-			return None
+	def write_profile(self, data_frame)-> None:
+		self.flush()
+		if self._log: self._log.write_profile(data_frame)
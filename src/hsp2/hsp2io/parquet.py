@@ -0,0 +1,118 @@
+import json
+import os
+from threading import Lock
+from typing import Any, List, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from hsp2.hsp2io.protocols import Category
+
+
+class Parquet:
+	"""Timeseries in partitioned Parquet datasets; needs pyarrow (pip install hsp2[parquet]).
+
+	Results are written to RESULTS/OPERATION={operation}/ACTIVITY={activity}/SEGMENT={segment}/
+	and input timeseries are read from TIMESERIES/SEGMENT={segment}/, so Arrow tools can
+	open RESULTS, or one operation or activity of it, as a hive partitioned dataset.
+	A timeseries is one or more part files, one per write (time window), with the
+	time index stored as the pandas index. read_ts only reads the columns asked for.
+	The run log, versions and profile are written to RUN_INFO/{name}.parquet.
+	"""
+
+	def __init__(self, path:str, compression:str='zstd') -> None:
+		self.path = path
+		self.compression = compression
+		os.makedirs(path, exist_ok=True)
+		# parts of a timeseries are numbered when they are written
+		self.lock = Lock()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, trace):
+		pass
+
+	def read_ts(self,
+			category:Category,
+			operation:Union[str,None]=None,
+			segment:Union[str,None]=None,
+			activity:Union[str,None]=None,
+			columns:Union[List[str],None]=None,
+			start:Any=None,
+			stop:Any=None) -> pd.DataFrame:
+		"""Reads a timeseries, an empty DataFrame when it does not exist. Only the
+		columns asked for are read; the [start, stop] rows are selected after reading."""
+		directory = self._directory(category, operation, segment, activity)
+		parts = self._parts(directory)
+		if not parts:
+			return pd.DataFrame()
+		tables = []
+		for part in parts:
+			names = None
+			if columns is not None:
+				schema = pq.read_schema(part)
+				names = [name for name in columns if name in schema.names]
+			tables.append(pq.read_table(part, columns=names, use_pandas_metadata=True))
+		table = pa.concat_tables(tables) if len(tables) > 1 else tables[0]
+		data_frame = table.to_pandas()
+		metadata = json.loads((table.schema.metadata or {}).get(b'hsp2', b'{}'))
+		if metadata.get('freq'):
+			data_frame.index = pd.DatetimeIndex(data_frame.index, freq=metadata['freq'])
+		if start is not None or stop is not None:
+			data_frame = data_frame.loc[start:stop]
+		if 'series' in metadata and len(data_frame.columns) == 1:
+			return data_frame.iloc[:, 0].rename(metadata['series'])
+		return data_frame
+
+	def write_ts(self,
+			data_frame:pd.DataFrame,
+			category:Category,
+			operation:Union[str,None]=None,
+			segment:Union[str,None]=None,
+			activity:Union[str,None]=None,
+			*args:Any,
+			append:Union[bool,None]=None,
+			**kwargs:Any) -> None:
+		"""Saves a timeseries. append=None or False replaces it, append=True adds the rows
+		of data_frame as a new part file."""
+		directory = self._directory(category, operation, segment, activity)
+		# the frequency of input timeseries decides how transform resamples them
+		metadata = {'freq': getattr(data_frame.index, 'freqstr', None)}
+		if isinstance(data_frame, pd.Series):
+			metadata['series'] = data_frame.name
+			data_frame = data_frame.to_frame(name=str(data_frame.name))
+		table = pa.Table.from_pandas(data_frame, preserve_index=True)
+		table = table.replace_schema_metadata({**table.schema.metadata, b'hsp2': json.dumps(metadata).encode()})
+		with self.lock:
+			parts = self._parts(directory)
+			if not append:
+				for part in parts:
+					os.remove(part)
+				parts = []
+			os.makedirs(directory, exist_ok=True)
+			pq.write_table(table, os.path.join(directory, f'part-{len(parts):04d}.parquet'), compression=self.compression)
+
+	def write_log(self, hsp2_log:pd.DataFrame) -> None:
+		self._write_info(hsp2_log, 'LOGFILE')
+
+	def write_versioning(self, versioning:pd.DataFrame) -> None:
+		self._write_info(versioning, 'VERSIONS')
+
+	def write_profile(self, profile:pd.DataFrame) -> None:
+		self._write_info(profile, 'PROFILE')
+
+	def _write_info(self, data_frame:pd.DataFrame, name:str) -> None:
+		os.makedirs(os.path.join(self.path, 'RUN_INFO'), exist_ok=True)
+		data_frame.to_parquet(os.path.join(self.path, 'RUN_INFO', name + '.parquet'), compression=self.compression)
+
+	def _directory(self, category, operation, segment, activity) -> str:
+		if category == Category.INPUTS:
+			return os.path.join(self.path, 'TIMESERIES', f'SEGMENT={segment}')
+		return os.path.join(self.path, 'RESULTS', f'OPERATION={operation}', f'ACTIVITY={activity}', f'SEGMENT={segment}')
+
+	def _parts(self, directory:str) -> List[str]:
+		if not os.path.isdir(directory):
+			return []
+		return [os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.endswith('.parquet')]
@@ -27,7 +27,10 @@ class SupportsReadTS(Protocol):
 		category:Category,
 		operation:Union[str,None]=None,
 		segment:Union[str,None]=None,
-		activity:Union[str,None]=None) -> pd.DataFrame:
+		activity:Union[str,None]=None,
+		columns:Union[List[str],None]=None,
+		start:Any=None,
+		stop:Any=None) -> pd.DataFrame:
 		...
 
 @runtime_checkable
@@ -38,7 +41,9 @@ class SupportsWriteTS(Protocol):
 		category:Category,
 		operation:Union[str,None]=None,
 		segment:Union[str,None]=None,
-		activity:Union[str,None]=None) -> None:
+		activity:Union[str,None]=None,
+		append:Union[bool,None]=None,
+		compress:bool=True) -> None:
 		...
 
 @runtime_checkable
@@ -49,3 +54,6 @@ class SupportsWriteLogging(Protocol):
 
 	def write_versioning(self, versions:pd.DataFrame) -> None:
 		...
+
+	def write_profile(self, profile:pd.DataFrame) -> None:
+		...
@@ -0,0 +1,82 @@
+from collections import deque
+from threading import Condition, Thread
+from typing import Any, Callable
+
+
+class BackgroundWriter:
+	"""Write-behind stage that runs queued writes, in order, on a dedicated thread.
+
+	The thread is started by the first submit and exits once the queue has
+	drained, so an idle writer holds no thread and no reference to its owner.
+
+	The queue is bounded by a byte budget: submit blocks while the bytes
+	still waiting to be written plus the new write would exceed the budget,
+	so the simulation cannot run arbitrarily far ahead of the output store.
+	A single write larger than the budget is accepted once the queue is empty.
+	An exception raised by a write is re-raised by the next submit or flush.
+	"""
+
+	def __init__(self, budget:int) -> None:
+		self.budget = budget
+		self._pending = deque()
+		self._queued_bytes = 0
+		self._active = 0
+		self._error = None
+		self._condition = Condition()
+		self._thread = None
+
+	def submit(self, nbytes:int, write:Callable[..., None], *args:Any, **kwargs:Any) -> None:
+		"""queue write(*args, **kwargs); nbytes is what the queued item holds in memory"""
+		with self._condition:
+			self._raise_error()
+			while self._queued_bytes and self._queued_bytes + nbytes > self.budget:
+				self._condition.wait()
+				self._raise_error()
+			self._pending.append((nbytes, write, args, kwargs))
+			self._queued_bytes += nbytes
+			if self._thread is None:
+				self._thread = Thread(target=self._run, name='hsp2-writer', daemon=True)
+				self._thread.start()
+
+	def flush(self) -> None:
+		"""wait until every queued write has reached the output store"""
+		with self._condition:
+			while self._pending or self._active:
+				self._condition.wait()
+			self._raise_error()
+
+	def close(self) -> None:
+		"""wait for the queued writes; their errors are discarded"""
+		with self._condition:
+			while self._pending or self._active:
+				self._condition.wait()
+			self._error = None
+
+	@property
+	def queued_bytes(self) -> int:
+		return self._queued_bytes
+
+	def _raise_error(self) -> None:
+		if self._error is not None:
+			error, self._error = self._error, None
+			raise error
+
+	def _run(self) -> None:
+		while True:
+			with self._condition:
+				if not self._pending:
+					self._thread = None
+					return
+				nbytes, write, args, kwargs = self._pending.popleft()
+				self._active += 1
+			try:
+				write(*args, **kwargs)
+			except BaseException as error:
+				with self._condition:
+					if self._error is None:
+						self._error = error
+			finally:
+				with self._condition:
+					self._active -= 1
+					self._queued_bytes -= nbytes
+					self._condition.notify_all()
@@ -1,11 +1,12 @@
 import cltoolbox
 
-from hsp2.hsp2tools.commands import import_uci, run
+from hsp2.hsp2tools.commands import import_uci, run, warmup
 
 
 def main():
     cltoolbox.command(run)
     cltoolbox.command(import_uci)
+    cltoolbox.command(warmup)
     cltoolbox.main()
 
 
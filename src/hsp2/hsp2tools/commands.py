@@ -1,13 +1,28 @@
 from pathlib import Path
 
 from hsp2.hsp2.main import main
+from hsp2.hsp2 import jitcache
 from hsp2.hsp2tools.readUCI import readUCI
 from hsp2.hsp2tools.readWDM import readWDM
-from hsp2.hsp2io.hdf import HDF5
-from hsp2.hsp2io.io import IOManager
+from hsp2.hsp2io.hdf import HDF5, OutputFormat
+from hsp2.hsp2io.arrays import ArrayStore
+from hsp2.hsp2io.io import IOManager, WRITE_BUDGET
 
 
-def run(h5file, saveall=True, compress=True):
+def run(
+    h5file,
+    saveall=True,
+    compress=True,
+    workers=1,
+    cache_dir=None,
+    results_dir=None,
+    results_format="arrays",
+    output_format="table",
+    complib=None,
+    complevel=None,
+    index_columns=True,
+    uci_snapshot=False,
+):
     """Run a HSPsquared model.
 
     Parameters
@@ -20,10 +35,85 @@ def run(h5file, saveall=True, compress=True):
     compression: bool
         [optional] Default is True.
         use compression on the save h5 file.
+    workers: int
+        [optional] Default is 1.
+        Number of processes used to run PERLND and IMPLND segments.
+    cache_dir: str
+        [optional] Default is None.
+        Directory of the Numba compile cache, see warmup.
+    results_dir: str
+        [optional] Default is None, results are saved in h5file.
+        Directory for the results and run information, saved as chunked
+        NumPy arrays (see hsp2io.arrays.ArrayStore) instead of HDF5 tables.
+    results_format: str
+        [optional] Default is "arrays".
+        Format of results_dir, "arrays" or "parquet" (partitioned Parquet
+        datasets, see hsp2io.parquet.Parquet; needs pyarrow).
+    output_format: str
+        [optional] Default is "table".
+        Format of the results saved in h5file, "table" or "fixed" (arrays,
+        faster to write, not queryable).
+    complib: str
+        [optional] Default is None, zlib.
+        Compressor of the results saved in h5file, e.g. "blosc:lz4" or
+        "blosc:zstd".
+    complevel: int
+        [optional] Default is None, no compression.
+        Compression level 0-9 of the results saved in h5file.
+    index_columns: bool
+        [optional] Default is True.
+        Index every column of the results tables saved in h5file.
+    uci_snapshot: bool
+        [optional] Default is False.
+        Save the parsed UCI in a JSON file next to h5file and reuse it in
+        later runs while the UCI tables are unchanged.
+    """
+    if cache_dir:
+        jitcache.use_cache_dir(cache_dir)
+    output = OutputFormat(
+        format=output_format,
+        complib=complib,
+        complevel=None if complevel is None else int(complevel),
+        index_columns=index_columns,
+    )
+    hdf5_instance = HDF5(h5file, uci_snapshot=uci_snapshot, output_format=output)
+    if results_dir:
+        if results_format == "parquet":
+            from hsp2.hsp2io.parquet import Parquet  # pyarrow is optional
+
+            results = Parquet(results_dir)
+        else:
+            results = ArrayStore(results_dir, compress=compress)
+        io_manager = IOManager(hdf5_instance, output=results, log=results, write_budget=WRITE_BUDGET)
+    else:
+        io_manager = IOManager(hdf5_instance, write_budget=WRITE_BUDGET)
+    main(io_manager, saveall=saveall, jupyterlab=compress, workers=int(workers))
+
+
+def warmup(h5file, cache_dir=None):
+    """Compile the Numba kernels used by a HSPsquared model ahead of time.
+
+    Runs the model for one simulated day so every kernel is compiled for the
+    signatures the model uses and stored in the Numba cache. Later runs load
+    the compiled kernels instead of compiling them again.
+    The model file is only read.
+
+    Parameters
+    ----------
+    h5file: str
+        HDF5 (path) filename of the model.
+    cache_dir: str
+        [optional] Default is None, the __pycache__ directories of hsp2.
+        Directory for the compiled kernels; pass the same directory to run.
     """
-    hdf5_instance = HDF5(h5file)
-    io_manager = IOManager(hdf5_instance)
-    main(io_manager, saveall=saveall, jupyterlab=compress)
+    if cache_dir:
+        jitcache.use_cache_dir(cache_dir)
+    hits, misses = jitcache.warmup(h5file)
+    cached, uncached = jitcache.cache_status()
+    print(f"{misses} signatures compiled, {hits} loaded from the cache")
+    print(f"{len(cached)} kernels cached, {len(uncached)} not used by the model:")
+    for name in uncached:
+        print(f"    {name}")
 
 
 def import_uci(ucifile, h5file):
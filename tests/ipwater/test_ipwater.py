@@ -1,13 +1,15 @@
+import copy
 import json
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import pytest
 
 from numba import types
 from numba.typed import Dict
 
-from hsp2.hsp2.PWATER import pwater
+from hsp2.hsp2.PWATER import pwater, PwaterBatch
 from hsp2.hsp2.IWATER import iwater
 
 data_path = Path(__file__).parent / "data"
@@ -82,3 +84,61 @@ def test_pwater(uci_data, ts_table):
     assert abs((ts["SURO"] - ts_table["PERLND1_SURO"]).sum()) < 1e-3
     assert abs((ts["IFWO"] - ts_table["PERLND1_IFWO"]).sum()) < 1e-3
     assert abs((ts["AGWO"] - ts_table["PERLND1_AGWO"]).sum()) < 1e-3
+
+
+def test_pwater_batch(uci_data, ts_table):
+    siminfo = uci_data["siminfo"]
+    siminfo["start"], siminfo["stop"] = (
+        pd.to_datetime(siminfo["start"]),
+        pd.to_datetime(siminfo["stop"]),
+    )
+    siminfo["delt"] = 60
+    siminfo["steps"] = len(ts_table)
+
+    def inputs(scale):
+        ts = Dict.empty(key_type=types.unicode_type, value_type=types.float64[:])
+        ts["PREC"] = ts_table["PREC"].values * scale
+        ts["PETINP"] = ts_table["PETINP"].values.copy()
+        return ts
+
+    batch = PwaterBatch()
+    batched = {}
+    for segment, scale in (("P001", 1.0), ("P002", 0.5), ("P003", 2.0)):
+        batched[segment] = inputs(scale)
+        batch.add(segment, siminfo, copy.deepcopy(uci_data["PERLND"]), batched[segment])
+    batch.run()
+
+    for segment, scale in (("P001", 1.0), ("P002", 0.5), ("P003", 2.0)):
+        ts = inputs(scale)
+        err, errm = pwater(None, siminfo, copy.deepcopy(uci_data["PERLND"]), ts)
+        batch_err, batch_errm = batch.result(segment)
+        assert list(batch_err) == list(err) and batch_errm == errm
+        for name in ("SURO", "IFWO", "AGWO", "LZS", "UZS"):
+            np.testing.assert_array_equal(batched[segment][name], ts[name])
+
+
+def test_iwater_threads(uci_data, ts_table):
+    from concurrent.futures import ThreadPoolExecutor
+
+    siminfo = uci_data["siminfo"]
+    siminfo["start"], siminfo["stop"] = (
+        pd.to_datetime(siminfo["start"]),
+        pd.to_datetime(siminfo["stop"]),
+    )
+    siminfo["delt"] = 60
+    siminfo["steps"] = len(ts_table)
+
+    def run(scale):
+        ts = Dict.empty(key_type=types.unicode_type, value_type=types.float64[:])
+        ts["PREC"] = ts_table["PREC"].values * scale
+        ts["PETINP"] = ts_table["PETINP"].values.copy()
+        err, _ = iwater(None, dict(siminfo), copy.deepcopy(uci_data["IMPLND"]), ts)
+        return err, ts["SURO"]
+
+    scales = (1.0, 0.5, 2.0, 1.5)
+    with ThreadPoolExecutor(max_workers=4) as threads:
+        threaded = list(threads.map(run, scales))
+    for scale, (err, suro) in zip(scales, threaded):
+        serial_err, serial_suro = run(scale)
+        assert list(err) == list(serial_err)
+        np.testing.assert_array_equal(suro, serial_suro)
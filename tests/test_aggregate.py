@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from hsp2.hsp2io.aggregate import aggregate, periods
+
+
+def resampled(data_frame, rule):
+    """the pandas aggregation aggregate replaces"""
+    resampler = data_frame.resample(rule, origin="start")
+    merged = pd.merge(
+        resampler.last().add_suffix("_last"), resampler.sum().add_suffix("_sum"), left_index=True, right_index=True
+    )
+    return pd.merge(merged, resampler.mean().add_suffix("_aver"), left_index=True, right_index=True)
+
+
+@pytest.fixture
+def frame():
+    index = pd.date_range("1976-01-01 01:00", "1978-03-01", freq="h")
+    values = np.random.default_rng(7).random((len(index), 2))
+    values[5, 0] = np.nan
+    return pd.DataFrame(values, index=index, columns=["PERO", "SURO"])
+
+
+@pytest.mark.parametrize("outstep, rule", [(3, "D"), (4, "M"), (5, "Y")])
+def test_aggregate_matches_resample(frame, outstep, rule):
+    pd.testing.assert_frame_equal(aggregate(frame, outstep), resampled(frame, rule), check_freq=False)
+
+
+def test_aggregate_extremes_and_dtype(frame):
+    result = aggregate(frame.astype(np.float32), 4, extremes=True)
+    assert result.dtypes.unique().tolist() == [np.float32]
+    assert list(result.columns[-4:]) == ["PERO_min", "SURO_min", "PERO_max", "SURO_max"]
+    np.testing.assert_allclose(result["SURO_max"], frame["SURO"].resample("M").max(), rtol=1e-6)
+
+    starts, labels = periods(frame.index, 4)
+    assert starts[:2].tolist() == [0, 743]
+    assert labels[0] == pd.Timestamp("1976-01-31")
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from hsp2.hsp2io.arrays import ArrayStore
+from hsp2.hsp2io.protocols import Category
+
+
+def make_frame(periods=100, start="1976-01-01 01:00"):
+    index = pd.date_range(start, periods=periods, freq="h")
+    values = np.arange(periods, dtype=np.float32)
+    return pd.DataFrame({"PERO": values, "SURO": values * 2}, index=index)
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_write_and_read_ranges(tmp_path, compress):
+    store = ArrayStore(str(tmp_path), compress=compress, chunk_rows=16)
+    frame = make_frame()
+    store.write_ts(frame, Category.RESULTS, "PERLND", "P001", "PWATER")
+    store.write_ts(frame, Category.RESULTS, "PERLND", "P002", "PWATER")
+
+    pd.testing.assert_frame_equal(store.read_ts(Category.RESULTS, "PERLND", "P001", "PWATER"), frame, check_freq=False)
+    part = store.read_ts(
+        Category.RESULTS, "PERLND", "P001", "PWATER", columns=["SURO"], start=frame.index[20], stop=frame.index[40]
+    )
+    pd.testing.assert_frame_equal(part, frame[["SURO"]].iloc[20:41], check_freq=False)
+    assert store.read_ts(Category.RESULTS, "PERLND", "P003", "PWATER").empty
+    # both segments share one time axis
+    assert len(list((tmp_path / "TIME").iterdir())) == 1
+
+
+def test_append_and_series(tmp_path):
+    store = ArrayStore(str(tmp_path), chunk_rows=16)
+    frame = make_frame()
+    store.write_ts(frame.iloc[:30], Category.RESULTS, "IMPLND", "I001", "IWATER", append=False)
+    store.write_ts(frame.iloc[30:], Category.RESULTS, "IMPLND", "I001", "IWATER", append=True)
+    result = store.read_ts(Category.RESULTS, "IMPLND", "I001", "IWATER", start=frame.index[25], stop=frame.index[35])
+    pd.testing.assert_frame_equal(result, frame.iloc[25:36], check_freq=False)
+
+    series = pd.Series(np.ones(10), index=make_frame(10).index, name="PREC")
+    store.write_ts(series, Category.INPUTS, segment="TS039")
+    pd.testing.assert_series_equal(store.read_ts(Category.INPUTS, segment="TS039"), series, check_freq=False)
+
+
+def test_main_reads_inputs_from_array_store(tmp_path):
+    import shutil
+    from pathlib import Path
+
+    from hsp2.hsp2.main import main
+    from hsp2.hsp2io.hdf import HDF5
+    from hsp2.hsp2io.io import IOManager
+    from hsp2.hsp2tools.commands import import_uci
+
+    test10 = Path(__file__).parent / "test10" / "HSPFresults" / "test10.uci"
+    model, copy = tmp_path / "model.h5", tmp_path / "copy.h5"
+    import_uci(str(test10), str(model))
+    shutil.copy(model, copy)
+
+    inputs = ArrayStore(str(tmp_path / "inputs"))
+    with pd.HDFStore(str(model), "r") as h5:
+        for key in h5.keys():
+            if key.startswith("/TIMESERIES/TS"):
+                inputs.write_ts(h5[key], Category.INPUTS, segment=key.split("/")[-1])
+
+    main(IOManager(HDF5(str(model), uci_snapshot=False)), saveall=True, jupyterlab=False)
+    main(IOManager(HDF5(str(copy), uci_snapshot=False), input=inputs), saveall=True, jupyterlab=False)
+
+    with pd.HDFStore(str(model), "r") as expected, pd.HDFStore(str(copy), "r") as results:
+        keys = [key for key in expected.keys() if key.startswith("/RESULTS/")]
+        assert keys
+        for key in keys:
+            pd.testing.assert_frame_equal(results[key], expected[key], obj=key)
@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+
+from hsp2.hsp2io.writer import BackgroundWriter
+
+
+def test_writes_in_order_and_flush():
+    written = []
+    writer = BackgroundWriter(budget=100)
+    write = lambda *args: written.append(args)
+    for i in range(20):
+        writer.submit(10, write, i, str(i))
+    writer.flush()
+    assert written == [(i, str(i)) for i in range(20)]
+    assert writer.queued_bytes == 0
+    writer.close()
+
+
+def test_back_pressure():
+    release = threading.Event()
+    started = threading.Event()
+
+    def write(i):
+        started.set()
+        release.wait()
+
+    writer = BackgroundWriter(budget=100)
+    writer.submit(60, write, 0)
+    started.wait()
+    writer.submit(40, write, 1)
+    assert writer.queued_bytes == 100
+
+    blocked = threading.Thread(target=writer.submit, args=(10, write, 2))
+    blocked.start()
+    blocked.join(0.2)
+    # budget is exhausted until the first writes have been stored
+    assert blocked.is_alive()
+    release.set()
+    blocked.join()
+    writer.flush()
+    assert writer.queued_bytes == 0
+    writer.close()
+
+
+def test_errors_surface_on_flush():
+    def write(i):
+        if i == 1:
+            raise ValueError('bad write')
+
+    writer = BackgroundWriter(budget=100)
+    writer.submit(1, write, 0)
+    writer.submit(1, write, 1)
+    with pytest.raises(ValueError):
+        writer.flush()
+    writer.submit(1, write, 2)
+    writer.flush()
+    writer.close()
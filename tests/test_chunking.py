@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from hsp2.hsp2.main import main  # noqa: F401, imports hsp2io in a working order
+from hsp2.hsp2.chunking import time_windows, carry_states, next_window_uci
+from hsp2.hsp2io.io import IOManager
+from hsp2.hsp2io.protocols import Category
+
+
+def test_time_windows():
+    start, stop = pd.Timestamp("1976-01-01"), pd.Timestamp("1987-01-01")
+    windows = time_windows(start, stop, "5Y")
+    assert windows == [
+        (pd.Timestamp("1976-01-01"), pd.Timestamp("1981-01-01")),
+        (pd.Timestamp("1981-01-01"), pd.Timestamp("1986-01-01")),
+        (pd.Timestamp("1986-01-01"), pd.Timestamp("1987-01-01")),
+    ]
+    assert len(time_windows(start, pd.Timestamp("1977-01-01"), "M")) == 12
+    with pytest.raises(ValueError):
+        time_windows(start, stop, "5H")
+
+
+def test_states_carry_over():
+    initial = {
+        ("PERLND", "GENERAL", "P001"): {"ACTIVITY": {"PWATER": 1, "SNOW": 0}},
+        ("PERLND", "PWATER", "P001"): {"STATES": {"UZS": 1.0, "LZS": 2.0}, "FLAGS": {"CSNOFG": 0}},
+        ("PERLND", "PQUAL", "P001"): {"PQUAL1_PARAMETERS": {"SQO": 3.0}},
+    }
+    uci = next_window_uci(initial, initial)
+    # modules remove and change tables while they run
+    del uci[("PERLND", "PWATER", "P001")]["FLAGS"]
+    uci[("PERLND", "GENERAL", "P001")]["ACTIVITY"]["PQUAL"] = 1
+
+    ts = {"UZS": np.array([1.5, 1.25]), "LZS": np.array([2.0, -1.0e30]), "PQUAL1_SQO": np.array([4.0])}
+    carry_states(uci, "PERLND", "P001", ts)
+    assert uci[("PERLND", "PWATER", "P001")]["STATES"] == {"UZS": 1.25, "LZS": 2.0}
+    assert uci[("PERLND", "PQUAL", "P001")]["PQUAL1_PARAMETERS"] == {"SQO": 4.0}
+
+    following = next_window_uci(initial, uci)
+    assert following[("PERLND", "PWATER", "P001")] == {"STATES": {"UZS": 1.25, "LZS": 2.0}, "FLAGS": {"CSNOFG": 0}}
+    assert following[("PERLND", "PQUAL", "P001")]["PQUAL1_PARAMETERS"] == {"SQO": 4.0}
+    assert initial[("PERLND", "PWATER", "P001")]["STATES"]["UZS"] == 1.0
+
+
+class Store:
+    def __init__(self):
+        self.frames = {}
+
+    def write_ts(self, data_frame, category, operation=None, segment=None, activity=None, append=None, **kwargs):
+        key = (operation, segment, activity)
+        if append:
+            self.frames[key] = pd.concat([self.frames[key], data_frame])
+        else:
+            self.frames[key] = data_frame
+
+
+@pytest.mark.parametrize("outstep", [2, 3])
+def test_windows_append_results(outstep):
+    index = pd.date_range("1976-01-01 01:00", periods=24 * 10, freq="h")
+    frame = pd.DataFrame({"PERO": np.arange(len(index), dtype=float)}, index=index)
+    windows = [(0, 30), (30, 100), (100, 240)]
+
+    store = Store()
+    io_manager = IOManager(output=store, write_budget=None)
+    io_manager.write_ts(frame, ["PERO"], Category.RESULTS, "PERLND", "P001", "PWATER", outstep)
+    whole = store.frames[("PERLND", "P001", "PWATER")]
+
+    store = Store()
+    io_manager = IOManager(output=store, write_budget=None)
+    for number, (first, last) in enumerate(windows):
+        io_manager.begin_window(number == 0, number == len(windows) - 1)
+        io_manager.write_ts(frame.iloc[first:last], ["PERO"], Category.RESULTS, "PERLND", "P001", "PWATER", outstep)
+    io_manager.end_windows()
+
+    pd.testing.assert_frame_equal(store.frames[("PERLND", "P001", "PWATER")], whole)
+
+
+def test_window_reads_member_from_store():
+    class ReadableStore(Store):
+        def read_ts(self, category, operation=None, segment=None, activity=None, columns=None, start=None, stop=None):
+            frame = self.frames[(operation, segment, activity)]
+            return frame.loc[start:stop, [column for column in columns if column in frame]]
+
+    index = pd.date_range("1976-01-01 01:00", periods=48, freq="h")
+    frame = pd.DataFrame({"PERO": np.arange(len(index), dtype=float)}, index=index)
+    store = ReadableStore()
+    io_manager = IOManager(output=store)
+    # no segment reads P001 through the bus, so get_flows has to use the store
+    io_manager.bus.set_consumers([])
+    starts = pd.to_datetime(["1976-01-01 00:00", "1976-01-02 00:00"])
+    io_manager.begin_window(True, False, starts[0], starts[1])
+    io_manager.write_ts(frame.iloc[:24], ["PERO"], Category.RESULTS, "PERLND", "P001", "PWATER")
+    io_manager.begin_window(False, True, starts[1], index[-1])
+    io_manager.write_ts(frame.iloc[24:], ["PERO"], Category.RESULTS, "PERLND", "P001", "PWATER")
+
+    values = io_manager.read_member("PERLND", "P001", "PWATER", "PERO")
+    np.testing.assert_array_equal(values, np.arange(24, 48, dtype=float))
+    assert io_manager.read_member("PERLND", "P001", "PWATER", "SURO") is None
@@ -0,0 +1,84 @@
+import os
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("tables")
+
+from hsp2.hsp2io.hdf import HDF5, OutputFormat  # noqa: E402
+from hsp2.hsp2io.protocols import Category  # noqa: E402
+
+
+@pytest.fixture
+def model(tmp_path):
+    path = str(tmp_path / "model.h5")
+    with pd.HDFStore(path) as store:
+        store.put("CONTROL/GLOBAL", pd.DataFrame({"Info": {"Start": "1976-01-01", "Stop": "1977-01-01"}}))
+        store.put(
+            "CONTROL/EXT_SOURCES",
+            pd.DataFrame({"SVOLNO": ["TS039"], "TVOL": ["PERLND"], "TVOLNO": ["P001"], "TMEMN": ["PREC"]}),
+            format="t",
+        )
+        store.put("PERLND/PWATER/PARAMETERS", pd.DataFrame({"LZSN": [6.0, 4.0]}, index=["P001", "P002"]))
+        store.put("TIMESERIES/TS039", pd.Series([1.0, 2.0]))
+    return path
+
+
+def test_snapshot_is_reused_until_tables_change(model):
+    with HDF5(model) as hdf5:
+        hdf5.read_uci()
+        assert not os.path.exists(hdf5.snapshot_path)
+
+    with HDF5(model, uci_snapshot=True) as hdf5:
+        first = hdf5.read_uci()
+        keys = hdf5._store.keys()
+    with HDF5(model, uci_snapshot=True) as hdf5:
+        # the snapshot is a JSON file next to the model, which is not written
+        assert os.path.exists(hdf5.snapshot_path) and hdf5._store.keys() == keys
+        second = hdf5.read_uci()
+
+    assert second.uci == first.uci
+    assert second.siminfo == first.siminfo
+    row = second.ddext_sources[("PERLND", "P001")][0]
+    assert row == first.ddext_sources[("PERLND", "P001")][0]
+    assert row.SVOLNO == "TS039" and row._fields == first.ddext_sources[("PERLND", "P001")][0]._fields
+    assert second.ddlinks["R001"] == []
+
+    with pd.HDFStore(model) as store:
+        store.put("PERLND/PWATER/PARAMETERS", pd.DataFrame({"LZSN": [5.0, 4.0]}, index=["P001", "P002"]))
+    with HDF5(model, uci_snapshot=True) as hdf5:
+        assert hdf5.read_uci().uci[("PERLND", "PWATER", "P001")]["PARAMETERS"]["LZSN"] == 5.0
+
+
+def test_read_ts_selects_columns_and_rows(model):
+    index = pd.date_range("1976-01-01 01:00", periods=48, freq="h")
+    frame = pd.DataFrame({"PERO": range(48), "SURO": range(48)}, index=index, dtype=float)
+    with HDF5(model) as hdf5:
+        hdf5.write_ts(frame, Category.RESULTS, "PERLND", "P001", "PWATER")
+        part = hdf5.read_ts(
+            Category.RESULTS, "PERLND", "P001", "PWATER", columns=["SURO", "AGWO"], start=index[10], stop=index[20]
+        )
+        assert hdf5.read_ts(Category.INPUTS, segment="TS039", start=0, stop=None).tolist() == [1.0, 2.0]
+    pd.testing.assert_frame_equal(part, frame[["SURO"]].iloc[10:21], check_freq=False)
+
+
+def test_output_formats(model):
+    index = pd.date_range("1976-01-01 01:00", periods=24, freq="h")
+    frame = pd.DataFrame({"PERO": range(24), "SURO": range(24)}, index=index, dtype=float)
+    formats = {
+        "RQUAL": OutputFormat(format="fixed", complib="blosc:zstd", complevel=5),
+        ("PERLND", "PWATER"): OutputFormat(index_columns=False),
+    }
+    with HDF5(model, activity_formats=formats) as hdf5:
+        for operation, activity in (("RCHRES", "RQUAL"), ("PERLND", "PWATER"), ("PERLND", "SNOW")):
+            hdf5.write_ts(frame, Category.RESULTS, operation, "X001", activity)
+        rqual = hdf5._store.get_storer("RESULTS/RCHRES_X001/RQUAL")
+        pwater = hdf5._store.get_storer("RESULTS/PERLND_X001/PWATER")
+        snow = hdf5._store.get_storer("RESULTS/PERLND_X001/SNOW")
+        assert not rqual.is_table
+        assert pwater.is_table and not pwater.data_columns
+        assert snow.is_table and snow.data_columns == ["PERO", "SURO"]
+        pd.testing.assert_frame_equal(hdf5.read_ts(Category.RESULTS, "RCHRES", "X001", "RQUAL"), frame)
+
+    with pytest.raises(ValueError):
+        OutputFormat(format="csv")
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from hsp2.hsp2io.cache import TimeseriesCache
+from hsp2.hsp2io.io import IOManager
+from hsp2.hsp2io.protocols import Category
+
+
+def make_series(n, value=1.0):
+    index = pd.date_range("2000-01-01", periods=n, freq="h")
+    return pd.Series(np.full(n, value), index=index, name="TS")
+
+
+def test_cache_shares_read_only_values():
+    cache = TimeseriesCache(None)
+    assert cache.get("TS039") is None
+    first = cache.put("TS039", make_series(4))
+
+    second = cache.get("TS039")
+    assert np.shares_memory(first.to_numpy(), second.to_numpy())
+    with pytest.raises(ValueError):
+        second.to_numpy()[0] = 2.0
+    scaled = second * 2.0
+    np.testing.assert_array_equal(cache.get("TS039").to_numpy(), np.ones(4))
+    np.testing.assert_array_equal(scaled.to_numpy(), np.full(4, 2.0))
+
+    frame = pd.DataFrame({"A": np.arange(3.0), "B": np.ones(3)})
+    cache.put("FRAME", frame)
+    pd.testing.assert_frame_equal(cache.get("FRAME"), frame)
+    assert cache.stats() == {"hits": 3, "misses": 1, "evictions": 0, "frames": 2, "bytes": cache.nbytes}
+
+
+def test_cache_evicts_least_recently_used():
+    size = int(np.sum(make_series(10).memory_usage(index=True)))
+    cache = TimeseriesCache(2 * size)
+    cache.put("TS001", make_series(10))
+    cache.put("TS002", make_series(10))
+    cache.get("TS001")
+    cache.put("TS003", make_series(10))
+
+    assert "TS001" in cache and "TS003" in cache and "TS002" not in cache
+    assert cache.evictions == 1
+    assert cache.nbytes == 2 * size
+
+    # larger than the budget, handed back without caching
+    large = cache.put("TS004", make_series(100))
+    assert len(large) == 100 and "TS004" not in cache
+
+
+class Inputs:
+    def __init__(self):
+        self.reads = []
+
+    def read_ts(self, category, operation=None, segment=None, activity=None):
+        self.reads.append(segment)
+        return make_series(24, float(segment[2:]))
+
+
+def test_prefetch_reads_each_input_once():
+    inputs = Inputs()
+    io_manager = IOManager(input=inputs, write_budget=None)
+    io_manager.prefetch(["TS001", "TS002", "TS001", "TS003"], threads=2)
+    for future in list(io_manager._prefetching.values()):
+        future.result()
+    # prefetched inputs are counted by the segments that use them
+    assert io_manager.bytes_read == 0
+
+    for segment in ("TS002", "TS001", "TS003", "TS002"):
+        series = io_manager.read_ts(Category.INPUTS, segment=segment)
+        assert series.iloc[0] == float(segment[2:])
+    assert sorted(inputs.reads) == ["TS001", "TS002", "TS003"]
+    assert io_manager.bytes_read == 3 * int(np.sum(make_series(24).memory_usage(index=True)))
+
+
+def test_end_prefetch_joins_threads():
+    import threading
+
+    inputs = Inputs()
+    io_manager = IOManager(input=inputs)
+    io_manager.prefetch([f"TS{number:03d}" for number in range(1, 20)], threads=2)
+    io_manager.end_prefetch()
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith("hsp2-prefetch")]
+    # inputs whose prefetch was cancelled are read when used
+    assert io_manager.read_ts(Category.INPUTS, segment="TS019").iloc[0] == 19.0
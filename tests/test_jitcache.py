@@ -0,0 +1,42 @@
+import os
+
+import numpy as np
+from numba.core import config
+
+from hsp2.hsp2.main import main  # noqa: F401
+from hsp2.hsp2 import PWATER  # noqa: F401
+from hsp2.hsp2 import jitcache
+from hsp2.hsp2.om_model_object import pre_step_register
+
+
+def test_kernels_are_cached():
+    kernels = jitcache.kernels()
+    assert "hsp2.hsp2.PWATER._pwater_" in kernels
+    assert "hsp2.hsp2.om.step_model" in kernels
+    assert "hsp2.hsp2.state.hydr_get_ix" in kernels
+
+
+def test_cache_dir(tmp_path, monkeypatch):
+    # a cache directory of the user's environment; monkeypatch restores both settings
+    # even if use_cache_dir(None) does not
+    monkeypatch.setenv("NUMBA_CACHE_DIR", str(tmp_path / "user"))
+    monkeypatch.setattr(config, "CACHE_DIR", config.CACHE_DIR)
+    default = config.CACHE_DIR
+
+    name = "hsp2.hsp2.om_model_object.pre_step_register"
+    jitcache.use_cache_dir(tmp_path / "hsp2")
+    try:
+        cached, uncached = jitcache.cache_status()
+        assert cached == [] and name in uncached
+
+        state_ix = np.ones(3)
+        pre_step_register(np.array([12, 1], dtype=np.int32), state_ix)
+        assert state_ix[1] == 0.0
+
+        cached, uncached = jitcache.cache_status()
+        assert cached == [name]
+        assert any((tmp_path / "hsp2").iterdir())
+    finally:
+        jitcache.use_cache_dir(None)
+    assert os.environ["NUMBA_CACHE_DIR"] == str(tmp_path / "user")
+    assert config.CACHE_DIR == default
@@ -0,0 +1,64 @@
+from collections import defaultdict, namedtuple
+
+import pandas as pd
+
+from hsp2.hsp2.memo import SegmentMemo, segment_aliases
+
+Source = namedtuple("Source", ["SVOL", "SVOLNO", "SMEMN", "MFACTOR", "TVOL", "TVOLNO", "TMEMN"])
+
+
+def make_opseq(rows):
+    return pd.DataFrame(rows, columns=["OPERATION", "SEGMENT", "INDELT_minutes"])
+
+
+def make_uci(segments):
+    uci = {}
+    for segment, (lsid, lzsn, snow) in segments.items():
+        uci[("PERLND", "GENERAL", segment)] = {
+            "ACTIVITY": {"SNOW": snow, "PWATER": 1, "SEDMNT": 0},
+            "INFO": {"LSID": lsid},
+        }
+        uci[("PERLND", "PWATER", segment)] = {"PARAMETERS": {"LZSN": lzsn}}
+        # inactive activity, ignored in the fingerprint
+        uci[("PERLND", "SEDMNT", segment)] = {"PARAMETERS": {"KRER": float(len(segment))}}
+    return uci
+
+
+def make_sources(segments, prec):
+    return {
+        ("PERLND", segment): [Source("*", "*", prec.get(segment, "TS039"), 1.0, "PERLND", segment, "PREC")]
+        for segment in segments
+    }
+
+
+def test_segment_aliases():
+    segments = {
+        "P001": ("Forest", 6.0, 0),
+        "P002": ("Forest copy", 6.0, 0),
+        "P003": ("Urban", 4.0, 0),
+        "P004": ("Forest", 6.0, 0),
+        "P005": ("Forest", 6.0, 0),
+    }
+    opseq = make_opseq([("PERLND", segment, 60) for segment in segments] + [("RCHRES", "R001", 60)])
+    sources = make_sources(segments, {"P005": "TS040"})
+
+    aliases = segment_aliases(opseq, make_uci(segments), sources, defaultdict(list))
+
+    assert aliases == {("PERLND", "P002"): "P001", ("PERLND", "P004"): "P001"}
+
+
+def test_segment_memo_reuse():
+    segments = {"P001": ("A", 6.0, 0), "P002": ("B", 6.0, 0), "P003": ("C", 6.0, 0)}
+    opseq = make_opseq([("PERLND", segment, 60) for segment in segments])
+    memo = SegmentMemo(opseq, make_uci(segments), make_sources(segments, {}), defaultdict(list))
+    assert len(memo) == 2
+
+    ts = {"SURO": [1.0]}
+    siminfo = {}
+    memo.record("PERLND", "P001", ts, None, siminfo)
+    assert memo.reuse("PERLND", "P002", siminfo) == ("P001", ts)
+
+    # without SNOW the segment reads the ICEFG left by an earlier SNOW
+    siminfo["ICEFG"] = 1
+    assert memo.reuse("PERLND", "P003", siminfo) is None
+    assert memo._results == {}
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from hsp2.hsp2io.io import IOManager  # noqa: E402
+from hsp2.hsp2io.parquet import Parquet  # noqa: E402
+from hsp2.hsp2io.protocols import Category  # noqa: E402
+
+
+def make_frame(periods=48):
+    index = pd.date_range("1976-01-01 01:00", periods=periods, freq="h")
+    values = np.arange(periods, dtype=np.float32)
+    return pd.DataFrame({"PERO": values, "SURO": values * 2}, index=index)
+
+
+def test_results_partitions_and_projection(tmp_path):
+    store = Parquet(str(tmp_path))
+    frame = make_frame()
+    store.write_ts(frame.iloc[:24], Category.RESULTS, "PERLND", "P001", "PWATER", append=False)
+    store.write_ts(frame.iloc[24:], Category.RESULTS, "PERLND", "P001", "PWATER", append=True)
+
+    assert (tmp_path / "RESULTS" / "OPERATION=PERLND" / "ACTIVITY=PWATER" / "SEGMENT=P001").is_dir()
+    pd.testing.assert_frame_equal(store.read_ts(Category.RESULTS, "PERLND", "P001", "PWATER"), frame, check_freq=False)
+    assert list(store.read_ts(Category.RESULTS, "PERLND", "P001", "PWATER", columns=["SURO"]).columns) == ["SURO"]
+
+    io_manager = IOManager(output=store, write_budget=None)
+    np.testing.assert_array_equal(io_manager.read_member("PERLND", "P001", "PWATER", "SURO"), frame["SURO"] * 1.0)
+    assert io_manager.read_member("PERLND", "P001", "PWATER", "AGWO") is None
+
+
+def test_inputs_round_trip(tmp_path):
+    store = Parquet(str(tmp_path))
+    series = pd.Series(np.ones(10), index=make_frame(10).index, name="PREC")
+    store.write_ts(series, Category.INPUTS, segment="TS039")
+    pd.testing.assert_series_equal(store.read_ts(Category.INPUTS, segment="TS039"), series, check_freq=False)
+    assert store.read_ts(Category.INPUTS, segment="TS040").empty
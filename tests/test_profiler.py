@@ -0,0 +1,43 @@
+import time
+from threading import Thread
+from types import SimpleNamespace
+
+from hsp2.hsp2.profiler import COLUMNS, Profile, kernel_seconds, timed_kernel
+
+
+def test_phases_and_merge():
+    io_manager = SimpleNamespace(bytes_read=0, bytes_written=0)
+    profile = Profile()
+    with profile.phase("INPUT", io_manager, "PERLND", "P001"):
+        io_manager.bytes_read += 100
+    with profile.phase("SAVE", io_manager, "PERLND", "P001", "PWATER"):
+        io_manager.bytes_written += 40
+    with profile.phase("SAVE", io_manager, "PERLND", "P001", "PWATER"):
+        io_manager.bytes_written += 2
+
+    worker = Profile()
+    worker.add("PERLND", "P002", "PWATER", SETUP=1.0, KERNEL=2.0, PEAK_RSS=10)
+    worker.add("PERLND", "P002", "PWATER", KERNEL=3.0, PEAK_RSS=5)
+    profile.merge(worker)
+
+    df = profile.to_dataframe().set_index(["OPERATION", "SEGMENT", "ACTIVITY"])
+    assert list(df.columns) == COLUMNS
+    assert df.loc[("PERLND", "P001", ""), "BYTES_READ"] == 100
+    assert df.loc[("PERLND", "P001", "PWATER"), "BYTES_WRITTEN"] == 42
+    assert df.loc[("PERLND", "P001", "PWATER"), "SAVE"] >= 0.0
+    assert df.loc[("PERLND", "P002", "PWATER"), "KERNEL"] == 5.0
+    assert df.loc[("PERLND", "P002", "PWATER"), "PEAK_RSS"] == 10
+
+
+def test_timed_kernel():
+    before = kernel_seconds()
+    assert timed_kernel(lambda x, y: x + y, 1, 2) == 3
+    assert kernel_seconds() >= before
+
+
+def test_kernel_seconds_per_thread():
+    before = kernel_seconds()
+    thread = Thread(target=timed_kernel, args=(time.sleep, 0.05))
+    thread.start()
+    thread.join()
+    assert kernel_seconds() == before
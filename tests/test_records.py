@@ -0,0 +1,42 @@
+import numpy as np
+
+from hsp2.hsp2.records import build_tables, parameter_record, table_fields
+
+
+def make_ui(lsur, rtlifg=None):
+    parameters = {"OPNID": "I001", "LSUR": lsur, "SLSUR": 0.01, "NSUR": 0.1, "RETSC": 0.0, "PETMAX": 40.0}
+    if rtlifg is not None:
+        parameters["RTLIFG"] = rtlifg
+    return {"PARAMETERS": parameters, "STATES": {"RETS": 0.0, "SURS": 0.0}, "SAVE": {"SURO": True}}
+
+
+def test_fields_from_parse_table():
+    fields = table_fields("IMPLND", "IWATER")
+    assert {"CSNOFG", "RTLIFG", "LSUR", "PETMIN", "RETS", "SURS"} <= set(fields)
+    assert "OPNID" not in fields and "RETS1" not in fields
+
+
+def test_one_table_for_all_segments():
+    uci = {
+        ("IMPLND", "IWATER", "I001"): make_ui(300.0, 1),
+        ("IMPLND", "IWATER", "I002"): make_ui(150.0),
+        ("IMPLND", "GENERAL", "I001"): {"ACTIVITY": {"IWATER": 1}},
+    }
+    tables = build_tables(uci)
+    table = tables[("IMPLND", "IWATER")]
+    assert len(table) == 2
+    np.testing.assert_array_equal(table.table["LSUR"], [300.0, 150.0])
+
+    record = parameter_record(uci[("IMPLND", "IWATER", "I002")], "IMPLND", "IWATER")
+    assert record["LSUR"] == 150.0 and np.isnan(record["RTLIFG"]) and np.isnan(record["PETMIN"])
+    # column-wise changes reach the records handed to the kernels
+    table.table["LSUR"] *= 2.0
+    assert parameter_record(uci[("IMPLND", "IWATER", "I001")], "IMPLND", "IWATER")["LSUR"] == 600.0
+
+    # the record type does not depend on the model's UCI tables
+    other = make_ui(10.0)
+    other["PARAMETERS"]["EXTRA"] = 1.0
+    assert parameter_record(other, "IMPLND", "IWATER").dtype == record.dtype
+
+    # a UCI dict unknown to build_tables gets a table of its own
+    assert parameter_record(make_ui(10.0, 0), "IMPLND", "IWATER")["RTLIFG"] == 0.0
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.tseries.offsets import Minute
+
+from hsp2.hsp2 import resample
+from hsp2.hsp2.utilities import flowtype, transform
+
+
+def reference_transform(ts, name, how, siminfo):
+    """transform as implemented with pandas resample before the compiled kernels"""
+    tsfreq = ts.index.freq
+    freq = Minute(siminfo["delt"])
+    stop = siminfo["stop"]
+    if ts.index[-1] < stop:
+        ts[stop] = ts.iloc[-1]
+
+    if freq == tsfreq:
+        pass
+    elif how == "SAME":
+        ts = ts.resample(freq).ffill()
+    elif not how:
+        coarse = "Y" in str(tsfreq) or "M" in str(tsfreq) or tsfreq > freq
+        if name in flowtype:
+            if coarse:
+                if "M" in str(tsfreq):
+                    ratio = 1.0 / 730.5
+                elif "Y" in str(tsfreq):
+                    ratio = 1.0 / 8766.0
+                else:
+                    ratio = freq / tsfreq
+                ts = (ratio * ts).resample(freq).ffill()
+            else:
+                ts = ts.resample(freq).sum()
+        elif coarse:
+            ts = ts.resample(freq).ffill()
+        else:
+            ts = ts.resample(freq).mean()
+    elif how == "MEAN":
+        ts = ts.resample(freq).mean()
+    elif how == "SUM":
+        ts = ts.resample(freq).sum()
+    elif how == "MAX":
+        ts = ts.resample(freq).max()
+    elif how == "MIN":
+        ts = ts.resample(freq).min()
+    elif how == "LAST":
+        ts = ts.resample(freq).ffill()
+    elif how == "DIV":
+        ts = (ts * (freq / ts.index.freq)).resample(freq).ffill()
+    elif how == "INTERPOLATE":
+        ts = ts.resample(freq).interpolate()
+    return ts[siminfo["start"] : stop].to_numpy().astype(np.float64)[0 : siminfo["steps"]]
+
+
+def make_series(freq, start="1976-01-01", stop="1977-12-31 23:59"):
+    index = pd.date_range(start, stop, freq=freq)
+    values = np.random.default_rng(42).uniform(0.0, 10.0, len(index))
+    values[len(values) // 3] = np.nan
+    return pd.Series(values, index=index)
+
+
+def make_siminfo(delt, start="1976-01-01", stop="1977-12-31 23:59"):
+    tindex = pd.date_range(start, stop, freq=Minute(delt))
+    return {"start": tindex[0], "stop": tindex[-1], "delt": delt, "steps": len(tindex)}
+
+
+@pytest.mark.parametrize("how", ["", "SAME", "DIV", "SUM", "MEAN", "MAX", "MIN", "LAST", "INTERPOLATE"])
+@pytest.mark.parametrize("name", ["PREC", "ATEM"])
+@pytest.mark.parametrize("delt", [15, 60, 1440])
+@pytest.mark.parametrize("freq", ["15min", "h", "D", "MS", "YS"])
+def test_transform_matches_pandas(freq, delt, name, how):
+    siminfo = make_siminfo(delt)
+    try:
+        expected = reference_transform(make_series(freq), name, how, siminfo)
+    except Exception:
+        pytest.skip("pandas implementation fails for this case")
+    result = transform(make_series(freq), name, how, siminfo)
+    np.testing.assert_allclose(result, expected, rtol=1e-12, equal_nan=True)
+
+
+def test_transform_starting_mid_day():
+    siminfo = make_siminfo(60, "1976-01-01 07:00", "1976-01-10 23:00")
+    series = make_series("15min", "1976-01-01 06:45", "1976-01-10 12:00")
+    for how in ("SUM", "MEAN", "SAME"):
+        np.testing.assert_allclose(
+            transform(series.copy(), "PREC", how, siminfo),
+            reference_transform(series.copy(), "PREC", how, siminfo),
+            equal_nan=True,
+        )
+
+
+def test_kernels():
+    hour = 3_600_000_000_000
+    stamps = np.arange(0, 4 * hour, hour, dtype=np.int64)
+    values = np.array([1.0, np.nan, 3.0, 7.0])
+    labels = resample.bin_labels(stamps[0], stamps[-1], 2 * hour)
+    np.testing.assert_array_equal(labels, [0, 2 * hour])
+    np.testing.assert_array_equal(resample.aggregate(stamps, values, labels, 2 * hour, "SUM"), [1.0, 10.0])
+    np.testing.assert_array_equal(resample.aggregate(stamps, values, labels, 2 * hour, "MAX"), [1.0, 7.0])
+
+    fine = resample.bin_labels(stamps[0], stamps[-1], hour // 2)
+    np.testing.assert_array_equal(resample.asfreq(stamps, values, fine, 0.0)[:3], [1.0, 0.0, np.nan])
+    np.testing.assert_array_equal(resample.interpolate(stamps, values, fine)[-3:], [3.0, 5.0, 7.0])
+    np.testing.assert_array_equal(resample.ffill(stamps, values, fine)[:2], [1.0, 1.0])
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from hsp2.hsp2io.bus import ResultBus
+
+
+def test_bus_keeps_everything_without_consumers():
+    bus = ResultBus()
+    bus.publish("PERLND", "P001", "PWATER", {"PERO": np.arange(4.0)})
+
+    values = bus.get("PERLND", "P001", "PWATER", "PERO")
+    np.testing.assert_array_equal(values, np.arange(4.0))
+    assert values.dtype == np.float64
+    with pytest.raises(ValueError):
+        values[0] = 1.0
+    assert bus.get("PERLND", "P001", "PWATER", "SURO") is None
+
+
+def test_bus_frees_after_last_consumer():
+    bus = ResultBus()
+    bus.set_consumers(
+        [
+            (("PERLND", "P001"), "R001"),
+            (("PERLND", "P001"), "R002"),
+            (("RCHRES", "R001"), "R002"),
+        ]
+    )
+    bus.publish("PERLND", "P001", "PWATER", {"PERO": np.ones(3)})
+    bus.publish("RCHRES", "R001", "HYDR", {"ROVOL": np.ones(3)})
+    bus.publish("IMPLND", "I001", "IWATER", {"SURO": np.ones(3)})
+
+    # nobody reads I001, so it is never held
+    assert ("IMPLND", "I001") not in bus
+    assert len(bus) == 2
+
+    bus.consumed("PERLND", "P001", "R001")
+    assert ("PERLND", "P001") in bus
+    bus.consumed("PERLND", "P001", "R002")
+    bus.consumed("RCHRES", "R001", "R002")
+    assert len(bus) == 0
+    assert bus.get("PERLND", "P001", "PWATER", "PERO") is None
+
+
+def test_get_flows_reads_before_freeing():
+    from collections import namedtuple
+
+    from hsp2.hsp2.main import get_flows
+    from hsp2.hsp2io.io import IOManager
+
+    Link = namedtuple(
+        "Link",
+        "SVOL SVOLNO MLNO MFACTOR AFACTR SGRPN SMEMN SMEMSB1 SMEMSB2 TMEMN TMEMSB1 TMEMSB2",
+    )
+
+    def link(smemn, afactr):
+        return Link("PERLND", "P001", "", 1.0, afactr, "PWATER", smemn, "", "", "IVOL", "", "")
+
+    # P001 feeds R001 through two LINKS and R002 through one
+    ddlinks = {"R001": [link("SURO", 2.0), link("AGWO", 3.0)], "R002": [link("SURO", 4.0)]}
+    # no output store: every read must be served by the bus
+    io_manager = IOManager(write_budget=None)
+    io_manager.bus.set_consumers(
+        ((x.SVOL, x.SVOLNO), segment) for segment, links in ddlinks.items() for x in links
+    )
+    io_manager.bus.publish(
+        "PERLND", "P001", "PWATER",
+        {"SURO": np.full(3, 0.1, dtype=np.float32), "AGWO": np.ones(3, dtype=np.float32)},
+    )
+
+    flows = {}
+    for segment in ("R001", "R002"):
+        ts = {}
+        get_flows(io_manager, ts, {}, {}, segment, ddlinks, {}, 3, lambda *args: None)
+        flows[segment] = ts["IVOL"]
+
+    # float32 values of the output store, as float64
+    suro = np.float64(np.float32(0.1))
+    np.testing.assert_array_equal(flows["R001"], 2.0 * suro + 3.0)
+    np.testing.assert_array_equal(flows["R002"], 4.0 * suro)
+    assert flows["R001"].dtype == np.float64
+    assert len(io_manager.bus) == 0
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from hsp2.hsp2.utilities import save_plan, save_timeseries
+
+
+class Recorder:
+    def __init__(self):
+        self.writes = []
+
+    def write_ts(self, data_frame, save_columns, **kwargs):
+        self.writes.append((data_frame, save_columns, kwargs))
+
+
+def make_ts(names, steps):
+    return {name: np.arange(steps, dtype=float) + number for number, name in enumerate(names)}
+
+
+def test_quality_names():
+    siminfo = {"tindex": pd.date_range("1976-01-01 01:00", periods=5, freq="h")}
+    ts = make_ts(["NH3/SOQO", "NH3/SOQUAL", "NO3/SOQO", "WASHQS_SOQUAL", "PREC"], 5)
+    recorder = Recorder()
+    save_timeseries(recorder, ts, {"SOQO": 1, "SOQUAL": 0}, siminfo, False, "PERLND", "P001", "PQUAL")
+
+    data_frame, save_columns, kwargs = recorder.writes[0]
+    assert list(data_frame.columns) == ["NH3_SOQO", "NH3_SOQUAL", "NO3_SOQO", "WASHQS_SOQUAL"]
+    assert save_columns == ["SOQO"]
+    assert kwargs["activity"] == "PQUAL" and kwargs["outstep"] == 2
+    np.testing.assert_array_equal(data_frame["NO3_SOQO"].to_numpy(), ts["NO3/SOQO"])
+    assert data_frame.index.equals(siminfo["tindex"])
+
+
+def test_plan_is_reused():
+    savedict = {"SURO": 1, "PERO": 1, "AGWO": 0}
+    plan = save_plan(savedict, ["SURO", "PERO", "AGWO", "PREC"], True, "PERLND", "PWATER")
+    assert plan == (["AGWO", "PERO", "SURO"], ["AGWO", "PERO", "SURO"], ["AGWO", "PERO", "SURO"])
+    assert save_plan(dict(savedict), ("PREC", "AGWO", "PERO", "SURO"), True, "PERLND", "PWATER") is plan
+    assert save_plan(savedict, ["SURO", "PERO", "AGWO", "PREC"], False, "PERLND", "PWATER")[2] == ["SURO", "PERO"]
@@ -0,0 +1,46 @@
+from collections import defaultdict, namedtuple
+
+import pandas as pd
+
+from hsp2.hsp2.scheduler import operation_levels
+
+Link = namedtuple("Link", ["SVOL", "SVOLNO"])
+
+
+def make_opseq(rows):
+    return pd.DataFrame(rows, columns=["OPERATION", "SEGMENT", "INDELT_minutes"])
+
+
+def test_operation_levels():
+    opseq = make_opseq(
+        [
+            ("PERLND", "P001", 60),
+            ("IMPLND", "I001", 60),
+            ("RCHRES", "R001", 60),
+            ("PERLND", "P002", 60),
+            ("RCHRES", "R002", 60),
+            ("RCHRES", "R003", 60),
+        ]
+    )
+    ddlinks = defaultdict(list)
+    ddlinks["R001"] = [Link("PERLND", "P001"), Link("IMPLND", "I001")]
+    ddlinks["R002"] = [Link("PERLND", "P002"), Link("RCHRES", "R001")]
+    ddlinks["R003"] = [Link("PERLND", "P002")]
+
+    levels = operation_levels(opseq, ddlinks)
+
+    assert levels == [
+        [("PERLND", "P001", 60), ("IMPLND", "I001", 60), ("PERLND", "P002", 60)],
+        [("RCHRES", "R001", 60)],
+        [("RCHRES", "R002", 60), ("RCHRES", "R003", 60)],
+    ]
+
+
+def test_operation_levels_ignores_later_sources():
+    opseq = make_opseq([("RCHRES", "R001", 60), ("PERLND", "P001", 60)])
+    ddlinks = defaultdict(list)
+    ddlinks["R001"] = [Link("PERLND", "P001")]
+
+    levels = operation_levels(opseq, ddlinks)
+
+    assert levels == [[("RCHRES", "R001", 60), ("PERLND", "P001", 60)]]
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from hsp2.hsp2.simcalendar import SimCalendar, sim_calendar, clear_calendars
+from hsp2.hsp2.utilities import hourflag, hoursval
+
+
+@pytest.fixture
+def siminfo():
+    clear_calendars()
+    yield {
+        "start": pd.Timestamp("1976-01-01"),
+        "stop": pd.Timestamp("1977-01-01"),
+        "delt": 60,
+    }
+    clear_calendars()
+
+
+def test_calendar_is_shared(siminfo):
+    calendar = sim_calendar(siminfo)
+    assert sim_calendar(dict(siminfo)) is calendar
+    assert sim_calendar({**siminfo, "delt": 15}) is not calendar
+
+    assert calendar.steps == 8784
+    assert calendar.tindex[0] == pd.Timestamp("1976-01-01 01:00")
+    assert calendar.hour[:3].tolist() == [0, 1, 2]
+    assert calendar.month[-1] == 12
+    assert calendar.dayofyear[-1] == 366
+
+
+def test_helpers_are_cached_and_read_only(siminfo):
+    calendar = sim_calendar(siminfo)
+    dayfg = calendar.dayfg
+    assert calendar.dayfg is dayfg
+    assert not dayfg.flags.writeable
+    with pytest.raises(ValueError):
+        dayfg[0] = 2.0
+
+    # module helpers hand out writable copies of the cached arrays
+    flags = hourflag(siminfo, 0, dofirst=True)
+    assert flags.flags.writeable
+    np.testing.assert_array_equal(flags, dayfg)
+    np.testing.assert_array_equal(hoursval(siminfo, np.ones(24), dofirst=True), calendar.hrfg)
+    assert flags[0] == 1.0 and flags[24] == 1.0 and flags[1:24].sum() == 0.0
+
+
+def test_downsampled_flags():
+    calendar = SimCalendar(pd.Timestamp("1976-01-01"), pd.Timestamp("1977-01-01"), 240)
+    dayfg = calendar.dayfg
+    assert dayfg[:6].tolist() == [1.0, 0.0, 0.0, 0.0, 0.0, 0.0]
+    assert dayfg[6] == 1.0
+
+
+def reference_monthly(start, stop, delt, monthly, interpolate):
+    """monthval/dayval as computed with pandas resample before the vectorized engine"""
+    freq = pd.tseries.offsets.Minute(delt)
+    months = np.tile(monthly, stop.year - start.year + 1).astype(float)
+    dr = pd.date_range(start=f"{start.year}-01-01", end=f"{stop.year}-12-31", freq="MS")
+    ts = pd.Series(months, index=dr).resample("D")
+    ts = ts.interpolate("time") if interpolate else ts.ffill()
+    if ts.index.freq > freq:
+        ts = ts.resample(freq).ffill()
+    elif ts.index.freq < freq:
+        ts = ts.resample(freq).mean()
+    return ts.truncate(start, stop).to_numpy()
+
+
+@pytest.mark.parametrize("delt", [15, 60, 1440])
+@pytest.mark.parametrize("interpolate", [False, True])
+def test_monthly_values_match_pandas(delt, interpolate):
+    start, stop = pd.Timestamp("1976-03-05"), pd.Timestamp("1978-01-01")
+    monthly = np.arange(1.0, 13.0) ** 2
+    calendar = SimCalendar(start, stop, delt)
+    values = calendar.dayval(monthly) if interpolate else calendar.monthval(monthly)
+    expected = reference_monthly(start, stop, delt, monthly, interpolate)
+    assert len(values) == calendar.steps + 1
+    np.testing.assert_allclose(values, expected, rtol=1e-12)
+
+
+def test_monthly_block():
+    calendar = SimCalendar(pd.Timestamp("1976-01-01"), pd.Timestamp("1977-01-01"), 60)
+    block = np.vstack([np.arange(12.0), np.full(12, 2.0), np.linspace(0.0, 1.1, 12)])
+    values = calendar.dayval(block)
+    assert values.shape == (3, calendar.steps + 1)
+    for row, monthly in zip(values, block):
+        np.testing.assert_allclose(row, calendar.dayval(monthly))
+    # December interpolates to January of the following year
+    assert calendar.dayval(block[0])[-25] == pytest.approx(30.0 / 31.0 * -11.0 + 11.0)
@@ -0,0 +1,51 @@
+import subprocess
+import sys
+
+# seconds for `import hsp2.hsp2.main` in a fresh interpreter, far above the
+# typical time so only importing or compiling an activity eagerly fails
+IMPORT_BUDGET = 5.0
+
+ACTIVITY_MODULES = {
+    "ATEMP", "SNOW", "PWATER", "SEDMNT", "PSTEMP", "PWTGAS", "PQUAL",
+    "IWATER", "SOLIDS", "IWTGAS", "IQUAL", "HYDR", "ADCALC", "HTRCH",
+    "SEDTRN", "CONS", "GQUAL", "RQUAL", "RQUAL_Class", "PLANK_Class",
+    "COPY", "GENER",
+}
+
+
+def run_python(code):
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return result.stdout.split("\n")
+
+
+def loaded(line):
+    return {name.rsplit(".", 1)[-1] for name in line.split(",") if name}
+
+
+def test_import_is_lazy_and_within_budget():
+    seconds, modules = run_python(
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import hsp2.hsp2.main\n"
+        "print(time.perf_counter() - start)\n"
+        "print(','.join(sys.modules))\n"
+    )[:2]
+    assert not loaded(modules) & ACTIVITY_MODULES
+    assert float(seconds) < IMPORT_BUDGET
+
+
+def test_only_active_modules_are_loaded():
+    modules = run_python(
+        "import sys\n"
+        "from pandas import DataFrame\n"
+        "from hsp2.hsp2.main import main\n"
+        "from hsp2.hsp2.configuration import load_activities\n"
+        "opseq = DataFrame({'OPERATION': ['PERLND', 'RCHRES'], 'SEGMENT': ['P001', 'R001'], 'INDELT_minutes': [60, 60]})\n"
+        "uci = {('PERLND', 'GENERAL', 'P001'): {'ACTIVITY': {'ATEMP': 0, 'SNOW': 0, 'PWATER': 1, 'SEDMNT': 0, 'PSTEMP': 0, 'PWTGAS': 0, 'PQUAL': 0,\n"
+        "            'MSTLAY': 0, 'PEST': 0, 'NITR': 0, 'PHOS': 0, 'TRACER': 0}},\n"
+        "       ('RCHRES', 'GENERAL', 'R001'): {'ACTIVITY': {'HYDR': 1, 'ADCALC': 1, 'CONS': 0, 'HTRCH': 0, 'SEDTRN': 0, 'GQUAL': 0,\n"
+        "            'OXRX': 0, 'NUTRX': 0, 'PLANK': 0, 'PHCARB': 0}}}\n"
+        "load_activities(opseq, uci)\n"
+        "print(','.join(sys.modules))\n"
+    )[0]
+    assert loaded(modules) & ACTIVITY_MODULES == {"PWATER", "HYDR", "ADCALC"}
@@ -0,0 +1,50 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from hsp2.hsp2.utilities import clear_transforms, get_timeseries
+
+Row = namedtuple("Row", ["SVOLNO", "MFACTOR", "TMEMN", "TMEMSB", "TRAN"])
+
+
+class Inputs:
+    def __init__(self):
+        self.reads = 0
+
+    def read_ts(self, category, operation=None, segment=None, activity=None):
+        self.reads += 1
+        index = pd.date_range("1976-01-01", "1976-01-03", freq="h")
+        return pd.Series(np.arange(len(index), dtype=float), index=index)
+
+
+@pytest.fixture
+def siminfo():
+    clear_transforms()
+    yield {"start": pd.Timestamp("1976-01-01"), "stop": pd.Timestamp("1976-01-03"), "delt": 15, "steps": 192}
+    clear_transforms()
+
+
+def test_transform_is_shared(siminfo):
+    inputs = Inputs()
+    first = get_timeseries(inputs, [Row("TS039", 1.0, "PREC", "", "DIV")], siminfo)
+    second = get_timeseries(inputs, [Row("TS039", 0.5, "PREC", "", "DIV")], siminfo)
+    assert inputs.reads == 1
+    np.testing.assert_allclose(second["PREC"], 0.5 * first["PREC"])
+
+    second["PREC"][0] = -1.0
+    third = get_timeseries(inputs, [Row("TS039", 1.0, "PREC", "", "DIV")], siminfo)
+    assert third["PREC"][0] == first["PREC"][0]
+
+    # another method or delt is transformed again
+    get_timeseries(inputs, [Row("TS039", 1.0, "PREC", "", "SAME")], siminfo)
+    get_timeseries(inputs, [Row("TS039", 1.0, "PREC", "", "DIV")], {**siminfo, "delt": 30, "steps": 96})
+    assert inputs.reads == 3
+
+
+def test_negative_factor_of_max(siminfo):
+    inputs = Inputs()
+    siminfo = {**siminfo, "delt": 120, "steps": 24}
+    values = get_timeseries(inputs, [Row("TS039", -1.0, "ATEM", "", "MAX")], siminfo)["ATEM"]
+    assert values[0] == -0.0 and values[1] == -2.0
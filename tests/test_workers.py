@@ -0,0 +1,46 @@
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from hsp2.hsp2.main import main
+from hsp2.hsp2io.hdf import HDF5
+from hsp2.hsp2io.io import IOManager
+from hsp2.hsp2tools.commands import import_uci
+
+test10 = Path(__file__).parent / "test10" / "HSPFresults" / "test10.uci"
+test10specl = Path(__file__).parent / "test10specl" / "HSPFresults" / "test10specl.uci"
+
+
+def run_model(h5file, **kwargs):
+    io_manager = IOManager(HDF5(str(h5file), uci_snapshot=False))
+    main(io_manager, saveall=True, jupyterlab=False, **kwargs)
+    del io_manager
+
+
+def read_results(h5file):
+    with pd.HDFStore(str(h5file), "r") as store:
+        return {key: store[key] for key in store.keys() if key.startswith("/RESULTS/")}
+
+
+def test_workers_match_serial_run(tmp_path):
+    serial, pooled = tmp_path / "serial.h5", tmp_path / "pooled.h5"
+    import_uci(str(test10), str(serial))
+    shutil.copy(serial, pooled)
+
+    run_model(serial, workers=1)
+    run_model(pooled, workers=2)
+
+    expected, results = read_results(serial), read_results(pooled)
+    assert expected and results.keys() == expected.keys()
+    for key, data_frame in expected.items():
+        pd.testing.assert_frame_equal(results[key], data_frame, obj=key)
+
+
+@pytest.mark.parametrize("option", [{"workers": 2}, {"implnd_threads": 2}])
+def test_concurrency_rejected_with_special_actions(tmp_path, option):
+    h5file = tmp_path / "specl.h5"
+    import_uci(str(test10specl), str(h5file))
+    with pytest.raises(ValueError, match="SPEC-ACTIONS"):
+        run_model(h5file, **option)